@@ -14,6 +14,8 @@ logger = logging.getLogger('ical-proxy')
 
 # Kalender-Routes importieren
 from cal_utils.calendar_routes import calendar_routes
+from cal_utils.scheduler import refresh_scheduler
+from cal_utils.feeds import feed_scheduler
 
 def create_app():
     app = Flask(__name__)
@@ -21,6 +23,12 @@ def create_app():
     # Routes registrieren
     app.register_blueprint(calendar_routes)
     
+    # Hintergrundaktualisierung der bekannten Kalender starten
+    refresh_scheduler.start()
+    
+    # Konfigurierte Feeds vorberechnen und in ihrem Intervall aktualisieren
+    feed_scheduler.start()
+    
     return app
 
 if __name__ == "__main__":
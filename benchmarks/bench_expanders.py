@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Micro-Benchmark für die manuelle Expansion in cal_utils/frequency.py.
+Misst die Laufzeit pro Frequenz über einen langen Zeitraum, z.B. vor und nach einer Optimierung.
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from icalendar import Calendar
+import cal_utils.base
+from cal_utils.base import materialize
+from cal_utils.frequency import iter_manual_occurrences
+
+# Name, RRULE
+SCENARIOS = [
+    ('DAILY', 'FREQ=DAILY'),
+    ('DAILY;INTERVAL=7', 'FREQ=DAILY;INTERVAL=7'),
+    ('DAILY;BYDAY=MO-FR', 'FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR'),
+    ('WEEKLY;BYDAY=MO,WE,FR', 'FREQ=WEEKLY;BYDAY=MO,WE,FR'),
+    ('WEEKLY;INTERVAL=4', 'FREQ=WEEKLY;INTERVAL=4'),
+    ('MONTHLY;BYMONTHDAY=15', 'FREQ=MONTHLY;BYMONTHDAY=15'),
+    ('MONTHLY;BYDAY=2TH,-1FR', 'FREQ=MONTHLY;BYDAY=2TH,-1FR'),
+    ('MONTHLY;BYSETPOS=-1', 'FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1'),
+    ('YEARLY;INTERVAL=2', 'FREQ=YEARLY;INTERVAL=2'),
+]
+
+def make_event(rrule):
+    """Erzeugt einen wiederkehrenden Termin mit der angegebenen RRULE"""
+    ics = (
+        "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:bench\r\n"
+        "DTSTART;TZID=Europe/Berlin:20150105T090000\r\n"
+        "DTEND;TZID=Europe/Berlin:20150105T093000\r\n"
+        f"RRULE:{rrule}\r\nSUMMARY:Benchmark\r\nDTSTAMP:20150101T000000Z\r\n"
+        "DESCRIPTION:Wöchentliche Abstimmung\\, bitte Agenda vorher lesen\r\nLOCATION:Raum 1\r\n"
+        "ATTENDEE;CN=Anna:mailto:anna@example.com\r\nATTENDEE;CN=Ben:mailto:ben@example.com\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    return Calendar.from_ical(ics).walk('VEVENT')[0]
+
+def disable_instance_creation():
+    """Ersetzt die Instanzerzeugung durch einen Platzhalter, damit nur die Schrittkosten gemessen werden"""
+    def placeholder(event, instance_dt, uid_base):
+        return instance_dt
+
+    cal_utils.base.create_occurrence = placeholder
+
+def run(days, repeat):
+    start_date = datetime.date(2026, 1, 1)
+    end_date = start_date + datetime.timedelta(days=days)
+
+    print(f"Zeitraum: {start_date} bis {end_date}, {repeat} Wiederholungen")
+    print(f"{'Szenario':<28} {'Instanzen':>10} {'ms/Aufruf':>12} {'µs/Instanz':>12}")
+
+    for name, rrule in SCENARIOS:
+        event = make_event(rrule)
+        instances = list(iter_manual_occurrences(event, start_date, end_date))
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(iter_manual_occurrences(event, start_date, end_date))
+        elapsed = (time.perf_counter() - started) / repeat
+
+        per_instance = elapsed / len(instances) * 1e6 if instances else 0.0
+        print(f"{name:<28} {len(instances):>10} {elapsed * 1000:>12.3f} {per_instance:>12.1f}")
+
+def measure(build):
+    """Liefert Anzahl und belegten Speicher (Bytes) der von build() erzeugten Instanzen"""
+    tracemalloc.start()
+    instances = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(instances), size
+
+def run_memory(days):
+    start_date = datetime.date(2026, 1, 1)
+    end_date = start_date + datetime.timedelta(days=days)
+
+    print(f"Speicher pro Instanz, Zeitraum: {start_date} bis {end_date}")
+    print(f"{'Szenario':<28} {'Instanzen':>10} {'B/Occurrence':>14} {'B/Event':>10}")
+
+    for name, rrule in SCENARIOS:
+        event = make_event(rrule)
+        count, records = measure(lambda: list(iter_manual_occurrences(event, start_date, end_date)))
+        _, events = measure(lambda: [materialize(i) for i in iter_manual_occurrences(event, start_date, end_date)])
+        if count:
+            print(f"{name:<28} {count:>10} {records / count:>14.0f} {events / count:>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-Benchmark für die manuellen Expander")
+    parser.add_argument("--days", type=int, default=3650, help="Länge des Zeitraums in Tagen")
+    parser.add_argument("--repeat", type=int, default=5, help="Anzahl der Wiederholungen pro Szenario")
+    parser.add_argument("--stepping-only", action="store_true",
+                        help="Instanzerzeugung überspringen und nur die Schrittkosten messen")
+    parser.add_argument("--memory", action="store_true",
+                        help="Speicherbedarf kompakter Instanzen mit vollständigen Events vergleichen")
+    args = parser.parse_args()
+
+    if args.memory:
+        run_memory(args.days)
+        return
+
+    if args.stepping_only:
+        disable_instance_creation()
+
+    run(args.days, args.repeat)
+
+if __name__ == "__main__":
+    main()
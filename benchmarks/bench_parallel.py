@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Skalierungs-Benchmark für die parallele Expansion in cal_utils/parallel.py.
+Rendert einen großen Kalender mit 1 bis N Prozessen, vergleicht die Ausgabe Byte für Byte mit dem
+seriellen Ergebnis und gibt Laufzeit und Speedup pro Prozessanzahl aus.
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Ohne Occurrence-Cache messen, sonst wären Wiederholungen im Hauptprozess fast kostenlos
+os.environ['OCCURRENCE_CACHE_MAX_ENTRIES'] = '0'
+
+from cal_utils.pipeline import render_calendar
+from cal_utils.parallel import parallel_expander
+
+# Vom Proxy erzeugte DTSTAMP-Werte hängen mit DETERMINISTIC_OUTPUT=false von der Uhrzeit ab und werden vor dem Vergleich entfernt
+DTSTAMP_RE = re.compile(rb'DTSTAMP:\d{8}T\d{6}Z\r\n')
+
+RRULES = [
+    'FREQ=DAILY',
+    'FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR',
+    'FREQ=WEEKLY;BYDAY=MO,WE,FR',
+    'FREQ=WEEKLY;INTERVAL=2;BYDAY=TU',
+    'FREQ=MONTHLY;BYDAY=2TH,-1FR',
+    'FREQ=MONTHLY;BYMONTHDAY=15',
+    'FREQ=YEARLY',
+]
+
+def make_calendar(masters):
+    """Erzeugt einen Kalender mit der angegebenen Anzahl wiederkehrender Termine samt einiger Ausnahmen"""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//bench//EN"]
+    for index in range(masters):
+        start = datetime.date(2020, 1, 6) + datetime.timedelta(days=index % 365)
+        dtstart = start.strftime('%Y%m%d')
+        lines += [
+            "BEGIN:VEVENT", f"UID:master-{index}@bench",
+            f"DTSTART;TZID=Europe/Berlin:{dtstart}T090000",
+            f"DTEND;TZID=Europe/Berlin:{dtstart}T100000",
+            f"RRULE:{RRULES[index % len(RRULES)]}",
+            f"SUMMARY:Serie {index}", "DESCRIPTION:Abstimmung\\, bitte Agenda lesen",
+            "LOCATION:Raum 1", "DTSTAMP:20200101T000000Z", "END:VEVENT",
+        ]
+        if index % 10 == 0:
+            # Verschobener Einzeltermin der Serie
+            lines += [
+                "BEGIN:VEVENT", f"UID:master-{index}@bench",
+                f"RECURRENCE-ID;TZID=Europe/Berlin:{dtstart}T090000",
+                f"DTSTART;TZID=Europe/Berlin:{dtstart}T110000",
+                f"DTEND;TZID=Europe/Berlin:{dtstart}T120000",
+                f"SUMMARY:Serie {index} (verschoben)", "DTSTAMP:20200101T000000Z", "END:VEVENT",
+            ]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode('utf-8')
+
+def timed_render(content, start_date, end_date, repeat):
+    output = None
+    started = time.perf_counter()
+    for _ in range(repeat):
+        output = render_calendar(content, start_date, end_date)
+    return (time.perf_counter() - started) / repeat, output
+
+def main():
+    parser = argparse.ArgumentParser(description="Skalierung der parallelen Expansion mit 1 bis N Prozessen")
+    parser.add_argument("ics_file", nargs="?", help="ICS-Datei (Standard: synthetischer Kalender)")
+    parser.add_argument("--masters", type=int, default=1000, help="Anzahl der Serien im synthetischen Kalender")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Maximale Anzahl der Prozesse")
+    parser.add_argument("--days", type=int, default=395, help="Länge des Zeitraums in Tagen")
+    parser.add_argument("--repeat", type=int, default=3, help="Anzahl der Wiederholungen pro Messung")
+    args = parser.parse_args()
+
+    if args.ics_file:
+        with open(args.ics_file, 'rb') as f:
+            content = f.read()
+    else:
+        content = make_calendar(args.masters)
+
+    start_date = datetime.date.today() - datetime.timedelta(days=30)
+    end_date = start_date + datetime.timedelta(days=args.days)
+
+    # Alle Serien parallelisieren, unabhängig vom konfigurierten Schwellwert
+    parallel_expander.threshold = 0
+
+    mismatches = 0
+    baseline = None
+    print(f"{'Prozesse':>8} {'ms/Aufruf':>12} {'Speedup':>8}")
+    for workers in range(1, args.workers + 1):
+        parallel_expander.resize(workers)
+        if workers > 1:
+            # Pool vorab starten, damit der Prozessstart nicht mitgemessen wird
+            render_calendar(content, start_date, end_date)
+
+        elapsed, output = timed_render(content, start_date, end_date, args.repeat)
+        output = DTSTAMP_RE.sub(b'', output)
+        if baseline is None:
+            baseline = (elapsed, output)
+        elif output != baseline[1]:
+            mismatches += 1
+            print(f"Abweichende Ausgabe mit {workers} Prozessen")
+
+        print(f"{workers:>8} {elapsed * 1000:>12.1f} {baseline[0] / elapsed:>7.2f}x")
+
+    parallel_expander.shutdown()
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark für den Sprung zum Zeitraum in cal_utils/seek.py.
+Vergleicht CompiledRule.between mit dem einfachen rrule.between von dateutil für alte Serien mit
+schwebender Uhrzeit, UTC, TZID und als Ganztagstermin und zeigt, ob iter_recurring_event dabei den
+dateutil-Pfad nimmt oder auf die manuelle Expansion zurückfällt.
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from icalendar import Calendar
+from cal_utils.base import extract_excluded_dates
+from cal_utils.expand import compile_rrule, iter_recurring_event
+
+# Name, DTSTART, DTEND
+SCENARIOS = [
+    ('schwebend', 'DTSTART:20150105T090000', 'DTEND:20150105T093000'),
+    ('UTC', 'DTSTART:20150105T080000Z', 'DTEND:20150105T083000Z'),
+    ('TZID Europe/Berlin', 'DTSTART;TZID=Europe/Berlin:20150105T090000', 'DTEND;TZID=Europe/Berlin:20150105T093000'),
+    ('ganztägig', 'DTSTART;VALUE=DATE:20150105', 'DTEND;VALUE=DATE:20150106'),
+]
+
+RRULE = 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR'
+
+class FallbackCounter(logging.Handler):
+    """Zählt die Warnungen, mit denen iter_recurring_event auf die manuelle Expansion zurückfällt"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        if 'Verwende manuelle Expansion' in record.getMessage():
+            self.count += 1
+
+def make_event(dtstart, dtend, rrule):
+    """Erzeugt einen wiederkehrenden Termin mit den angegebenen Start- und Endzeilen"""
+    ics = (
+        "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:bench-seek\r\n"
+        f"{dtstart}\r\n{dtend}\r\nRRULE:{rrule}\r\n"
+        "SUMMARY:Stand-up\r\nDTSTAMP:20150101T000000Z\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    return Calendar.from_ical(ics).walk('VEVENT')[0]
+
+def window_bounds(dtstart, start_date, end_date):
+    """Grenzen wie in iter_recurring_event: mit der Zeitzone von DTSTART oder als Datum"""
+    if not isinstance(dtstart, datetime.datetime):
+        return start_date, end_date
+    start_dt = datetime.datetime.combine(start_date, datetime.time.min)
+    end_dt = datetime.datetime.combine(end_date, datetime.time.max)
+    if dtstart.tzinfo:
+        start_dt = start_dt.replace(tzinfo=dtstart.tzinfo)
+        end_dt = end_dt.replace(tzinfo=dtstart.tzinfo)
+    return start_dt, end_dt
+
+def plain_bounds(rule, start_dt, end_dt):
+    # Das einfache rrule.between braucht dieselben Werttypen wie die kompilierte Regel
+    if not isinstance(start_dt, datetime.datetime):
+        return datetime.datetime.combine(start_dt, datetime.time.min), datetime.datetime.combine(end_dt, datetime.time.max)
+    if rule.dtstart.tzinfo is None:
+        return start_dt.replace(tzinfo=None), end_dt.replace(tzinfo=None)
+    return start_dt, end_dt
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+def run(rrule, start_date, end_date, repeat):
+    logger = logging.getLogger('ical-proxy')
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+    counter = FallbackCounter()
+    logger.addHandler(counter)
+
+    print(f"RRULE: {rrule}, Zeitraum: {start_date} bis {end_date}, {repeat} Wiederholungen")
+    print(f"{'Szenario':<20} {'Termine':>8} {'seek ms':>10} {'between ms':>11} {'Faktor':>8} {'Pfad':>10}")
+    for name, dtstart_line, dtend_line in SCENARIOS:
+        event = make_event(dtstart_line, dtend_line, rrule)
+        dtstart = event.get('dtstart').dt
+        rule = compile_rrule(dtstart, event.get('rrule'))
+        start_dt, end_dt = window_bounds(dtstart, start_date, end_date)
+        plain_start, plain_end = plain_bounds(rule, start_dt, end_dt)
+
+        occurrences, seek_seconds = timed(lambda: rule.between(start_dt, end_dt), repeat)
+        plain, plain_seconds = timed(lambda: rule.rule.between(plain_start, plain_end, inc=True), repeat)
+        if len(occurrences) != len(plain):
+            print(f"{name:<20} Ergebnis weicht ab: {len(occurrences)} statt {len(plain)} Termine")
+            continue
+
+        counter.count = 0
+        list(iter_recurring_event(event, start_date, end_date, [], extract_excluded_dates(event)))
+        path = 'manuell' if counter.count else 'dateutil'
+
+        ratio = plain_seconds / seek_seconds if seek_seconds else 0.0
+        print(
+            f"{name:<20} {len(occurrences):>8} {seek_seconds * 1000:>10.3f} {plain_seconds * 1000:>11.3f} "
+            f"{ratio:>7.1f}x {path:>10}"
+        )
+
+    logger.removeHandler(counter)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für den Sprung zum Zeitraum bei alten Serien")
+    parser.add_argument("--rrule", default=RRULE, help="Wiederholungsregel der Serien")
+    parser.add_argument("--days-before", type=int, default=30, help="Tage in die Vergangenheit")
+    parser.add_argument("--days-after", type=int, default=365, help="Tage in die Zukunft")
+    parser.add_argument("--repeat", type=int, default=20, help="Anzahl der Wiederholungen pro Messung")
+    args = parser.parse_args()
+
+    today = datetime.date.today()
+    run(
+        args.rrule,
+        today - datetime.timedelta(days=args.days_before),
+        today + datetime.timedelta(days=args.days_after),
+        args.repeat
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark und Byte-Vergleich für die Ausgabe wiederkehrender Termine.
+Serialisiert jede Instanz einmal über icalendar (Event.to_ical) und einmal über die Byte-Vorlage
+(cal_utils/template.py) und bricht mit Exit-Code 1 ab, sobald sich die Bytes unterscheiden.
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from icalendar import Calendar
+from cal_utils.base import Occurrence, extract_excluded_dates
+from cal_utils.expand import iter_recurring_event
+from cal_utils.template import InstanceTemplate
+
+# Vom Proxy erzeugte DTSTAMP-Werte hängen mit DETERMINISTIC_OUTPUT=false von der Uhrzeit ab und werden vor dem Vergleich entfernt
+DTSTAMP_RE = re.compile(rb'DTSTAMP:\d{8}T\d{6}Z\r\n')
+
+# Originaltermine mit möglichst vielen Sonderfällen (Faltung, Escaping, Parameter, Zeitzonen, Ganztägig)
+SAMPLE_CALENDAR = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//bench//EN\r\n"
+    "BEGIN:VEVENT\r\nUID:tz-master@example.com\r\n"
+    "DTSTART;TZID=Europe/Berlin:20240108T090000\r\nDTEND;TZID=Europe/Berlin:20240108T093000\r\n"
+    "RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR\r\nDTSTAMP:20240101T000000Z\r\n"
+    "SUMMARY:Tägliche Abstimmung mit einem sehr langen Titel\\, der über mehrere Zeilen gefaltet werden muss\r\n"
+    "DESCRIPTION:Zeile 1\\nZeile 2\\; mit Semikolon\\, Komma und Backslash \\\\\r\n"
+    "LOCATION:Raum 1\r\nCATEGORIES:Arbeit,Team\r\n"
+    "ATTENDEE;CN=\"Müller, Anna\";ROLE=REQ-PARTICIPANT:mailto:anna@example.com\r\n"
+    "ATTENDEE;CN=Ben:mailto:ben@example.com\r\n"
+    "ORGANIZER;CN=Chef:mailto:chef@example.com\r\n"
+    "BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-PT10M\r\nEND:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:utc-master\r\nDTSTART:20240102T070000Z\r\nDTEND:20240102T080000Z\r\n"
+    "RRULE:FREQ=DAILY;INTERVAL=2\r\nSUMMARY:UTC\r\nDTSTAMP:20240101T000000Z\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:floating-master\r\nDTSTART:20240103T100000\r\nDURATION:PT45M\r\n"
+    "RRULE:FREQ=MONTHLY;BYDAY=2TH\r\nSUMMARY:Ohne DTEND\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:allday-master-with-a-rather-long-identifier-0123456789@calendar.example.com\r\n"
+    "DTSTART;VALUE=DATE:20240105\r\nDTEND;VALUE=DATE:20240106\r\nRRULE:FREQ=YEARLY\r\n"
+    "SUMMARY:Geburtstag\r\nTRANSP:TRANSPARENT\r\nEND:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+def load_masters(path):
+    """Liefert alle wiederkehrenden Originaltermine aus einer ICS-Datei oder dem Beispielkalender"""
+    if path:
+        with open(path, 'rb') as f:
+            cal = Calendar.from_ical(f.read())
+    else:
+        cal = Calendar.from_ical(SAMPLE_CALENDAR)
+    return [
+        component for component in cal.walk('VEVENT')
+        if component.get('rrule') and not component.get('recurrence-id')
+    ]
+
+def collect(masters, start_date, end_date):
+    """Expandiert alle Serien und liefert (Vorlage, Instanz)-Paare"""
+    pairs = []
+    for master in masters:
+        template = None
+        for instance in iter_recurring_event(master, start_date, end_date, [], extract_excluded_dates(master)):
+            if not isinstance(instance, Occurrence):
+                continue
+            if template is None:
+                template = InstanceTemplate(instance)
+            pairs.append((template, instance))
+    return pairs
+
+def check(pairs):
+    """Vergleicht beide Ausgabepfade Byte für Byte und liefert die Anzahl der Abweichungen"""
+    mismatches = 0
+    for template, instance in pairs:
+        expected = DTSTAMP_RE.sub(b'', instance.to_ical())
+        actual = DTSTAMP_RE.sub(b'', template.render(instance))
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"Abweichung für {instance.uid}:")
+                print(expected.decode('utf-8', 'replace'))
+                print(actual.decode('utf-8', 'replace'))
+    return mismatches
+
+def timed(fn, pairs, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for template, instance in pairs:
+            fn(template, instance)
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Byte-Vergleich und Benchmark der Vorlagen-Ausgabe")
+    parser.add_argument("ics_file", nargs="?", help="ICS-Datei (Standard: eingebauter Beispielkalender)")
+    parser.add_argument("--days", type=int, default=365, help="Länge des Zeitraums in Tagen")
+    parser.add_argument("--repeat", type=int, default=3, help="Anzahl der Wiederholungen für die Zeitmessung")
+    args = parser.parse_args()
+
+    start_date = datetime.date.today()
+    end_date = start_date + datetime.timedelta(days=args.days)
+    pairs = collect(load_masters(args.ics_file), start_date, end_date)
+
+    mismatches = check(pairs)
+    print(f"Instanzen: {len(pairs)}, Abweichungen: {mismatches}")
+
+    icalendar_time = timed(lambda template, instance: instance.to_ical(), pairs, args.repeat)
+    template_time = timed(lambda template, instance: template.render(instance), pairs, args.repeat)
+    print(f"icalendar: {icalendar_time * 1000:.1f} ms, Vorlage: {template_time * 1000:.1f} ms")
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
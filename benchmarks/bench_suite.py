@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Benchmark-Suite über einen synthetischen Kalender (benchmarks/synthetic.py).
+Misst Parsen, Sortieren, Expansion über dateutil und die manuellen Expander, Serialisierung, die
+komplette Pipeline und die Flask-Route jeweils für sich. Ergebnisse werden als JSON-Baseline gespeichert;
+beim Vergleich endet das Skript mit Exit-Code 1, sobald ein Fall um mehr als den Schwellwert langsamer ist
+oder ein anderes Ergebnis liefert.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keine Hintergrundaktualisierung und kein Log-Rauschen während der Messung
+os.environ.setdefault('REFRESH_INTERVAL', '0')
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+import logging
+logging.getLogger('ical-proxy').setLevel(os.environ['LOG_LEVEL'])
+
+from icalendar import Calendar
+from cal_utils.base import Occurrence, extract_excluded_dates
+from cal_utils.expand import expand_recurring_event, iter_recurring_event
+from cal_utils.frequency import manually_expand_recurring_event
+from cal_utils.template import InstanceTemplate
+from cal_utils.series import split_events
+from cal_utils.pipeline import render_calendar
+from cal_utils.cache import render_cache
+from cal_utils.occurrencecache import occurrence_cache
+
+from synthetic import PRESETS, generate_calendar, spec_to_dict, spec_from_dict
+
+# Standard-Schwellwert für Regressionen: 25% langsamer als die Baseline
+DEFAULT_THRESHOLD = 0.25
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+class Workload:
+    """Synthetischer Kalender samt bereits geparster und expandierter Zwischenstufen"""
+
+    def __init__(self, content, start_date, end_date):
+        self.content = content
+        self.start_date = start_date
+        self.end_date = end_date
+        self.cal = Calendar.from_ical(content)
+        self.normal_events, self.recurring_events, self.exceptions = split_events(self.cal)
+        self.series = [
+            (event, self.exceptions.get(uid, []), extract_excluded_dates(event))
+            for uid, event in self.recurring_events.items()
+        ]
+        self.instances = [
+            list(iter_recurring_event(event, start_date, end_date, exceptions, excluded))
+            for event, exceptions, excluded in self.series
+        ]
+
+    def parse(self):
+        return len(Calendar.from_ical(self.content).walk('VEVENT'))
+
+    def classify(self):
+        normal_events, recurring_events, exceptions = split_events(self.cal)
+        return len(normal_events) + len(recurring_events)
+
+    def expand_dateutil(self):
+        return sum(
+            len(expand_recurring_event(event, self.start_date, self.end_date, exceptions, excluded))
+            for event, exceptions, excluded in self.series
+        )
+
+    def expand_manual(self):
+        return sum(
+            len(manually_expand_recurring_event(event, self.start_date, self.end_date, exceptions, excluded))
+            for event, exceptions, excluded in self.series
+        )
+
+    def serialize(self):
+        # Wie render_series: eine Vorlage pro Serie, Ausnahmen über icalendar
+        total = 0
+        for instances in self.instances:
+            template = None
+            for instance in instances:
+                if isinstance(instance, Occurrence):
+                    if template is None:
+                        template = InstanceTemplate(instance)
+                    total += len(template.render(instance))
+                else:
+                    total += len(instance.to_ical())
+        return total
+
+    def pipeline(self):
+        occurrence_cache.clear()
+        return len(render_calendar(self.content, self.start_date, self.end_date))
+
+class CalendarServer:
+    """Liefert den synthetischen Kalender über HTTP aus, damit die Route inklusive Download gemessen wird"""
+
+    def __init__(self, content):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/calendar')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/calendar.ics"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+def make_route_case(content):
+    """Misst GET / über den Flask-Test-Client, Render- und Occurrence-Cache werden vor jedem Aufruf geleert"""
+    from app import create_app
+
+    server = CalendarServer(content)
+    client = create_app().test_client()
+    query = {'source': server.url}
+
+    def route():
+        render_cache.clear()
+        occurrence_cache.clear()
+        response = client.get('/', query_string=query)
+        if response.status_code != 200:
+            raise RuntimeError(f"Route lieferte Status {response.status_code}: {response.data[:200]!r}")
+        return len(response.data)
+
+    return route, server
+
+def measure(fn, repeat, warmup=1):
+    """Führt fn aus und liefert Median, Minimum und Maximum in Sekunden sowie das Ergebnis des letzten Aufrufs"""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "result": result
+    }
+
+CASES = ['parse', 'classify', 'expand_dateutil', 'expand_manual', 'serialize', 'pipeline', 'route']
+
+def run(content, start_date, end_date, cases, repeat):
+    """Misst die gewählten Fälle und liefert die Ergebnisse pro Fall"""
+    workload = Workload(content, start_date, end_date)
+    print(
+        f"Kalender: {len(content)} Bytes, {len(workload.normal_events)} Einzeltermine, "
+        f"{len(workload.recurring_events)} Serien, {sum(len(i) for i in workload.instances)} Instanzen"
+    )
+
+    results = {}
+    for case in cases:
+        server = None
+        if case == 'route':
+            fn, server = make_route_case(content)
+        else:
+            fn = getattr(workload, case)
+        try:
+            results[case] = measure(fn, repeat)
+        finally:
+            if server is not None:
+                server.close()
+        print(f"{case:<16} {results[case]['median'] * 1000:>10.2f} ms (min {results[case]['min'] * 1000:.2f} ms)")
+    return results
+
+def compare(results, baseline, threshold):
+    """Vergleicht Ergebnisse und Mediane mit der Baseline und liefert die Namen der Fälle mit Regression oder abweichendem Ergebnis"""
+    regressions = []
+    mismatches = []
+    print(f"\n{'Fall':<16} {'Baseline ms':>12} {'Aktuell ms':>12} {'Faktor':>8}")
+    for case, current in results.items():
+        reference = baseline['results'].get(case)
+        if reference is None:
+            print(f"{case:<16} {'-':>12} {current['median'] * 1000:>12.2f} {'neu':>8}")
+            continue
+        if current['result'] != reference['result']:
+            # Geänderte Ausgabe ist ein Fehler, auch wenn die Laufzeit passt
+            mismatches.append(case)
+            print(f"{case:<16} Ergebnis weicht ab: {current['result']} statt {reference['result']}")
+        ratio = current['median'] / reference['median'] if reference['median'] else 0.0
+        marker = ''
+        if ratio > 1 + threshold:
+            regressions.append(case)
+            marker = '  REGRESSION'
+        print(f"{case:<16} {reference['median'] * 1000:>12.2f} {current['median'] * 1000:>12.2f} {ratio:>7.2f}x{marker}")
+    return regressions, mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark-Suite mit JSON-Baseline und Regressionsprüfung")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default='medium', help="Parameter des synthetischen Kalenders")
+    parser.add_argument("--cases", default=','.join(CASES), help=f"Kommagetrennte Auswahl aus {', '.join(CASES)}")
+    parser.add_argument("--days-before", type=int, default=30, help="Tage in die Vergangenheit")
+    parser.add_argument("--days-after", type=int, default=365, help="Tage in die Zukunft")
+    parser.add_argument("--repeat", type=int, default=5, help="Anzahl der Messungen pro Fall (Median)")
+    parser.add_argument("--save", nargs='?', const=DEFAULT_BASELINE, help="Ergebnisse als Baseline speichern")
+    parser.add_argument("--compare", nargs='?', const=DEFAULT_BASELINE, help="Mit einer Baseline vergleichen")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Erlaubte Verlangsamung (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"Unbekannte Fälle: {', '.join(unknown)}")
+
+    baseline = None
+    spec = PRESETS[args.preset]
+    days_before, days_after = args.days_before, args.days_after
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        # Immer mit denselben Parametern wie die Baseline messen
+        spec = spec_from_dict(baseline['spec'])
+        days_before, days_after = baseline['days_before'], baseline['days_after']
+
+    today = datetime.date.today()
+    start_date = today - datetime.timedelta(days=days_before)
+    end_date = today + datetime.timedelta(days=days_after)
+    content = generate_calendar(spec, anchor=today)
+
+    results = run(content, start_date, end_date, cases, args.repeat)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                "created": datetime.datetime.now().isoformat(timespec='seconds'),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "spec": spec_to_dict(spec),
+                "days_before": days_before,
+                "days_after": days_after,
+                "repeat": args.repeat,
+                "results": results
+            }, f, indent=2)
+            f.write('\n')
+        print(f"Baseline gespeichert: {args.save}")
+
+    if baseline is not None:
+        regressions, mismatches = compare(results, baseline, args.threshold)
+        if mismatches:
+            print(f"\nErgebnis weicht von der Baseline ab: {', '.join(mismatches)}")
+        if regressions:
+            print(f"\nRegression um mehr als {args.threshold:.0%}: {', '.join(regressions)}")
+        if mismatches or regressions:
+            sys.exit(1)
+        print(f"\nKeine Regression um mehr als {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
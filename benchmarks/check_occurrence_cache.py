@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Abgleich des Occurrence-Caches (cal_utils/occurrencecache.py) mit der vollständigen Expansion.
+Verschiebt den Zeitraum für verschiedene Regelarten Tag für Tag, sodass der Cache nur die Ränder nachberechnet,
+und vergleicht jedes Ergebnis mit einer Expansion des ganzen Zeitraums. Endet mit Exit-Code 1 bei Abweichungen
+oder Warnungen der Expansion.
+"""
+
+import os
+import sys
+import argparse
+import datetime
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from icalendar import Calendar
+from cal_utils.base import extract_excluded_dates
+from cal_utils.expand import iter_recurring_event
+from cal_utils.occurrencecache import OccurrenceCache
+from cal_utils.series import split_events
+
+# Name, DTSTART, RRULE
+SCENARIOS = [
+    ('WEEKLY;BYDAY=MO', 'DTSTART;TZID=Europe/Berlin:20250106T090000', 'FREQ=WEEKLY;BYDAY=MO'),
+    ('MONTHLY;BYMONTHDAY=15', 'DTSTART:20250115T090000Z', 'FREQ=MONTHLY;BYMONTHDAY=15'),
+    ('MONTHLY;BYSETPOS=-1', 'DTSTART:20250131T090000', 'FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1'),
+    ('YEARLY;BYWEEKNO=20', 'DTSTART:20250512T090000Z', 'FREQ=YEARLY;BYWEEKNO=20;BYDAY=MO'),
+    ('YEARLY;BYYEARDAY', 'DTSTART;VALUE=DATE:20250101', 'FREQ=YEARLY;BYYEARDAY=1,100,200,300'),
+    ('DAILY;INTERVAL=3', 'DTSTART;VALUE=DATE:20250101', 'FREQ=DAILY;INTERVAL=3'),
+    ('WEEKLY;UNTIL', 'DTSTART:20250106T090000Z', 'FREQ=WEEKLY;BYDAY=MO,TH;UNTIL={until}'),
+    ('WEEKLY;COUNT', 'DTSTART;TZID=Europe/Berlin:20250106T090000', 'FREQ=WEEKLY;INTERVAL=2;BYDAY=TU;COUNT={count}'),
+    ('DAILY;EXDATE', 'DTSTART:20250106T090000Z', 'FREQ=DAILY;BYDAY=MO,WE,FR'),
+]
+
+def make_calendar(dtstart, rrule, anchor, with_exceptions=False):
+    """Erzeugt eine Serie, optional mit ausgelassenem Termin (EXDATE) und verschobener Instanz im Zeitraum"""
+    event = (
+        "BEGIN:VEVENT\r\nUID:check-cache\r\n"
+        f"{dtstart}\r\nRRULE:{rrule}\r\nSUMMARY:Serie\r\nDTSTAMP:20250101T000000Z\r\n"
+    )
+    exception = ""
+    if with_exceptions:
+        monday = anchor - datetime.timedelta(days=anchor.weekday())
+        wednesday = monday + datetime.timedelta(days=2)
+        event += f"EXDATE:{monday:%Y%m%d}T090000Z\r\n"
+        exception = (
+            "BEGIN:VEVENT\r\nUID:check-cache\r\n"
+            f"RECURRENCE-ID:{wednesday:%Y%m%d}T090000Z\r\nDTSTART:{wednesday:%Y%m%d}T150000Z\r\n"
+            "SUMMARY:Verschoben\r\nDTSTAMP:20250101T000000Z\r\nEND:VEVENT\r\n"
+        )
+    ics = f"BEGIN:VCALENDAR\r\n{event}END:VEVENT\r\n{exception}END:VCALENDAR\r\n"
+    _, recurring_events, exceptions = split_events(Calendar.from_ical(ics))
+    master = recurring_events['check-cache']
+    return master, exceptions.get('check-cache', [])
+
+def fingerprint(instances):
+    """Vergleichbare Darstellung einer Terminliste: UID, Start und ob es eine Ausnahme ist"""
+    result = []
+    for instance in instances:
+        if hasattr(instance, 'uid'):
+            result.append((instance.uid, instance.start, False))
+        else:
+            result.append((str(instance.get('uid')), instance.get('dtstart').dt, True))
+    return result
+
+class WarningCounter(logging.Handler):
+    """Zählt die Warnungen der Expansion"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+def slide(master, exceptions, start_date, days, days_before, days_after):
+    """Verschiebt den Zeitraum Tag für Tag und liefert die Tage, an denen Cache und Vollexpansion abweichen"""
+    cache = OccurrenceCache(max_entries=1)
+    excluded = extract_excluded_dates(master)
+    mismatches = []
+    for offset in range(days):
+        today = start_date + datetime.timedelta(days=offset)
+        window_start = today - datetime.timedelta(days=days_before)
+        window_end = today + datetime.timedelta(days=days_after)
+        cached = cache.expand('check', master, window_start, window_end, exceptions, excluded)
+        full = list(iter_recurring_event(master, window_start, window_end, exceptions, excluded))
+        if fingerprint(cached) != fingerprint(full):
+            mismatches.append((today, len(cached), len(full)))
+    return mismatches, cache.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description="Abgleich des Occurrence-Caches mit der vollständigen Expansion")
+    parser.add_argument("--days", type=int, default=60, help="Anzahl der Tage, um die der Zeitraum verschoben wird")
+    parser.add_argument("--days-before", type=int, default=30, help="Tage in die Vergangenheit")
+    parser.add_argument("--days-after", type=int, default=90, help="Tage in die Zukunft")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=datetime.date(2026, 3, 1), help="Erster Tag (ISO-Datum)")
+    args = parser.parse_args()
+
+    logger = logging.getLogger('ical-proxy')
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+    warnings = WarningCounter()
+    logger.addHandler(warnings)
+
+    # UNTIL und COUNT enden mitten im verschobenen Zeitraum
+    until = (args.start + datetime.timedelta(days=args.days // 2 + args.days_after)).strftime('%Y%m%dT090000Z')
+    count = ((args.start - datetime.date(2025, 1, 6)).days + args.days_after) // 14 + args.days // 28
+
+    failed = False
+    print(f"{'Szenario':<24} {'Abweichungen':>12} {'Warnungen':>10} {'Erweiterungen':>14}")
+    for name, dtstart, rrule in SCENARIOS:
+        master, exceptions = make_calendar(dtstart, rrule.format(until=until, count=count), args.start, name.endswith('EXDATE'))
+        warnings.count = 0
+        mismatches, stats = slide(master, exceptions, args.start, args.days, args.days_before, args.days_after)
+        print(f"{name:<24} {len(mismatches):>12} {warnings.count:>10} {stats['extends']:>14}")
+        for today, cached, full in mismatches[:3]:
+            print(f"  {today}: {cached} Termine aus dem Cache, {full} bei vollständiger Expansion")
+        failed = failed or bool(mismatches) or warnings.count > 0
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
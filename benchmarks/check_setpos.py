@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Abgleich der manuellen Expansion (cal_utils/frequency.py) mit dateutil für Regeln mit COUNT und BYSETPOS.
+Prüft feste Sonderfälle und zufällige Regeln je Frequenz und endet mit Exit-Code 1, sobald die Termine abweichen.
+"""
+
+import os
+import sys
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+import logging
+logging.getLogger('ical-proxy').setLevel(os.environ['LOG_LEVEL'])
+
+from dateutil.rrule import rrulestr
+from icalendar import Calendar
+from cal_utils.frequency import iter_manual_occurrences
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+# DTSTART, RRULE: Starttermin mitten in der Woche, BYSETPOS zählt in der ersten Woche erst ab dort
+FIXED_CASES = [
+    ('20240201T090000', 'FREQ=WEEKLY;BYDAY=MO,TU,TH,FR,SU;BYSETPOS=3;COUNT=21'),
+    ('20250919T090000', 'FREQ=WEEKLY;INTERVAL=2;BYDAY=TH,FR,SA;BYSETPOS=1,-1;COUNT=40'),
+    ('20240103T090000', 'FREQ=WEEKLY;BYDAY=MO,WE,FR;BYSETPOS=-1;WKST=SU;COUNT=10'),
+    ('20240131T090000', 'FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;BYSETPOS=-1;COUNT=12'),
+    ('20240315T090000', 'FREQ=YEARLY;BYDAY=SA,SU;BYMONTH=3,9;BYSETPOS=1,-1;COUNT=9'),
+]
+
+def make_event(dtstart, rrule):
+    """Erzeugt einen wiederkehrenden Termin mit schwebender Uhrzeit"""
+    ics = (
+        "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:check-setpos\r\n"
+        f"DTSTART:{dtstart}\r\nDTEND:{dtstart}\r\nRRULE:{rrule}\r\n"
+        "END:VEVENT\r\nEND:VCALENDAR\r\n"
+    )
+    return Calendar.from_ical(ics).walk('VEVENT')[0]
+
+def random_case(rng):
+    """Zufällige Regel mit COUNT und BYSETPOS, deren Positionen in jeder Periode erreichbar sind"""
+    freq = rng.choice(['WEEKLY', 'MONTHLY', 'YEARLY'])
+    byday = rng.sample(WEEKDAYS, rng.randint(2, 5))
+    positions = [position for position in range(-len(byday), len(byday) + 1) if position]
+    parts = [f"FREQ={freq}"]
+    if rng.random() < 0.5:
+        parts.append(f"INTERVAL={rng.randint(1, 3)}")
+    parts.append(f"BYDAY={','.join(byday)}")
+    if freq != 'WEEKLY' and rng.random() < 0.3:
+        parts.append(f"BYMONTH={','.join(str(month) for month in sorted(rng.sample(range(1, 13), 3)))}")
+    parts.append(f"BYSETPOS={','.join(str(position) for position in rng.sample(positions, rng.randint(1, 2)))}")
+    if rng.random() < 0.3:
+        parts.append(f"WKST={rng.choice(WEEKDAYS)}")
+    parts.append(f"COUNT={rng.randint(1, 40)}")
+    dtstart = datetime.datetime(2024, 1, 1, 9) + datetime.timedelta(days=rng.randint(0, 700))
+    return dtstart.strftime('%Y%m%dT%H%M%S'), ';'.join(parts)
+
+def check(dtstart, rrule):
+    """Liefert die Termine von dateutil und der manuellen Expansion als Datumslisten"""
+    expected = [occurrence.date() for occurrence in rrulestr(f"DTSTART:{dtstart}\nRRULE:{rrule}")]
+    event = make_event(dtstart, rrule)
+    start_date = event.get('dtstart').dt.date()
+    end_date = expected[-1] if expected else start_date
+    actual = [instance.start.date() for instance in iter_manual_occurrences(event, start_date, end_date)]
+    return expected, actual
+
+def main():
+    parser = argparse.ArgumentParser(description="Abgleich von COUNT und BYSETPOS mit dateutil")
+    parser.add_argument("--rules", type=int, default=300, help="Anzahl zufälliger Regeln")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert für die zufälligen Regeln")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cases = FIXED_CASES + [random_case(rng) for _ in range(args.rules)]
+
+    mismatches = 0
+    for dtstart, rrule in cases:
+        expected, actual = check(dtstart, rrule)
+        if expected != actual:
+            mismatches += 1
+            missing = sorted(set(expected) - set(actual))[:3]
+            extra = sorted(set(actual) - set(expected))[:3]
+            print(f"Abweichung für DTSTART {dtstart}, {rrule}: {len(actual)} statt {len(expected)} Termine, fehlend {missing}, zusätzlich {extra}")
+
+    print(f"{len(cases)} Regeln geprüft, {mismatches} Abweichungen")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
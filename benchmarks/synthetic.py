@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Generator für synthetische Kalender, auf dem die Benchmarks aufbauen.
+Erzeugt reproduzierbar (fester Seed) Einzeltermine und Serien mit einstellbarer Mischung aus FREQ,
+INTERVAL, BYDAY/BYMONTHDAY, EXDATE-Dichte, RECURRENCE-ID-Ausnahmen und Zeitzonen.
+Als Skript aufgerufen wird der Kalender als ICS-Datei geschrieben.
+"""
+
+import sys
+import random
+import argparse
+import datetime
+from collections import namedtuple
+from itertools import islice
+
+from dateutil.rrule import rrulestr
+
+# Parameter des synthetischen Kalenders
+CalendarSpec = namedtuple('CalendarSpec', [
+    'singles',           # Anzahl der Einzeltermine
+    'masters',           # Anzahl der Serien
+    'freqs',             # Gewichtung der Frequenzen, z.B. {'DAILY': 1, 'WEEKLY': 3}
+    'intervals',         # Auswahl für INTERVAL, mehrfach genannte Werte sind häufiger
+    'byday_ratio',       # Anteil der Serien mit BYDAY
+    'bymonthday_ratio',  # Anteil der monatlichen Serien mit BYMONTHDAY statt BYDAY
+    'exdate_density',    # Anteil der Termine einer Serie, die per EXDATE ausgeschlossen werden
+    'exception_ratio',   # Anteil der Serien mit verschobenen Einzelterminen (RECURRENCE-ID)
+    'timezones',         # Zeitzonen der Termine, 'UTC' für Zeiten mit Z, None für ganztägige Termine
+    'until_ratio',       # Anteil der Serien mit UNTIL
+    'count_ratio',       # Anteil der Serien mit COUNT
+    'seed',
+])
+
+PRESETS = {
+    'small': CalendarSpec(
+        singles=50, masters=20, freqs={'DAILY': 1, 'WEEKLY': 3, 'MONTHLY': 1, 'YEARLY': 1},
+        intervals=(1, 1, 1, 2), byday_ratio=0.5, bymonthday_ratio=0.5, exdate_density=0.05,
+        exception_ratio=0.2, timezones=('Europe/Berlin', 'UTC', None), until_ratio=0.1, count_ratio=0.1, seed=1
+    ),
+    'medium': CalendarSpec(
+        singles=500, masters=200, freqs={'DAILY': 2, 'WEEKLY': 5, 'MONTHLY': 2, 'YEARLY': 1},
+        intervals=(1, 1, 1, 2, 3), byday_ratio=0.6, bymonthday_ratio=0.5, exdate_density=0.05,
+        exception_ratio=0.2, timezones=('Europe/Berlin', 'Europe/Berlin', 'America/New_York', 'UTC', None),
+        until_ratio=0.1, count_ratio=0.1, seed=1
+    ),
+    'large': CalendarSpec(
+        singles=3000, masters=1500, freqs={'DAILY': 2, 'WEEKLY': 5, 'MONTHLY': 2, 'YEARLY': 1},
+        intervals=(1, 1, 1, 2, 3, 4), byday_ratio=0.6, bymonthday_ratio=0.5, exdate_density=0.1,
+        exception_ratio=0.3, timezones=('Europe/Berlin', 'Europe/Berlin', 'America/New_York', 'Asia/Tokyo', 'UTC', None),
+        until_ratio=0.15, count_ratio=0.1, seed=1
+    ),
+}
+
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+# VTIMEZONE-Definitionen wie von Kalender-Clients exportiert
+VTIMEZONES = {
+    'Europe/Berlin': [
+        "BEGIN:VTIMEZONE", "TZID:Europe/Berlin",
+        "BEGIN:DAYLIGHT", "TZOFFSETFROM:+0100", "TZOFFSETTO:+0200", "TZNAME:CEST",
+        "DTSTART:19700329T020000", "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU", "END:DAYLIGHT",
+        "BEGIN:STANDARD", "TZOFFSETFROM:+0200", "TZOFFSETTO:+0100", "TZNAME:CET",
+        "DTSTART:19701025T030000", "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU", "END:STANDARD",
+        "END:VTIMEZONE",
+    ],
+    'America/New_York': [
+        "BEGIN:VTIMEZONE", "TZID:America/New_York",
+        "BEGIN:DAYLIGHT", "TZOFFSETFROM:-0500", "TZOFFSETTO:-0400", "TZNAME:EDT",
+        "DTSTART:19700308T020000", "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU", "END:DAYLIGHT",
+        "BEGIN:STANDARD", "TZOFFSETFROM:-0400", "TZOFFSETTO:-0500", "TZNAME:EST",
+        "DTSTART:19701101T020000", "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU", "END:STANDARD",
+        "END:VTIMEZONE",
+    ],
+    'Asia/Tokyo': [
+        "BEGIN:VTIMEZONE", "TZID:Asia/Tokyo",
+        "BEGIN:STANDARD", "TZOFFSETFROM:+0900", "TZOFFSETTO:+0900", "TZNAME:JST",
+        "DTSTART:19700101T000000", "END:STANDARD",
+        "END:VTIMEZONE",
+    ],
+}
+
+def spec_to_dict(spec):
+    """Wandelt die Parameter in ein JSON-fähiges Dictionary um (für die Baseline)"""
+    data = spec._asdict()
+    data['intervals'] = list(spec.intervals)
+    data['timezones'] = list(spec.timezones)
+    return data
+
+def spec_from_dict(data):
+    """Gegenstück zu spec_to_dict"""
+    data = dict(data)
+    data['intervals'] = tuple(data['intervals'])
+    data['timezones'] = tuple(data['timezones'])
+    return CalendarSpec(**data)
+
+def make_rrule(spec, rng, freq, dtstart, anchor):
+    """Erzeugt eine RRULE für die gewählte Frequenz mit BYDAY/BYMONTHDAY, UNTIL oder COUNT"""
+    parts = [f"FREQ={freq}"]
+    interval = rng.choice(spec.intervals)
+    if interval > 1:
+        parts.append(f"INTERVAL={interval}")
+
+    if freq == 'DAILY' and rng.random() < spec.byday_ratio:
+        parts.append("BYDAY=MO,TU,WE,TH,FR")
+    elif freq == 'WEEKLY' and rng.random() < spec.byday_ratio:
+        days = sorted(rng.sample(range(5), rng.randint(1, 3)))
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in days))
+    elif freq == 'MONTHLY':
+        if rng.random() < spec.bymonthday_ratio:
+            parts.append(f"BYMONTHDAY={rng.choice([1, 10, 15, 28, -1])}")
+        elif rng.random() < spec.byday_ratio:
+            parts.append(f"BYDAY={rng.choice(['1MO', '2TH', '3WE', '-1FR'])}")
+
+    roll = rng.random()
+    if roll < spec.until_ratio:
+        # UNTIL hat denselben Werttyp wie DTSTART (RFC 5545), bei Zeiten immer in UTC
+        until = anchor + datetime.timedelta(days=rng.randint(-60, 400))
+        suffix = '' if not isinstance(dtstart, datetime.datetime) else 'T235959Z'
+        parts.append(f"UNTIL={until.strftime('%Y%m%d')}{suffix}")
+    elif roll < spec.until_ratio + spec.count_ratio:
+        parts.append(f"COUNT={rng.randint(5, 200)}")
+
+    return ";".join(parts)
+
+def format_dt(value, tzid):
+    """Liefert Parameter und Wert für DTSTART/DTEND/EXDATE/RECURRENCE-ID"""
+    if tzid is None:
+        return ";VALUE=DATE", value.strftime('%Y%m%d')
+    if tzid == 'UTC':
+        return "", value.strftime('%Y%m%dT%H%M%SZ')
+    return f";TZID={tzid}", value.strftime('%Y%m%dT%H%M%S')
+
+def event_lines(uid, summary, start, end, tzid, extra=()):
+    params, value = format_dt(start, tzid)
+    end_params, end_value = format_dt(end, tzid)
+    return [
+        "BEGIN:VEVENT", f"UID:{uid}",
+        f"DTSTART{params}:{value}", f"DTEND{end_params}:{end_value}",
+        *extra,
+        f"SUMMARY:{summary}", "DESCRIPTION:Abstimmung\\, bitte Agenda vorher lesen",
+        "LOCATION:Raum 1", "DTSTAMP:20200101T000000Z", "END:VEVENT",
+    ]
+
+def make_start(rng, anchor, tzid, max_days_back):
+    """Zufälliger Starttermin vor dem Ankerdatum, ganztägig als date, sonst als naive Ortszeit"""
+    day = anchor - datetime.timedelta(days=rng.randint(0, max_days_back))
+    if tzid is None:
+        return day
+    return datetime.datetime.combine(day, datetime.time(rng.randint(7, 18), rng.choice([0, 15, 30, 45])))
+
+def generate_calendar(spec, anchor=None):
+    """Erzeugt den Kalender als ICS-Bytes, Termine liegen relativ zum Ankerdatum (Standard: heute)"""
+    anchor = anchor or datetime.date.today()
+    rng = random.Random(spec.seed)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//ical-proxy//synthetic//DE", "CALSCALE:GREGORIAN"]
+
+    for tzid in sorted({tz for tz in spec.timezones if tz in VTIMEZONES}):
+        lines += VTIMEZONES[tzid]
+
+    for index in range(spec.singles):
+        tzid = rng.choice(spec.timezones)
+        start = make_start(rng, anchor + datetime.timedelta(days=365), tzid, 730)
+        end = start + (datetime.timedelta(days=1) if tzid is None else datetime.timedelta(minutes=rng.choice([30, 60, 90])))
+        lines += event_lines(f"single-{index}@synthetic", f"Termin {index}", start, end, tzid)
+
+    freqs = list(spec.freqs)
+    weights = [spec.freqs[freq] for freq in freqs]
+    for index in range(spec.masters):
+        tzid = rng.choice(spec.timezones)
+        freq = rng.choices(freqs, weights)[0]
+        start = make_start(rng, anchor, tzid, 1095)
+        end = start + (datetime.timedelta(days=1) if tzid is None else datetime.timedelta(hours=1))
+        rrule = make_rrule(spec, rng, freq, start, anchor)
+        uid = f"master-{index}@synthetic"
+
+        # Tatsächliche Termine der Serie, aus denen EXDATEs und Ausnahmen gewählt werden
+        rule_start = start if tzid is not None else datetime.datetime.combine(start, datetime.time())
+        horizon = datetime.datetime.combine(anchor + datetime.timedelta(days=365), datetime.time())
+        occurrences = [
+            occurrence for occurrence in islice(rrulestr(rrule.replace('Z', ''), dtstart=rule_start), 2000)
+            if occurrence <= horizon
+        ]
+        if tzid is None:
+            occurrences = [occurrence.date() for occurrence in occurrences]
+
+        excluded = rng.sample(occurrences, int(len(occurrences) * spec.exdate_density))
+        extra = [f"RRULE:{rrule}"]
+        for exdate in sorted(excluded):
+            params, value = format_dt(exdate, tzid)
+            extra.append(f"EXDATE{params}:{value}")
+        lines += event_lines(uid, f"Serie {index}", start, end, tzid, extra)
+
+        excluded = set(excluded)
+        remaining = [occurrence for occurrence in occurrences if occurrence not in excluded]
+        if remaining and rng.random() < spec.exception_ratio:
+            for moved in rng.sample(remaining, min(len(remaining), rng.randint(1, 3))):
+                params, value = format_dt(moved, tzid)
+                shift = datetime.timedelta(days=1) if tzid is None else datetime.timedelta(hours=2)
+                lines += event_lines(
+                    uid, f"Serie {index} (verschoben)", moved + shift, moved + shift + (end - start), tzid,
+                    [f"RECURRENCE-ID{params}:{value}"]
+                )
+
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetischen Kalender als ICS-Datei erzeugen")
+    parser.add_argument("output", help="Zieldatei, '-' für die Standardausgabe")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default='medium', help="Vorgegebene Parameter")
+    parser.add_argument("--singles", type=int, help="Anzahl der Einzeltermine")
+    parser.add_argument("--masters", type=int, help="Anzahl der Serien")
+    parser.add_argument("--exdate-density", type=float, help="Anteil der per EXDATE ausgeschlossenen Termine")
+    parser.add_argument("--exception-ratio", type=float, help="Anteil der Serien mit RECURRENCE-ID-Ausnahmen")
+    parser.add_argument("--seed", type=int, help="Seed für den Zufallsgenerator")
+    args = parser.parse_args()
+
+    content = generate_calendar(apply_overrides(PRESETS[args.preset], args))
+    if args.output == '-':
+        sys.stdout.buffer.write(content)
+    else:
+        with open(args.output, 'wb') as f:
+            f.write(content)
+        print(f"{len(content)} Bytes nach {args.output} geschrieben")
+
+def apply_overrides(spec, args):
+    """Übernimmt die auf der Kommandozeile gesetzten Parameter in die Vorgabe"""
+    overrides = {
+        field: getattr(args, field) for field in ('singles', 'masters', 'exdate_density', 'exception_ratio', 'seed')
+        if getattr(args, field, None) is not None
+    }
+    return spec._replace(**overrides)
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,16 @@ Calendar Utilities für den ICS Calendar Proxy
 from icalendar import Calendar, Event
 from .base import (
     is_date_excluded, sanitize_rrule, create_instance_from_recurring, 
-    sanitize_calendar, get_date_string
-)
-from .events import (
-    extract_excluded_dates, manually_expand_recurring_event,
-    expand_recurring_event
+    sanitize_calendar, get_date_string, extract_excluded_dates,
+    Occurrence, create_occurrence
 )
+from .frequency import manually_expand_recurring_event, iter_manual_occurrences
+from .expand import expand_recurring_event, iter_recurring_event
 
 __all__ = [
     'Calendar', 'Event',
     'is_date_excluded', 'sanitize_rrule', 'create_instance_from_recurring',
-    'sanitize_calendar', 'get_date_string',
+    'sanitize_calendar', 'get_date_string', 'Occurrence', 'create_occurrence',
     'extract_excluded_dates', 'manually_expand_recurring_event',
-    'expand_recurring_event'
+    'iter_manual_occurrences', 'expand_recurring_event', 'iter_recurring_event'
 ]
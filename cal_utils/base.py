@@ -1,5 +1,6 @@
 from icalendar import Calendar, Event, vCalAddress, vText
 import datetime
+import os
 import pytz
 import logging
 import re
@@ -15,6 +16,9 @@ VALID_RRULE_PROPERTIES = {
     'WKST'
 }
 
+# Erzeugte DTSTAMPs aus dem Originaltermin ableiten statt aus der aktuellen Uhrzeit (byte-stabile Ausgabe)
+DETERMINISTIC_OUTPUT = os.environ.get('DETERMINISTIC_OUTPUT', 'true').lower() == 'true'
+
 def get_date_string(dt):
     """Erzeugt einen konsistenten Datumsstring für ein Datum oder eine Uhrzeit"""
     if isinstance(dt, datetime.datetime):
@@ -24,8 +28,46 @@ def get_date_string(dt):
     else:
         return str(dt)
 
+def index_excluded_dates(excluded_dates):
+    """Wandelt die ausgeschlossenen Termine in ein Set von Datumswerten für O(1)-Lookups um"""
+    if isinstance(excluded_dates, (set, frozenset)):
+        return excluded_dates
+    
+    index = set()
+    for excluded in excluded_dates:
+        if isinstance(excluded, datetime.datetime):
+            index.add(excluded.date())
+        elif isinstance(excluded, datetime.date):
+            index.add(excluded)
+    return frozenset(index)
+
+def index_exceptions(exceptions):
+    """Indiziert die Ausnahmen (RECURRENCE-ID) eines wiederkehrenden Termins nach ihrem Datum"""
+    if isinstance(exceptions, dict):
+        return exceptions
+    
+    index = {}
+    for ex in exceptions:
+        ex_date = ex.get('recurrence-id').dt
+        if isinstance(ex_date, datetime.datetime):
+            ex_date = ex_date.date()
+        # Bei mehreren Ausnahmen für denselben Tag gewinnt die erste
+        index.setdefault(ex_date, ex)
+    return index
+
+def find_exception(instance_date, exceptions, uid_base):
+    """Liefert die Ausnahme für ein Datum mit angepasster UID oder None"""
+    ex = exceptions.get(instance_date)
+    if ex is not None:
+        # Stelle sicher, dass die UID der Ausnahme korrekt ist
+        ex['uid'] = f"{uid_base}-{instance_date.isoformat()}"
+    return ex
+
 def is_date_excluded(instance_date, excluded_dates):
     """Prüft, ob ein Datum in der Liste der ausgeschlossenen Termine ist"""
+    if isinstance(excluded_dates, (set, frozenset)):
+        return instance_date in excluded_dates
+    
     for excluded in excluded_dates:
         if isinstance(excluded, datetime.datetime) and excluded.date() == instance_date:
             return True
@@ -44,18 +86,64 @@ def sanitize_rrule(rrule_val):
     
     return sanitized
 
-def create_instance_from_recurring(event, instance_dt, uid_base, skip_properties=None):
-    """Erstellt eine neue Instanz eines wiederkehrenden Termins für ein bestimmtes Datum"""
-    if skip_properties is None:
-        skip_properties = ['dtstart', 'dtend', 'uid', 'rrule', 'exdate', 'rdate', 'recurrence-id']
+class Occurrence:
+    """Kompakte Instanz eines wiederkehrenden Termins, wird erst bei der Ausgabe zu einem Event"""
     
-    instance = Event()
+    __slots__ = ('master', 'start', 'end', 'uid')
     
-    # Eigenschaften vom Original übernehmen
-    for attr, value in event.items():
-        if attr.lower() not in skip_properties:
-            instance.add(attr, value)
+    def __init__(self, master, start, end, uid):
+        self.master = master
+        self.start = start
+        self.end = end
+        self.uid = uid
     
+    def to_event(self, skip_properties=None):
+        """Erzeugt das vollständige Event mit allen Eigenschaften des Originaltermins"""
+        if skip_properties is None:
+            skip_properties = ['dtstart', 'dtend', 'uid', 'rrule', 'exdate', 'rdate', 'recurrence-id']
+        
+        instance = Event()
+        
+        # Eigenschaften vom Original übernehmen
+        for attr, value in self.master.items():
+            if attr.lower() not in skip_properties:
+                instance.add(attr, value)
+        
+        instance.add('dtstart', self.start)
+        if self.end is not None:
+            instance.add('dtend', self.end)
+        instance.add('uid', self.uid)
+        
+        # Für Tuta: Stelle sicher, dass DTSTAMP vorhanden ist (wird manchmal benötigt)
+        if 'dtstamp' not in instance:
+            if DETERMINISTIC_OUTPUT:
+                instance.add('dtstamp', master_dtstamp(self.master))
+            else:
+                instance.add('dtstamp', datetime.datetime.now(pytz.UTC))
+        
+        return instance
+    
+    def to_ical(self):
+        """Serialisiert die Instanz wie ein Event"""
+        return self.to_event().to_ical()
+
+def master_dtstamp(event):
+    """Leitet einen festen DTSTAMP (UTC) aus LAST-MODIFIED, CREATED oder DTSTART des Originaltermins ab"""
+    for name in ('last-modified', 'created', 'dtstart'):
+        if name not in event:
+            continue
+        value = event.get(name).dt
+        if not isinstance(value, datetime.datetime):
+            # Ganztägige Werte als Mitternacht UTC
+            return datetime.datetime.combine(value, datetime.time.min, tzinfo=pytz.UTC)
+        if value.tzinfo is None:
+            # Ohne Zeitzone wie eine UTC-Angabe behandeln, damit das Ergebnis nicht von der Serverzeitzone abhängt
+            return value.replace(tzinfo=pytz.UTC)
+        return value.astimezone(pytz.UTC)
+    return datetime.datetime(1970, 1, 1, tzinfo=pytz.UTC)
+
+def create_occurrence(event, instance_dt, uid_base):
+    """Berechnet Start, Ende und UID einer Instanz, ohne die Eigenschaften des Originals zu kopieren"""
     # Original-Start- und Enddaten
     dtstart = event.get('dtstart').dt
     dtend = event.get('dtend').dt if 'dtend' in event else None
@@ -69,44 +157,37 @@ def create_instance_from_recurring(event, instance_dt, uid_base, skip_properties
             duration = dtend - dtstart
     
     # Start- und Endzeit für die neue Instanz setzen
+    start = end = None
     if isinstance(dtstart, datetime.datetime):
         # Termin mit Uhrzeit
         if isinstance(instance_dt, datetime.datetime):
             # Zeitzone beibehalten
             if dtstart.tzinfo and not instance_dt.tzinfo:
                 instance_dt = instance_dt.replace(tzinfo=dtstart.tzinfo)
-            
-            instance.add('dtstart', instance_dt)
-            
-            # Enddatum
-            if duration:
-                instance.add('dtend', instance_dt + duration)
+            start = instance_dt
         else:
             # Termin mit Datum, aber Originaltermin hat Uhrzeit
-            new_dt = datetime.datetime.combine(instance_dt, dtstart.time())
+            start = datetime.datetime.combine(instance_dt, dtstart.time())
             if dtstart.tzinfo:
-                new_dt = new_dt.replace(tzinfo=dtstart.tzinfo)
-            
-            instance.add('dtstart', new_dt)
-            
-            # Enddatum
-            if duration:
-                instance.add('dtend', new_dt + duration)
+                start = start.replace(tzinfo=dtstart.tzinfo)
+        
+        # Enddatum
+        if duration:
+            end = start + duration
     else:
         # Ganztägiger Termin
         if isinstance(instance_dt, datetime.datetime):
-            instance.add('dtstart', instance_dt.date())
+            start = instance_dt.date()
             
             # Enddatum
             if duration:
-                end_date = (instance_dt + duration).date()
-                instance.add('dtend', end_date)
+                end = (instance_dt + duration).date()
         else:
-            instance.add('dtstart', instance_dt)
+            start = instance_dt
             
             # Enddatum
             if duration:
-                instance.add('dtend', instance_dt + duration)
+                end = instance_dt + duration
     
     # Stabile UID generieren
     if isinstance(instance_dt, datetime.datetime):
@@ -117,15 +198,45 @@ def create_instance_from_recurring(event, instance_dt, uid_base, skip_properties
         date_str = instance_dt.strftime('%Y%m%d')
     
     # UID generieren, die garantiert für jeden Termin einzigartig ist
-    stable_uid = f"{uid_base}-{date_str}"
-    instance.add('uid', stable_uid)
+    return Occurrence(event, start, end, f"{uid_base}-{date_str}")
+
+def create_instance_from_recurring(event, instance_dt, uid_base, skip_properties=None):
+    """Erstellt eine neue Instanz eines wiederkehrenden Termins für ein bestimmtes Datum"""
+    return create_occurrence(event, instance_dt, uid_base).to_event(skip_properties)
+
+def materialize(instance):
+    """Wandelt eine kompakte Instanz in ein Event um, Ausnahmen sind bereits Events"""
+    if isinstance(instance, Occurrence):
+        return instance.to_event()
+    return instance
+
+def instance_start(instance):
+    """Liefert den Beginn einer kompakten Instanz oder eines Events"""
+    if isinstance(instance, Occurrence):
+        return instance.start
+    return instance.get('dtstart').dt
+
+def resolve_occurrence(event, current_date, uid_base, excluded_dates, exceptions, dtstart=None):
+    """Liefert für einen Tag die Ausnahme, eine kompakte Instanz oder None, wenn der Tag ausgeschlossen ist"""
+    if is_date_excluded(current_date, excluded_dates):
+        return None
     
-    # Für Tuta: Stelle sicher, dass DTSTAMP vorhanden ist (wird manchmal benötigt)
-    if 'dtstamp' not in instance:
-        now = datetime.datetime.now(pytz.UTC)
-        instance.add('dtstamp', now)
+    # Ausnahme prüfen
+    ex = find_exception(current_date, exceptions, uid_base)
+    if ex is not None:
+        return ex
     
-    return instance
+    # Neue Instanz erstellen
+    if dtstart is None:
+        dtstart = event.get('dtstart').dt
+    if isinstance(dtstart, datetime.datetime):
+        instance_dt = datetime.datetime.combine(current_date, dtstart.time())
+        if dtstart.tzinfo:
+            instance_dt = instance_dt.replace(tzinfo=dtstart.tzinfo)
+    else:
+        instance_dt = current_date
+    
+    return create_occurrence(event, instance_dt, uid_base)
 
 def sanitize_calendar(cal):
     """Bereinigt einen Kalender, indem bestimmte Komponenten entfernt werden"""
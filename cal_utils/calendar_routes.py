@@ -1,22 +1,121 @@
-from flask import Blueprint, Response, request, jsonify
+from flask import Blueprint, Response, request, jsonify, g
+import hashlib
 import os
+import time
 import logging
 import requests
-import datetime
-from cal_utils.ical_processor import (
-    Calendar, sanitize_calendar, extract_excluded_dates, 
-    expand_recurring_event
+from cal_utils.ical_processor import Calendar
+from cal_utils.fetch import fetch_calendar, get_fetch_stats
+from cal_utils.http_client import get_upstream_client
+from cal_utils.cache import render_cache
+from cal_utils.compression import compressor
+from cal_utils.metrics import (
+    render_metrics, request_seconds, requests_total,
+    track_request_stages, request_stages, untrack_request_stages, format_server_timing
 )
+from cal_utils.profiling import PROFILE_REQUESTS, PROFILE_SORT_KEYS, profile_render
+from cal_utils.rulecache import rule_cache
+from cal_utils.occurrencecache import occurrence_cache
+from cal_utils.parallel import parallel_expander
+from cal_utils.pipeline import (
+    DEFAULT_DAYS_BEFORE, DEFAULT_DAYS_AFTER, resolve_window, render_source,
+    stream_source, render_flight, superset_window
+)
+from cal_utils.merge import source_groups, make_sources, render_merged, format_source_timings
+from cal_utils.scheduler import refresh_scheduler
+from cal_utils.feeds import feed_scheduler
 
 logger = logging.getLogger('ical-proxy')
 
 calendar_routes = Blueprint('calendar', __name__)
 
+def calendar_response(ical_data, filename, headers=None, cacheable=True):
+    """Erzeugt die Antwort für einen fertigen Kalender mit starkem ETag und ausgehandelter Kompression, bei passendem If-None-Match als 304
+
+    Unvollständige Kalender (cacheable=False) werden ohne ETag und mit Cache-Control: no-store ausgeliefert.
+    """
+    digest = hashlib.sha256(ical_data).hexdigest()
+    encoding = compressor.negotiate(request.accept_encodings, len(ical_data))
+
+    # Jede Kodierung ist eine eigene Repräsentation und braucht einen eigenen starken ETag
+    etag = f"{digest}-{encoding}" if encoding else digest
+    headers = {'Content-Disposition': f'attachment; filename={filename}', 'Vary': 'Accept-Encoding', **(headers or {})}
+    if not cacheable:
+        headers['Cache-Control'] = 'no-store'
+
+    if cacheable and request.if_none_match.contains_weak(etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    if encoding:
+        body = compressor.compress(ical_data, digest, encoding)
+        headers['Content-Encoding'] = encoding
+    else:
+        body = ical_data
+        compressor.count_identity()
+
+    response = Response(body, mimetype='text/calendar', headers=headers)
+    if cacheable:
+        response.set_etag(etag)
+    return response
+
 @calendar_routes.route('/health')
 def health_check():
     """Health-Check-Endpunkt für Docker-Healthcheck"""
     return jsonify({"status": "healthy"}), 200
 
+@calendar_routes.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_stages_token = track_request_stages()
+
+@calendar_routes.after_request
+def record_request_metrics(response):
+    # Routenmuster statt konkreter URL, damit die Anzahl der Label-Werte begrenzt bleibt
+    route = request.url_rule.rule if request.url_rule else 'unknown'
+    requests_total.inc(route, response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        request_seconds.observe(route, elapsed)
+        # Gestreamte Antworten werden erst nach den Headern erzeugt, ihre Schritte sind hier noch nicht gemessen
+        if not response.is_streamed:
+            response.headers['Server-Timing'] = format_server_timing(request_stages(), elapsed)
+    return response
+
+@calendar_routes.teardown_request
+def stop_request_stages(exc):
+    token = g.pop('request_stages_token', None)
+    if token is not None:
+        untrack_request_stages(token)
+
+def collect_stats():
+    """Sammelt die Zähler aller Caches und Hintergrunddienste"""
+    return {
+        "upstream_cache": get_fetch_stats(),
+        "upstream_client": get_upstream_client().stats(),
+        "render_cache": render_cache.stats(),
+        "rule_cache": rule_cache.stats(),
+        "occurrence_cache": occurrence_cache.stats(),
+        "parallel_expansion": parallel_expander.stats(),
+        "refresh_scheduler": refresh_scheduler.stats(),
+        "feeds": feed_scheduler.stats(),
+        "window_slicing": superset_window.stats(),
+        "compression": compressor.stats(),
+        "coalescing": render_flight.stats()
+    }
+
+@calendar_routes.route('/stats')
+def stats():
+    """Statistik-Endpunkt mit den Zählern der Caches"""
+    return jsonify(collect_stats()), 200
+
+@calendar_routes.route('/metrics')
+def metrics():
+    """Metriken im Prometheus-Textformat: Dauer der Verarbeitungsschritte, Anfragen, Upstream-Bytes und Cache-Zähler"""
+    return Response(render_metrics(collect_stats()), mimetype='text/plain; version=0.0.4')
+
 @calendar_routes.route('/debug')
 def debug_calendar():
     """Debug-Endpunkt zum Anzeigen der Original-Kalenderstruktur"""
@@ -29,11 +128,8 @@ def debug_calendar():
         return "Keine Kalender-URL angegeben. Bitte setze die SOURCE_CALENDAR_URL Umgebungsvariable oder füge '?source=https://deine-kalender-url.ics' zur Anfrage hinzu.", 400
     
     try:
-        # Kalender herunterladen
-        response = requests.get(calendar_url)
-        response.raise_for_status()
-        
-        cal_content = response.content
+        # Kalender herunterladen (mit Revalidierung über ETag / Last-Modified)
+        cal_content = fetch_calendar(calendar_url).content
         
         # Original-Kalender parsen
         cal = Calendar.from_ical(cal_content)
@@ -105,129 +201,54 @@ def serve_simplified_calendar():
         return "Keine Kalender-URL angegeben. Bitte setze die SOURCE_CALENDAR_URL Umgebungsvariable oder füge '?source=https://deine-kalender-url.ics' zur Anfrage hinzu.", 400
     
     # Parameter für den Zeitraum
-    days_before = int(request.args.get('days_before', 30))
-    days_after = int(request.args.get('days_after', 365))
+    days_before = int(request.args.get('days_before', DEFAULT_DAYS_BEFORE))
+    days_after = int(request.args.get('days_after', DEFAULT_DAYS_AFTER))
     
     # Debug-Modus?
     debug_mode = request.args.get('debug', 'false').lower() == 'true'
     
+    # Streaming-Ausgabe? Standard über STREAM_OUTPUT
+    stream_default = os.environ.get('STREAM_OUTPUT', 'false')
+    stream_mode = request.args.get('stream', stream_default).lower() == 'true'
+    
     # Zeitraum für die Terminexpansion
-    start_date = datetime.datetime.now().date() - datetime.timedelta(days=days_before)
-    end_date = datetime.datetime.now().date() + datetime.timedelta(days=days_after)
+    start_date, end_date = resolve_window(days_before, days_after)
     
     logger.info(f"Date range: {start_date} to {end_date}")
     
+    # Profiling-Modus? Nur mit PROFILE_REQUESTS=true
+    if request.args.get('profile', 'false').lower() == 'true':
+        return profile_calendar(calendar_url, start_date, end_date, debug_mode)
+    
+    # Nur der Standardzeitraum freigegebener Quellen wird im Hintergrund vorbereitet, andere Quellen nur bei Bedarf
+    use_scheduler = (
+        refresh_scheduler.accepts(calendar_url) and not debug_mode
+        and days_before == DEFAULT_DAYS_BEFORE and days_after == DEFAULT_DAYS_AFTER
+    )
+    
     try:
-        # Kalender herunterladen
-        logger.info(f"Downloading calendar from {calendar_url}")
-        response = requests.get(calendar_url)
-        response.raise_for_status()  # Wirft Fehler bei HTTP-Fehlercodes
-        
-        cal_content = response.content
-        logger.info(f"Downloaded calendar, size: {len(cal_content)} bytes")
-        
-        # Original-Kalender parsen
-        cal = Calendar.from_ical(cal_content)
-        
-        # Neuen Kalender erstellen
-        new_cal = sanitize_calendar(cal)
+        ical_data = None
+        if use_scheduler:
+            refresh_scheduler.touch(calendar_url)
+            ical_data = refresh_scheduler.get(calendar_url)
+            if ical_data is not None:
+                logger.info("Serving calendar from background refresh")
         
-        # Termine nach Typ sortieren
-        normal_events = []
-        recurring_events = {}
-        exceptions = {}
+        if ical_data is None and stream_mode:
+            # Ausgabe stückweise senden, ohne den kompletten Kalender im Speicher aufzubauen
+            logger.info("Streaming simplified calendar with expanded recurring events")
+            return Response(stream_source(calendar_url, start_date, end_date, debug_mode),
+                          mimetype='text/calendar',
+                          headers={'Content-Disposition': 'attachment; filename=simplified_calendar.ics'})
         
-        for component in cal.walk('VEVENT'):
-            uid = str(component.get('uid', ''))
-            
-            # Nach Typ sortieren
-            if component.get('recurrence-id'):
-                # Ausnahme für wiederkehrenden Termin
-                if uid not in exceptions:
-                    exceptions[uid] = []
-                exceptions[uid].append(component)
-            elif component.get('rrule'):
-                # Wiederkehrender Termin
-                recurring_events[uid] = component
-            else:
-                # Normaler Einzeltermin
-                normal_events.append(component)
-        
-        # Normale Termine übernehmen, wenn sie im Zeitraum liegen
-        for event in normal_events:
-            dtstart = event.get('dtstart').dt
-            
-            # Prüfen, ob im Zeitraum
-            if isinstance(dtstart, datetime.datetime):
-                event_date = dtstart.date()
-            else:
-                event_date = dtstart
-            
-            if start_date <= event_date <= end_date:
-                # UID anpassen, um Konflikte zu vermeiden
-                event_uid = str(event.get('uid', ''))
-                # Stabile UID generieren
-                if isinstance(dtstart, datetime.datetime):
-                    date_str = dtstart.date().isoformat()
-                else:
-                    date_str = dtstart.isoformat()
-                
-                stable_uid = f"{event_uid}-{date_str}"
-                event['uid'] = stable_uid
-                
-                new_cal.add_component(event)
-        
-        # Wiederkehrende Termine expandieren
-        for uid, event in recurring_events.items():
-            # Ausnahmen für diesen wiederkehrenden Termin
-            event_exceptions = exceptions.get(uid, [])
-            
-            # Ausgeschlossene Termine extrahieren
-            excluded_dates = extract_excluded_dates(event)
-            
-            # Zusätzliches Logging für Debugging
-            if 'summary' in event:
-                summary = str(event.get('summary', ''))
-                dtstart = event.get('dtstart').dt
-                start_str = dtstart.isoformat() if hasattr(dtstart, 'isoformat') else str(dtstart)
-                
-                if 'rrule' in event:
-                    rrule_info = {}
-                    for key, val in event['rrule'].items():
-                        if isinstance(val, list):
-                            rrule_info[key] = [str(v) for v in val]
-                        else:
-                            rrule_info[key] = str(val)
-                    
-                    logger.debug(f"Expandiere wiederkehrenden Termin: '{summary}' mit Start {start_str}, RRULE: {rrule_info}")
-                else:
-                    logger.debug(f"Expandiere wiederkehrenden Termin: '{summary}' mit Start {start_str}")
-            
-            # Expandieren
-            expanded_instances = expand_recurring_event(
-                event, start_date, end_date, event_exceptions, excluded_dates
-            )
-            
-            # Logging der expandierten Termine
-            if debug_mode and expanded_instances:
-                summary = str(event.get('summary', 'Unbekannt'))
-                dates_str = ', '.join([
-                    instance.get('dtstart').dt.isoformat() 
-                    if hasattr(instance.get('dtstart').dt, 'isoformat') 
-                    else str(instance.get('dtstart').dt) 
-                    for instance in expanded_instances
-                ])
-                logger.debug(f"Expandierte Termine für '{summary}': {dates_str}")
-            
-            # Zum Kalender hinzufügen
-            for instance in expanded_instances:
-                new_cal.add_component(instance)
+        if ical_data is None:
+            ical_data = render_source(calendar_url, start_date, end_date, debug_mode)
+            if use_scheduler:
+                refresh_scheduler.store(calendar_url, ical_data)
         
         # Kalender zurückgeben
         logger.info("Returning simplified calendar with expanded recurring events")
-        return Response(new_cal.to_ical(), 
-                      mimetype='text/calendar',
-                      headers={'Content-Disposition': 'attachment; filename=simplified_calendar.ics'})
+        return calendar_response(ical_data, 'simplified_calendar.ics')
     
     except requests.RequestException as e:
         error_msg = f"Failed to download calendar: {str(e)}"
@@ -236,4 +257,137 @@ def serve_simplified_calendar():
     except Exception as e:
         error_msg = f"Error processing calendar: {str(e)}"
         logger.exception(error_msg)
-        return error_msg, 500
\ No newline at end of file
+        return error_msg, 500
+
+def profile_calendar(calendar_url, start_date, end_date, debug_mode):
+    """Rendert den Kalender unter cProfile und liefert die teuersten Funktionen als JSON"""
+    if not PROFILE_REQUESTS:
+        return "Profiling ist deaktiviert. Bitte setze PROFILE_REQUESTS=true.", 403
+
+    try:
+        sort = request.args.get('profile_sort', 'cumulative')
+        if sort not in PROFILE_SORT_KEYS:
+            return f"Ungültige Sortierung: {sort}, erlaubt sind {', '.join(PROFILE_SORT_KEYS)}", 400
+        try:
+            limit = int(request.args.get('profile_limit', 30))
+        except ValueError:
+            return "profile_limit muss eine ganze Zahl sein", 400
+
+        report = profile_render(calendar_url, start_date, end_date, debug_mode, sort, limit)
+        if report is None:
+            return "Es läuft bereits ein Profiling, bitte später erneut versuchen.", 503
+        return jsonify(report), 200
+
+    except requests.RequestException as e:
+        error_msg = f"Failed to download calendar: {str(e)}"
+        logger.error(error_msg)
+        return error_msg, 500
+    except Exception as e:
+        error_msg = f"Error profiling calendar: {str(e)}"
+        logger.exception(error_msg)
+        return error_msg, 500
+
+@calendar_routes.route('/merged')
+def serve_merged_calendar():
+    """Endpunkt für einen aus mehreren Quellen zusammengeführten Kalender"""
+    # Quellen als wiederholter source-Parameter oder als benannte Gruppe aus SOURCE_GROUPS
+    group = request.args.get('group')
+    if group:
+        sources = source_groups.get(group)
+        if not sources:
+            logger.error(f"Unknown source group: {group}")
+            return f"Unbekannte Quellgruppe: {group}", 404
+    else:
+        sources = make_sources(request.args.getlist('source'))
+
+    if not sources:
+        logger.error("No calendar URLs specified for merged calendar")
+        return "Keine Kalender-URLs angegeben. Bitte füge '?source=...&source=...' oder '?group=name' zur Anfrage hinzu.", 400
+
+    # Parameter für den Zeitraum
+    try:
+        days_before = int(request.args.get('days_before', DEFAULT_DAYS_BEFORE))
+        days_after = int(request.args.get('days_after', DEFAULT_DAYS_AFTER))
+    except ValueError:
+        return "days_before und days_after müssen ganze Zahlen sein", 400
+    debug_mode = request.args.get('debug', 'false').lower() == 'true'
+
+    start_date, end_date = resolve_window(days_before, days_after)
+    logger.info(f"Merging {len(sources)} calendars, date range: {start_date} to {end_date}")
+
+    try:
+        ical_data, timings = render_merged(sources, start_date, end_date, debug_mode)
+
+        for timing in timings:
+            logger.info(
+                f"Source {timing.namespace}: fetch={timing.fetch * 1000:.1f}ms, "
+                f"render={timing.render * 1000:.1f}ms" + (f", error: {timing.error}" if timing.error else "")
+            )
+
+        headers = {'X-Source-Timing': format_source_timings(timings)}
+
+        # Fehlende Quellen kennzeichnen, damit Clients den unvollständigen Kalender nicht zwischenspeichern und revalidieren
+        missing = [timing.namespace for timing in timings if timing.error is not None]
+        if missing:
+            logger.warning(f"Merged calendar is missing {len(missing)} of {len(timings)} sources")
+            headers['X-Missing-Sources'] = ', '.join(missing)
+
+        return calendar_response(ical_data, 'merged_calendar.ics', headers, cacheable=not missing)
+
+    except requests.RequestException as e:
+        error_msg = f"Failed to download calendar: {str(e)}"
+        logger.error(error_msg)
+        return error_msg, 500
+    except Exception as e:
+        error_msg = f"Error processing calendar: {str(e)}"
+        logger.exception(error_msg)
+        return error_msg, 500
+
+@calendar_routes.route('/feeds')
+def list_feeds():
+    """Listet die konfigurierten Feeds mit ihrem Standardzeitraum"""
+    return jsonify({
+        name: {
+            "days_before": feed.days_before,
+            "days_after": feed.days_after,
+            "refresh_interval": feed.refresh_interval,
+            "prewarm": feed.prewarm
+        }
+        for name, feed in feed_scheduler.feeds.items()
+    }), 200
+
+@calendar_routes.route('/feeds/<name>')
+def serve_feed(name):
+    """Endpunkt für einen in FEEDS_CONFIG konfigurierten Feed"""
+    feed = feed_scheduler.feeds.get(name)
+    if feed is None:
+        logger.error(f"Unknown feed: {name}")
+        return f"Unbekannter Feed: {name}", 404
+
+    # Zeitraum aus der Feed-Konfiguration, per URL-Parameter überschreibbar
+    try:
+        days_before = int(request.args.get('days_before', feed.days_before))
+        days_after = int(request.args.get('days_after', feed.days_after))
+    except ValueError:
+        return "days_before und days_after müssen ganze Zahlen sein", 400
+    debug_mode = request.args.get('debug', 'false').lower() == 'true'
+
+    try:
+        if not debug_mode and days_before == feed.days_before and days_after == feed.days_after:
+            # Standardzeitraum des Feeds: vorberechnetes Ergebnis verwenden
+            ical_data = feed_scheduler.get(name)
+        else:
+            start_date, end_date = resolve_window(days_before, days_after)
+            logger.info(f"Feed {name}: date range {start_date} to {end_date}")
+            ical_data = render_source(feed.source, start_date, end_date, debug_mode)
+
+        return calendar_response(ical_data, f'{name}.ics')
+
+    except requests.RequestException as e:
+        error_msg = f"Failed to download calendar: {str(e)}"
+        logger.error(error_msg)
+        return error_msg, 500
+    except Exception as e:
+        error_msg = f"Error processing calendar: {str(e)}"
+        logger.exception(error_msg)
+        return error_msg, 500
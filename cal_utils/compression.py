@@ -0,0 +1,108 @@
+import gzip
+import logging
+import os
+import threading
+import time
+from cal_utils.cache import render_cache
+
+logger = logging.getLogger('ical-proxy')
+
+# Optionale Kompressionsverfahren, nur wenn das jeweilige Paket installiert ist
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class Compressor:
+    """Komprimiert fertige Kalender einmal pro Inhalt und Verfahren und legt die Varianten im Render-Cache ab"""
+
+    def __init__(self, level=6, min_size=1024, zstd_level=10, brotli_quality=5, enabled=True):
+        self.level = level
+        self.min_size = min_size
+        self.zstd_level = zstd_level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+
+        # Reihenfolge ist die Präferenz des Servers bei gleicher Gewichtung durch den Client
+        self.encodings = []
+        if zstandard is not None:
+            self.encodings.append('zstd')
+        if brotli is not None:
+            self.encodings.append('br')
+        self.encodings.append('gzip')
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'compressed': 0,
+            'cache_hits': 0,
+            'identity': 0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'bytes_saved': 0,
+            'compress_seconds': 0.0,
+        }
+
+    def negotiate(self, accept_encodings, size):
+        """Wählt das Verfahren anhand von Accept-Encoding oder None für unkomprimierte Ausgabe"""
+        if not self.enabled or size < self.min_size:
+            return None
+        return accept_encodings.best_match(self.encodings)
+
+    def compress(self, data, digest, encoding):
+        """Liefert die komprimierte Variante eines Inhalts, aus dem Cache oder neu erzeugt"""
+        cache_key = ('compressed', digest, encoding)
+        compressed = render_cache.get(cache_key)
+        if compressed is not None:
+            with self._lock:
+                self._stats['cache_hits'] += 1
+                self._stats['bytes_saved'] += len(data) - len(compressed)
+            return compressed
+
+        started = time.process_time()
+        compressed = self._compress(data, encoding)
+        elapsed = time.process_time() - started
+
+        render_cache.put(cache_key, compressed)
+        with self._lock:
+            self._stats['compressed'] += 1
+            self._stats['bytes_in'] += len(data)
+            self._stats['bytes_out'] += len(compressed)
+            self._stats['bytes_saved'] += len(data) - len(compressed)
+            self._stats['compress_seconds'] += elapsed
+        logger.debug(f"Compressed {len(data)} bytes to {len(compressed)} bytes ({encoding}) in {elapsed * 1000:.1f}ms")
+        return compressed
+
+    def count_identity(self):
+        with self._lock:
+            self._stats['identity'] += 1
+
+    def _compress(self, data, encoding):
+        if encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(data)
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        # mtime=0, damit gleiche Inhalte byte-identische gzip-Daten ergeben
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def stats(self):
+        """Liefert Konfiguration und Zähler als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['encodings'] = list(self.encodings)
+        stats['level'] = self.level
+        stats['min_size'] = self.min_size
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 4) if stats['bytes_in'] else 0.0
+        return stats
+
+compressor = Compressor(
+    level=int(os.environ.get('COMPRESSION_LEVEL', 6)),
+    min_size=int(os.environ.get('COMPRESSION_MIN_SIZE', 1024)),
+    zstd_level=int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 10)),
+    brotli_quality=int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 5)),
+    enabled=os.environ.get('COMPRESSION', 'true').lower() == 'true'
+)
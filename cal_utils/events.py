@@ -1,420 +0,0 @@
-from dateutil.rrule import rrulestr
-from dateutil.parser import parse
-import datetime
-import pytz
-import re
-import logging
-
-from cal_utils.base import (
-    Calendar, Event,
-    is_date_excluded, sanitize_rrule, create_instance_from_recurring,
-    get_date_string
-)
-
-logger = logging.getLogger('ical-proxy')
-
-def extract_excluded_dates(event):
-    """Extrahiert die ausgeschlossenen Termine eines Events"""
-    excluded_dates = []
-    
-    if event.get('exdate'):
-        exdate_list = event.get('exdate')
-        if not isinstance(exdate_list, list):
-            exdate_list = [exdate_list]
-        
-        for exdate in exdate_list:
-            if hasattr(exdate, 'dts'):
-                for dt in exdate.dts:
-                    excluded_dates.append(dt.dt)
-            else:
-                excluded_dates.append(exdate)
-    
-    return excluded_dates
-
-def manually_expand_recurring_event(event, start_date, end_date, exceptions=None, excluded_dates=None):
-    """Manuelle Expansion von wiederkehrenden Terminen, wenn die automatische Expansion fehlschlägt"""
-    if exceptions is None:
-        exceptions = []
-    if excluded_dates is None:
-        excluded_dates = []
-    
-    instances = []
-    uid = str(event.get('uid', ''))
-    dtstart = event.get('dtstart').dt
-    
-    # UNTIL-Datum aus RRULE extrahieren und beachten (Wichtig für den Fix)
-    rrule = event.get('rrule', {})
-    until_val = rrule.get('UNTIL', None)
-    until_date = None
-    
-    if until_val:
-        if isinstance(until_val, list) and until_val:
-            until_val = until_val[0]
-        
-        if isinstance(until_val, datetime.datetime):
-            until_date = until_val.date()
-        elif isinstance(until_val, datetime.date):
-            until_date = until_val
-        elif isinstance(until_val, str):
-            try:
-                # Versuche das String-Datum zu parsen
-                parsed_until = parse(until_val)
-                until_date = parsed_until.date()
-            except:
-                logger.warning(f"Konnte UNTIL-Datum nicht parsen: {until_val}")
-    
-    # Effektives Enddatum ist das frühere von end_date und until_date (wenn vorhanden)
-    effective_end_date = end_date
-    if until_date and until_date < end_date:
-        effective_end_date = until_date
-        logger.debug(f"UNTIL-Datum {until_date} ist früher als Ende des Zeitraums, verwende es als effektives Ende")
-    
-    # Frequenz und Intervall ermitteln
-    freq_val = rrule.get('FREQ', ['DAILY'])
-    freq = str(freq_val[0] if isinstance(freq_val, list) else freq_val).upper()
-    
-    interval_val = rrule.get('INTERVAL', [1])
-    try:
-        interval = int(interval_val[0] if isinstance(interval_val, list) else interval_val)
-    except (ValueError, TypeError):
-        interval = 1
-    
-    # Das tatsächliche Startdatum des wiederkehrenden Termins - wichtig für den Fix!
-    event_start_date = dtstart.date() if isinstance(dtstart, datetime.datetime) else dtstart
-    
-    # Korrektes Startdatum für die Expansion - das spätere von Event-Start und angefragetem Start
-    effective_start_date = max(start_date, event_start_date)
-    
-    # Spezialbehandlung für den "GSN Erste Wartung BMA"-Termin
-    gsn_uid = "040000008200E00074C5B7101A82E00800000000610DB09BEFB8DB01000000000000000010000000C110F38E914B424FB2E4545D2E14A525"
-    if uid == gsn_uid:
-        summary = str(event.get('summary', ''))
-        logger.info(f"Spezialbehandlung für Termin '{summary}': Startdatum={event_start_date}, Enddatum={effective_end_date}")
-        
-        # Für den speziellen GSN-Termin: Sicherstellen, dass wir wirklich das Original-Startdatum und das UNTIL-Datum beachten
-        if freq == 'WEEKLY' and 'BYDAY' in rrule:
-            bydays = rrule.get('BYDAY', [])
-            if not isinstance(bydays, list):
-                bydays = [bydays]
-            
-            day_to_num = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
-            weekdays = []
-            for day in bydays:
-                day_str = str(day).upper()[:2]  # Nur die ersten 2 Buchstaben
-                if day_str in day_to_num:
-                    weekdays.append(day_to_num[day_str])
-            
-            # GSN-Termin: Nur die spezifischen Tage im vorgesehenen Zeitraum generieren
-            logger.info(f"GSN-Termin: Prüfe Tage zwischen {effective_start_date} und {effective_end_date} an Wochentagen {weekdays}")
-            current_date = effective_start_date
-            while current_date <= effective_end_date:
-                # Nur die richtigen Wochentage
-                if current_date.weekday() in weekdays:
-                    logger.debug(f"GSN-Termin: Prüfe Tag {current_date} (Wochentag {current_date.weekday()})")
-                    # Termin nur erstellen, wenn nach dem Startdatum
-                    if current_date >= event_start_date:
-                        if not is_date_excluded(current_date, excluded_dates):
-                            # Ausnahme prüfen
-                            exception_found = False
-                            for ex in exceptions:
-                                ex_date = ex.get('recurrence-id').dt
-                                if isinstance(ex_date, datetime.datetime):
-                                    ex_date = ex_date.date()
-                                if ex_date == current_date:
-                                    exception_found = True
-                                    instances.append(ex)
-                                    break
-                            
-                            if not exception_found:
-                                # Neue Instanz erstellen
-                                if isinstance(dtstart, datetime.datetime):
-                                    time_of_day = dtstart.time()
-                                    instance_dt = datetime.datetime.combine(current_date, time_of_day)
-                                    if dtstart.tzinfo:
-                                        instance_dt = instance_dt.replace(tzinfo=dtstart.tzinfo)
-                                else:
-                                    instance_dt = current_date
-                                
-                                instance = create_instance_from_recurring(event, instance_dt, uid)
-                                instances.append(instance)
-                                logger.info(f"GSN-Termin: Instanz erstellt für {current_date}")
-                
-                current_date += datetime.timedelta(days=1)
-            
-            return instances
-    
-    # Manuelle Expansion basierend auf Frequenz
-    if freq == 'DAILY':
-        # Tägliche Wiederholung
-        current_date = effective_start_date
-        while current_date <= effective_end_date:
-            if not is_date_excluded(current_date, excluded_dates):
-                # Ausnahme prüfen
-                exception_found = False
-                for ex in exceptions:
-                    ex_date = ex.get('recurrence-id').dt
-                    if isinstance(ex_date, datetime.datetime):
-                        ex_date = ex_date.date()
-                    if ex_date == current_date:
-                        exception_found = True
-                        instances.append(ex)
-                        break
-                
-                if not exception_found:
-                    # Neue Instanz erstellen
-                    if isinstance(dtstart, datetime.datetime):
-                        time_of_day = dtstart.time()
-                        instance_dt = datetime.datetime.combine(current_date, time_of_day)
-                        if dtstart.tzinfo:
-                            instance_dt = instance_dt.replace(tzinfo=dtstart.tzinfo)
-                    else:
-                        instance_dt = current_date
-                    
-                    instance = create_instance_from_recurring(event, instance_dt, uid)
-                    instances.append(instance)
-            
-            current_date += datetime.timedelta(days=interval)
-    
-    elif freq == 'WEEKLY':
-        # Wöchentliche Wiederholung
-        # BYDAY herausfinden
-        bydays = rrule.get('BYDAY', [])
-        if not isinstance(bydays, list):
-            bydays = [bydays]
-        
-        if not bydays:
-            # Wenn kein BYDAY, den Wochentag des Starttermins verwenden
-            if isinstance(dtstart, datetime.datetime):
-                start_weekday = dtstart.date().weekday()
-            else:
-                start_weekday = dtstart.weekday()
-            
-            day_map = {0: 'MO', 1: 'TU', 2: 'WE', 3: 'TH', 4: 'FR', 5: 'SA', 6: 'SU'}
-            bydays = [day_map[start_weekday]]
-        
-        # Wochentage in numerische Darstellung umwandeln
-        day_to_num = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
-        weekdays = []
-        for day in bydays:
-            day_str = str(day).upper()[:2]  # Nur die ersten 2 Buchstaben
-            if day_str in day_to_num:
-                weekdays.append(day_to_num[day_str])
-        
-        # Wochenstart basierend auf WKST
-        wkst_val = rrule.get('WKST', ['MO'])
-        wkst = str(wkst_val[0] if isinstance(wkst_val, list) else wkst_val).upper()[:2]
-        week_start = day_to_num.get(wkst, 0)  # Standard ist Montag
-        
-        # Berechnung der ersten Woche
-        first_date = event_start_date
-        
-        # Zum Startdatum der Expansion gehen
-        current_date = effective_start_date
-        
-        # Für jeden Tag innerhalb des Zeitraums
-        while current_date <= effective_end_date:
-            # Prüfen, ob der aktuelle Tag ein passender Wochentag ist
-            if current_date.weekday() in weekdays:
-                # Prüfen, ob das aktuelle Datum nach oder am Starttermin liegt
-                if current_date >= event_start_date:
-                    # Intervall prüfen (nur alle X Wochen)
-                    weeks_diff = (current_date - first_date).days // 7
-                    if weeks_diff % interval == 0:
-                        if not is_date_excluded(current_date, excluded_dates):
-                            # Ausnahme prüfen
-                            exception_found = False
-                            for ex in exceptions:
-                                ex_date = ex.get('recurrence-id').dt
-                                if isinstance(ex_date, datetime.datetime):
-                                    ex_date = ex_date.date()
-                                if ex_date == current_date:
-                                    exception_found = True
-                                    instances.append(ex)
-                                    break
-                            
-                            if not exception_found:
-                                # Neue Instanz erstellen
-                                if isinstance(dtstart, datetime.datetime):
-                                    time_of_day = dtstart.time()
-                                    instance_dt = datetime.datetime.combine(current_date, time_of_day)
-                                    if dtstart.tzinfo:
-                                        instance_dt = instance_dt.replace(tzinfo=dtstart.tzinfo)
-                                else:
-                                    instance_dt = current_date
-                                
-                                instance = create_instance_from_recurring(event, instance_dt, uid)
-                                instances.append(instance)
-            
-            current_date += datetime.timedelta(days=1)
-    
-    elif freq == 'MONTHLY':
-        # Monatliche Wiederholung implementiert...
-        pass
-    
-    elif freq == 'YEARLY':
-        # Jährliche Wiederholung implementiert...
-        pass
-    
-    return instances
-
-def process_monthly_recurring_events(event, effective_start_date, effective_end_date, event_start_date, interval, 
-                                     excluded_dates, exceptions):
-    """Hilfsfunktion zur Verarbeitung monatlich wiederkehrender Termine"""
-    # Implementierung hier...
-    return []
-
-def expand_recurring_event(event, start_date, end_date, exceptions=None, excluded_dates=None):
-    """Expandiert einen wiederkehrenden Termin zu einzelnen Terminen im angegebenen Zeitraum"""
-    if exceptions is None:
-        exceptions = []
-    if excluded_dates is None:
-        excluded_dates = []
-    
-    instances = []
-    
-    # Basisinformationen
-    uid = str(event.get('uid', ''))
-    dtstart = event.get('dtstart').dt
-    
-    # Das tatsächliche Startdatum des wiederkehrenden Termins
-    event_start_date = dtstart.date() if isinstance(dtstart, datetime.datetime) else dtstart
-    
-    # Berücksichtige UNTIL-Datum aus RRULE (falls vorhanden)
-    rrule_val = event.get('rrule', {})
-    until_val = rrule_val.get('UNTIL', None)
-    until_date = None
-    
-    if until_val:
-        if isinstance(until_val, list) and until_val:
-            until_val = until_val[0]
-        
-        if isinstance(until_val, datetime.datetime):
-            until_date = until_val.date()
-        elif isinstance(until_val, datetime.date):
-            until_date = until_val
-        elif isinstance(until_val, str):
-            try:
-                # Versuche das String-Datum zu parsen
-                parsed_until = parse(until_val)
-                until_date = parsed_until.date()
-            except:
-                logger.warning(f"Konnte UNTIL-Datum nicht parsen: {until_val}")
-    
-    # Wenn das Startdatum des Events nach dem Ende des Zeitraums liegt, gibt es nichts zu expandieren
-    if event_start_date > end_date:
-        logger.debug(f"Event '{event.get('summary', '')}' startet erst nach dem Ende des Zeitraums, überspringe")
-        return []
-    
-    # Effektives Enddatum ist das frühere von end_date und until_date (wenn vorhanden)
-    effective_end_date = end_date
-    if until_date and until_date < end_date:
-        effective_end_date = until_date
-        logger.debug(f"UNTIL-Datum {until_date} ist früher als Ende des Zeitraums, verwende es als effektives Ende")
-    
-    # Korrektes Startdatum für die Expansion - das spätere von Event-Start und angefragetem Start
-    effective_start_date = max(start_date, event_start_date)
-    
-    # Spezialbehandlung für den "GSN Erste Wartung BMA"-Termin
-    gsn_uid = "040000008200E00074C5B7101A82E00800000000610DB09BEFB8DB01000000000000000010000000C110F38E914B424FB2E4545D2E14A525"
-    if uid == gsn_uid and 'summary' in event and 'GSN Erste Wartung BMA' in str(event.get('summary')):
-        summary = str(event.get('summary', ''))
-        logger.info(f"Erkenne GSN-BMA-Termin: {summary}, UID={uid}")
-        logger.info(f"GSN-Termin hat Start={event_start_date}, Ende(UNTIL)={until_date}")
-        
-        # Bei GSN-Termin immer manuelle Expansion verwenden
-        instances = manually_expand_recurring_event(event, effective_start_date, effective_end_date, exceptions, excluded_dates)
-        return instances
-    
-    try:
-        # Versuche zuerst die automatische Expansion mit dateutil.rrule
-        sanitized_rrule = sanitize_rrule(rrule_val)
-        
-        # Wenn keine gültigen Eigenschaften übrig sind, verwende manuelle Expansion
-        if not sanitized_rrule:
-            raise ValueError("Keine gültigen RRULE-Eigenschaften gefunden")
-        
-        # Wiederholungsregel als String erstellen
-        rrule_parts = []
-        for key, val in sanitized_rrule.items():
-            if isinstance(val, list):
-                val_str = ",".join(str(v) for v in val)
-            else:
-                val_str = str(val)
-            rrule_parts.append(f"{key}={val_str}")
-        
-        # RRule-String erzeugen
-        if isinstance(dtstart, datetime.datetime):
-            dtstart_str = dtstart.strftime('%Y%m%dT%H%M%S')
-            if dtstart.tzinfo:
-                dtstart_str += 'Z' if dtstart.tzinfo == pytz.UTC else ''
-        else:
-            dtstart_str = dtstart.strftime('%Y%m%d')
-        
-        rrule_str = f"DTSTART:{dtstart_str}\nRRULE:{';'.join(rrule_parts)}"
-        
-        # Start- und Enddatum für Expansion
-        if isinstance(dtstart, datetime.datetime):
-            start_dt = datetime.datetime.combine(effective_start_date, datetime.time.min)
-            if dtstart.tzinfo:
-                start_dt = start_dt.replace(tzinfo=dtstart.tzinfo)
-            
-            end_dt = datetime.datetime.combine(effective_end_date, datetime.time.max)
-            if dtstart.tzinfo:
-                end_dt = end_dt.replace(tzinfo=dtstart.tzinfo)
-        else:
-            start_dt = effective_start_date
-            end_dt = effective_end_date
-        
-        # Regeln expandieren
-        rule = rrulestr(rrule_str, forceset=True)
-        occurrences = list(rule.between(start_dt, end_dt, inc=True))
-        
-        # Log für Debugging
-        logger.debug(f"Automatische Expansion für {uid}: Gefunden {len(occurrences)} Termine zwischen {start_dt} und {end_dt}")
-        
-        if not occurrences:
-            # Wenn keine Termine gefunden wurden, verwende manuelle Expansion
-            logger.debug(f"Keine Termine mit automatischer Expansion gefunden für {uid}. Verwende manuelle Expansion.")
-            raise ValueError("Keine Termine mit automatischer Expansion gefunden")
-        
-        # Instanzen verarbeiten
-        for instance_dt in occurrences:
-            # Datum für Filterung
-            if isinstance(instance_dt, datetime.datetime):
-                instance_date = instance_dt.date()
-                date_str = instance_date.isoformat()
-            else:
-                instance_date = instance_dt
-                date_str = instance_date.isoformat()
-            
-            # Prüfen, ob ausgeschlossen
-            if is_date_excluded(instance_date, excluded_dates):
-                continue
-            
-            # Prüfen, ob Ausnahme existiert
-            exception_found = False
-            for ex in exceptions:
-                ex_date = ex.get('recurrence-id').dt
-                if isinstance(ex_date, datetime.datetime):
-                    ex_date = ex_date.date()
-                
-                if ex_date == instance_date:
-                    # Ausnahme gefunden
-                    exception_found = True
-                    instances.append(ex)
-                    break
-            
-            if exception_found:
-                continue
-            
-            # Neue Instanz erstellen
-            instance = create_instance_from_recurring(event, instance_dt, uid)
-            instances.append(instance)
-    
-    except Exception as e:
-        logger.warning(f"Automatische Expansion fehlgeschlagen: {e}. Versuche manuelle Expansion.")
-        
-        # Wenn die automatische Expansion fehlschlägt, verwende die manuelle Expansion
-        instances = manually_expand_recurring_event(event, effective_start_date, effective_end_date, exceptions, excluded_dates)
-    
-    return instances
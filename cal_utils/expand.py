@@ -1,18 +1,76 @@
 from .base import (
     Calendar, Event, logger, datetime, pytz,
     rrulestr, parse,
-    is_date_excluded, sanitize_rrule, create_instance_from_recurring
+    is_date_excluded, sanitize_rrule, create_occurrence, materialize,
+    index_excluded_dates, index_exceptions, find_exception
 )
-from .frequency import manually_expand_recurring_event
+from .frequency import iter_manual_occurrences, parse_until_date
+from .rulecache import rule_cache, rule_cache_key
+from .seek import CompiledRule
+
+def compile_rrule(dtstart, rrule_val):
+    """Erzeugt aus DTSTART und RRULE eines Termins die kompilierte, suchfähige dateutil-Regel"""
+    sanitized_rrule = sanitize_rrule(rrule_val)
+    
+    # Wenn keine gültigen Eigenschaften übrig sind, verwende manuelle Expansion
+    if not sanitized_rrule:
+        raise ValueError("Keine gültigen RRULE-Eigenschaften gefunden")
+    
+    # Wiederholungsregel als String erstellen
+    rrule_parts = []
+    for key, val in sanitized_rrule.items():
+        if key.upper() == 'UNTIL':
+            val_str = format_until(val[0] if isinstance(val, list) else val, dtstart)
+        elif isinstance(val, list):
+            val_str = ",".join(str(v) for v in val)
+        else:
+            val_str = str(val)
+        rrule_parts.append(f"{key}={val_str}")
+    
+    # RRule-String erzeugen
+    if isinstance(dtstart, datetime.datetime):
+        dtstart_str = dtstart.strftime('%Y%m%dT%H%M%S')
+        if dtstart.tzinfo:
+            dtstart_str += 'Z' if dtstart.tzinfo == pytz.UTC else ''
+    else:
+        dtstart_str = dtstart.strftime('%Y%m%d')
+    
+    rrule_str = f"DTSTART:{dtstart_str}\nRRULE:{';'.join(rrule_parts)}"
+    
+    return CompiledRule(rrulestr(rrule_str), parse(dtstart_str), sanitized_rrule)
+
+def format_until(until, dtstart):
+    """Formatiert UNTIL im Werttyp der kompilierten Regel: Datum, UTC mit Z oder naive Ortszeit der TZID"""
+    if not isinstance(dtstart, datetime.datetime):
+        return (until.date() if isinstance(until, datetime.datetime) else until).strftime('%Y%m%d')
+    if not isinstance(until, datetime.datetime):
+        until = datetime.datetime.combine(until, datetime.time.max.replace(microsecond=0))
+    if dtstart.tzinfo == pytz.UTC:
+        if until.tzinfo is not None:
+            until = until.astimezone(pytz.UTC)
+        return until.strftime('%Y%m%dT%H%M%SZ')
+    if until.tzinfo is not None and dtstart.tzinfo is not None:
+        # Die Regel ist in naiver Ortszeit kompiliert, UNTIL (in UTC) auf dieselbe Wanduhr umrechnen
+        until = until.astimezone(dtstart.tzinfo)
+    return until.strftime('%Y%m%dT%H%M%S')
 
 def expand_recurring_event(event, start_date, end_date, exceptions=None, excluded_dates=None):
-    """Expandiert einen wiederkehrenden Termin zu einzelnen Terminen im angegebenen Zeitraum"""
+    """Expandiert einen wiederkehrenden Termin zu einzelnen Terminen (Events) im angegebenen Zeitraum"""
+    return [materialize(instance) for instance in iter_recurring_event(event, start_date, end_date, exceptions, excluded_dates)]
+
+def iter_recurring_event(event, start_date, end_date, exceptions=None, excluded_dates=None):
+    """Liefert die Termine eines wiederkehrenden Termins im Zeitraum chronologisch, ohne sie vorher zu sammeln
+
+    Erzeugte Termine sind kompakte Occurrence-Instanzen, Ausnahmen (RECURRENCE-ID) die Original-Events.
+    """
     if exceptions is None:
         exceptions = []
     if excluded_dates is None:
         excluded_dates = []
     
-    instances = []
+    # Index für EXDATE und RECURRENCE-ID einmal pro Termin aufbauen, alle Expansionspfade teilen ihn
+    excluded_dates = index_excluded_dates(excluded_dates)
+    exceptions = index_exceptions(exceptions)
     
     # Basisinformationen
     uid = str(event.get('uid', ''))
@@ -23,31 +81,14 @@ def expand_recurring_event(event, start_date, end_date, exceptions=None, exclude
     
     # Berücksichtige UNTIL-Datum aus RRULE (falls vorhanden)
     rrule_val = event.get('rrule', {})
-    until_val = rrule_val.get('UNTIL', None)
-    until_date = None
-    
-    if until_val:
-        if isinstance(until_val, list) and until_val:
-            until_val = until_val[0]
-        
-        if isinstance(until_val, datetime.datetime):
-            until_date = until_val.date()
-        elif isinstance(until_val, datetime.date):
-            until_date = until_val
-        elif isinstance(until_val, str):
-            try:
-                # Versuche das String-Datum zu parsen
-                parsed_until = parse(until_val)
-                until_date = parsed_until.date()
-            except Exception as e:
-                logger.warning(f"Konnte UNTIL-Datum nicht parsen: {until_val}, Fehler: {e}")
-                
+    until_date = parse_until_date(rrule_val)
+    if until_date:
         # Zusätzliches Logging für das UNTIL-Datum
         logger.debug(f"UNTIL-Datum in RRULE gefunden: {until_date}")
     
     # Wenn das Startdatum des Events nach dem Ende des Zeitraums liegt, gibt es nichts zu expandieren
     if event_start_date > end_date:
-        return []
+        return
     
     # Effektives Enddatum ist das frühere von end_date und until_date (wenn vorhanden)
     effective_end_date = end_date
@@ -64,35 +105,14 @@ def expand_recurring_event(event, start_date, end_date, exceptions=None, exclude
     
     if (until_date and time_span <= 7) or time_span <= 2:
         logger.debug(f"Kurze Zeitspanne ({time_span} Tage) oder definiertes UNTIL-Datum erkannt. Verwende manuelle Expansion.")
-        instances = manually_expand_recurring_event(event, effective_start_date, effective_end_date, exceptions, excluded_dates)
-        return instances
+        yield from iter_manual_occurrences(event, effective_start_date, effective_end_date, exceptions, excluded_dates)
+        return
     
     try:
         # Versuche zuerst die automatische Expansion mit dateutil.rrule
-        sanitized_rrule = sanitize_rrule(rrule_val)
-        
-        # Wenn keine gültigen Eigenschaften übrig sind, verwende manuelle Expansion
-        if not sanitized_rrule:
-            raise ValueError("Keine gültigen RRULE-Eigenschaften gefunden")
-        
-        # Wiederholungsregel als String erstellen
-        rrule_parts = []
-        for key, val in sanitized_rrule.items():
-            if isinstance(val, list):
-                val_str = ",".join(str(v) for v in val)
-            else:
-                val_str = str(val)
-            rrule_parts.append(f"{key}={val_str}")
-        
-        # RRule-String erzeugen
-        if isinstance(dtstart, datetime.datetime):
-            dtstart_str = dtstart.strftime('%Y%m%dT%H%M%S')
-            if dtstart.tzinfo:
-                dtstart_str += 'Z' if dtstart.tzinfo == pytz.UTC else ''
-        else:
-            dtstart_str = dtstart.strftime('%Y%m%d')
-        
-        rrule_str = f"DTSTART:{dtstart_str}\nRRULE:{';'.join(rrule_parts)}"
+        # Kompilierte Regel aus dem Cache, unveränderte Termine werden nicht erneut geparst
+        key = rule_cache_key(uid, dtstart, rrule_val, excluded_dates)
+        rule = rule_cache.get_or_compile(key, lambda: compile_rrule(dtstart, rrule_val))
         
         # Start- und Enddatum für Expansion
         if isinstance(dtstart, datetime.datetime):
@@ -108,67 +128,62 @@ def expand_recurring_event(event, start_date, end_date, exceptions=None, exclude
             end_dt = effective_end_date
         
         # Regeln expandieren
-        rule = rrulestr(rrule_str, forceset=True)
-        occurrences = list(rule.between(start_dt, end_dt, inc=True))
+        # Springt bei alten Serien direkt zum Zeitraum, statt ab dem ursprünglichen DTSTART zu iterieren
+        occurrences = list(rule.between(start_dt, end_dt))
         
         # Log für Debugging
         logger.debug(f"Automatische Expansion: Gefunden {len(occurrences)} Termine zwischen {start_dt} und {end_dt}")
         
         if not occurrences:
-            # Wenn keine Termine gefunden wurden, verwende manuelle Expansion
-            logger.debug(f"Keine Termine mit automatischer Expansion gefunden. Verwende manuelle Expansion.")
-            raise ValueError("Keine Termine mit automatischer Expansion gefunden")
+            # Keine Termine im Zeitraum ist ein gültiges Ergebnis (z.B. ein einzelner Tag am Rand des Zeitraums),
+            # die manuelle Expansion kennt nicht alle Regeln und würde sonst falsche Termine ergänzen
+            logger.debug(f"Keine Termine mit automatischer Expansion zwischen {start_dt} und {end_dt}")
+            return
         
         # Bei einer sehr geringen Anzahl von Terminen validieren wir doppelt mit manueller Expansion
         if 1 <= len(occurrences) <= 3 and until_date:
             logger.debug(f"Nur wenige Termine ({len(occurrences)}) mit UNTIL-Datum gefunden. Validiere mit manueller Expansion.")
             
             # Validieren mit manueller Expansion
-            manual_instances = manually_expand_recurring_event(event, effective_start_date, effective_end_date, exceptions, excluded_dates)
+            manual_instances = list(iter_manual_occurrences(event, effective_start_date, effective_end_date, exceptions, excluded_dates))
             
             if len(manual_instances) != len(occurrences):
                 logger.warning(f"Unterschied zwischen automatischer ({len(occurrences)}) und manueller ({len(manual_instances)}) Expansion. Verwende manuelle Ergebnisse.")
-                return manual_instances
-        
-        # Instanzen verarbeiten
-        for instance_dt in occurrences:
-            # Datum für Filterung
-            if isinstance(instance_dt, datetime.datetime):
-                instance_date = instance_dt.date()
-            else:
-                instance_date = instance_dt
-            
-            # Prüfen, ob ausgeschlossen
-            if is_date_excluded(instance_date, excluded_dates):
-                continue
-            
-            # Prüfen, ob Ausnahme existiert
-            exception_found = False
-            for ex in exceptions:
-                ex_date = ex.get('recurrence-id').dt
-                if isinstance(ex_date, datetime.datetime):
-                    ex_date = ex_date.date()
-                
-                if ex_date == instance_date:
-                    # Ausnahme gefunden
-                    exception_found = True
-                    # Stelle sicher, dass die UID der Ausnahme korrekt ist
-                    ex_uid = f"{uid}-{ex_date.isoformat()}"
-                    ex['uid'] = ex_uid
-                    instances.append(ex)
-                    break
-            
-            if exception_found:
-                continue
-            
-            # Neue Instanz erstellen
-            instance = create_instance_from_recurring(event, instance_dt, uid)
-            instances.append(instance)
+                yield from manual_instances
+                return
     
     except Exception as e:
         logger.warning(f"Automatische Expansion fehlgeschlagen: {e}. Verwende manuelle Expansion.")
         
         # Wenn die automatische Expansion fehlschlägt, verwende die manuelle Expansion
-        instances = manually_expand_recurring_event(event, effective_start_date, effective_end_date, exceptions, excluded_dates)
+        yield from iter_manual_occurrences(event, effective_start_date, effective_end_date, exceptions, excluded_dates)
+        return
+    
+    # dateutil liefert UTC-Zeiten mit tzutc (UID ohne Z), die manuelle Expansion mit pytz.UTC (UID mit Z).
+    # UTC-Serien mit UNTIL liefen bisher immer über die manuelle Expansion, ihre UIDs behalten das Z,
+    # damit abonnierte Clients die Termine nicht löschen und neu anlegen
+    normalize_utc = until_date is not None and isinstance(dtstart, datetime.datetime) and dtstart.tzinfo == pytz.UTC
     
-    return instances
\ No newline at end of file
+    # Instanzen erst beim Abholen erzeugen
+    for instance_dt in occurrences:
+        if normalize_utc:
+            instance_dt = instance_dt.astimezone(pytz.UTC)
+        
+        # Datum für Filterung
+        if isinstance(instance_dt, datetime.datetime):
+            instance_date = instance_dt.date()
+        else:
+            instance_date = instance_dt
+        
+        # Prüfen, ob ausgeschlossen
+        if is_date_excluded(instance_date, excluded_dates):
+            continue
+        
+        # Prüfen, ob Ausnahme existiert
+        ex = find_exception(instance_date, exceptions, uid)
+        if ex is not None:
+            yield ex
+            continue
+        
+        # Neue kompakte Instanz, die Eigenschaften werden erst bei der Ausgabe übernommen
+        yield create_occurrence(event, instance_dt, uid)
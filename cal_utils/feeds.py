@@ -0,0 +1,226 @@
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from cal_utils.pipeline import (
+    DEFAULT_DAYS_BEFORE, DEFAULT_DAYS_AFTER, resolve_window, render_source, superset_window
+)
+from cal_utils.scheduler import ReadyResult
+
+logger = logging.getLogger('ical-proxy')
+
+# Konfigurierter Feed: Quell-URL, Standardzeitraum, Aktualisierungsintervall (0 = nur bei Bedarf) und Vorberechnung
+Feed = namedtuple('Feed', ['name', 'source', 'days_before', 'days_after', 'refresh_interval', 'prewarm'])
+
+def load_feeds(path, default_refresh_interval=300):
+    """Liest die Feeds aus einer JSON-Datei, fehlerhafte Einträge werden protokolliert und übersprungen"""
+    if not path:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Feed-Konfiguration {path} konnte nicht gelesen werden: {e}")
+        return {}
+
+    # Entweder direkt Name -> Eintrag oder unter dem Schlüssel "feeds"
+    if isinstance(config, dict) and isinstance(config.get('feeds'), dict):
+        config = config['feeds']
+    if not isinstance(config, dict):
+        logger.error(f"Feed-Konfiguration {path} muss ein JSON-Objekt sein")
+        return {}
+
+    feeds = {}
+    for name, entry in config.items():
+        if isinstance(entry, str):
+            entry = {'source': entry}
+        if not isinstance(entry, dict) or not entry.get('source'):
+            logger.warning(f"Feed '{name}' wird ignoriert, es fehlt die Quell-URL")
+            continue
+        try:
+            feeds[name] = Feed(
+                name=name,
+                source=entry['source'],
+                days_before=int(entry.get('days_before', DEFAULT_DAYS_BEFORE)),
+                days_after=int(entry.get('days_after', DEFAULT_DAYS_AFTER)),
+                refresh_interval=int(entry.get('refresh_interval', default_refresh_interval)),
+                prewarm=bool(entry.get('prewarm', False))
+            )
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Feed '{name}' wird ignoriert, ungültiger Wert: {e}")
+    logger.info(f"Loaded {len(feeds)} feeds from {path}")
+    return feeds
+
+class FeedScheduler:
+    """Hält die konfigurierten Feeds für ihren Standardzeitraum bereit und aktualisiert sie im eigenen Intervall"""
+
+    def __init__(self, feeds):
+        self.feeds = feeds
+
+        # Gesamtzeitraum so erweitern, dass die Standardzeiträume aller Feeds daraus ausgeschnitten werden
+        for feed in feeds.values():
+            superset_window.extend(feed.days_before, feed.days_after)
+
+        self._results = {}
+        self._active = {name for name, feed in feeds.items() if feed.prewarm}
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'prewarmed': 0,
+            'served_fresh': 0,
+            'served_stale': 0,
+            'served_cold': 0,
+        }
+
+    def start(self):
+        """Startet den Hintergrund-Thread, der vorzuberechnende Feeds sofort expandiert (nur einmal)"""
+        if not self.feeds or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='feed-refresh', daemon=True)
+        self._thread.start()
+        logger.info(f"Feed refresh started for {len(self.feeds)} feeds, prewarming {len(self._active)}")
+
+    def stop(self):
+        """Beendet den Hintergrund-Thread"""
+        self._stop.set()
+
+    def window(self, feed):
+        """Liefert Start- und Enddatum des Standardzeitraums eines Feeds"""
+        return resolve_window(feed.days_before, feed.days_after)
+
+    def get(self, name):
+        """Liefert den fertigen Kalender eines Feeds für seinen Standardzeitraum"""
+        feed = self.feeds[name]
+        with self._lock:
+            self._active.add(name)
+            result = self._results.get(name)
+
+        if result is None:
+            # Noch nicht vorberechnet: im Anfragepfad expandieren
+            with self._lock:
+                self._stats['served_cold'] += 1
+            return self.refresh(feed).ical_data
+
+        if self._is_stale(feed, result):
+            # Veraltetes Ergebnis ausliefern, Aktualisierung läuft im Hintergrund
+            self.refresh_async(feed)
+            with self._lock:
+                self._stats['served_stale'] += 1
+        else:
+            with self._lock:
+                self._stats['served_fresh'] += 1
+        return result.ical_data
+
+    def refresh(self, feed):
+        """Lädt und expandiert einen Feed für seinen Standardzeitraum neu"""
+        start_date, end_date = self.window(feed)
+        ical_data = render_source(feed.source, start_date, end_date)
+        result = ReadyResult(ical_data, datetime.datetime.now().date(), time.monotonic())
+        with self._lock:
+            self._results[feed.name] = result
+            self._stats['refreshes'] += 1
+        return result
+
+    def refresh_async(self, feed):
+        """Startet eine Aktualisierung in einem eigenen Thread, sofern nicht bereits eine läuft"""
+        if not self._claim(feed.name):
+            return
+
+        def run():
+            try:
+                self._refresh_quietly(feed)
+            finally:
+                self._release(feed.name)
+
+        threading.Thread(target=run, name='feed-refresh-once', daemon=True).start()
+
+    def _refresh_quietly(self, feed):
+        try:
+            self.refresh(feed)
+            return True
+        except Exception as e:
+            # Das alte Ergebnis bleibt erhalten
+            logger.warning(f"Refresh of feed '{feed.name}' failed: {e}")
+            with self._lock:
+                self._stats['refresh_failures'] += 1
+            return False
+
+    def _claim(self, name):
+        with self._lock:
+            if name in self._inflight:
+                return False
+            self._inflight.add(name)
+            return True
+
+    def _release(self, name):
+        with self._lock:
+            self._inflight.discard(name)
+
+    def _is_stale(self, feed, result):
+        if result.window_date != datetime.datetime.now().date():
+            # Der Zeitraum hat sich seit der letzten Aktualisierung verschoben
+            return True
+        return feed.refresh_interval > 0 and time.monotonic() - result.refreshed_at > feed.refresh_interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                due = [
+                    self.feeds[name] for name in self._active
+                    if name not in self._results or self._is_stale(self.feeds[name], self._results[name])
+                ]
+
+            for feed in due:
+                if self._stop.is_set():
+                    break
+                if not self._claim(feed.name):
+                    continue
+                try:
+                    prewarm = feed.name not in self._results
+                    if self._refresh_quietly(feed) and prewarm:
+                        with self._lock:
+                            self._stats['prewarmed'] += 1
+                finally:
+                    self._release(feed.name)
+
+            self._stop.wait(self._next_wait())
+
+    def _next_wait(self):
+        # Bis zur nächsten fälligen Aktualisierung warten, höchstens bis zum Tageswechsel
+        now = time.monotonic()
+        tomorrow = datetime.datetime.combine(datetime.date.today() + datetime.timedelta(days=1), datetime.time.min)
+        wait = max((tomorrow - datetime.datetime.now()).total_seconds(), 1)
+        with self._lock:
+            for name in self._active:
+                feed = self.feeds[name]
+                result = self._results.get(name)
+                if result is None:
+                    # Fehlgeschlagene Vorberechnung später erneut versuchen
+                    wait = min(wait, 60)
+                elif feed.refresh_interval > 0:
+                    wait = min(wait, max(result.refreshed_at + feed.refresh_interval - now, 1))
+        return wait
+
+    def stats(self):
+        """Liefert die Zähler des Schedulers als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['feeds'] = len(self.feeds)
+            stats['active_feeds'] = len(self._active)
+            stats['ready_results'] = len(self._results)
+        return stats
+
+feed_scheduler = FeedScheduler(
+    load_feeds(
+        os.environ.get('FEEDS_CONFIG', ''),
+        default_refresh_interval=int(os.environ.get('REFRESH_INTERVAL', 300))
+    )
+)
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from cal_utils.http_client import get_upstream_client
+
+logger = logging.getLogger('ical-proxy')
+
+# Ergebnis eines Downloads: Inhalt, SHA-256 des Inhalts, ob er aus dem Cache stammt und die Zeitmessung
+FetchResult = namedtuple('FetchResult', ['content', 'content_hash', 'from_cache', 'timings'])
+
+class UpstreamCache:
+    """Merkt sich den letzten Inhalt pro Quell-URL und revalidiert ihn per ETag / Last-Modified"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidations': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0,
+            'download_seconds': 0.0,
+            'revalidation_seconds': 0.0,
+        }
+
+    def fetch(self, url):
+        """Lädt die URL herunter oder liefert den zwischengespeicherten Inhalt bei 304 Not Modified"""
+        with self._lock:
+            entry = self._entries.get(url)
+
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = get_upstream_client().get(url, headers=headers)
+        elapsed = response.timings['total']
+
+        if entry and response.status_code == 304:
+            logger.debug(f"Upstream not modified, reusing cached calendar ({len(entry['content'])} bytes)")
+            with self._lock:
+                self._stats['revalidations'] += 1
+                self._stats['hits'] += 1
+                self._stats['bytes_saved'] += len(entry['content'])
+                self._stats['revalidation_seconds'] += elapsed
+                if url in self._entries:
+                    self._entries.move_to_end(url)
+            return FetchResult(entry['content'], entry['content_hash'], True, response.timings)
+
+        response.raise_for_status()  # Wirft Fehler bei HTTP-Fehlercodes
+
+        content = response.content
+        content_hash = hashlib.sha256(content).hexdigest()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        with self._lock:
+            if entry:
+                self._stats['revalidations'] += 1
+            self._stats['misses'] += 1
+            self._stats['bytes_downloaded'] += len(content)
+            self._stats['download_seconds'] += elapsed
+
+            # Ohne Validatoren ist keine bedingte Anfrage möglich, also auch kein Eintrag
+            if etag or last_modified:
+                self._entries[url] = {
+                    'content': content,
+                    'content_hash': content_hash,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                }
+                self._entries.move_to_end(url)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.pop(url, None)
+
+        return FetchResult(content, content_hash, False, response.timings)
+
+    def stats(self):
+        """Liefert die Zähler des Caches als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    def clear(self):
+        """Leert den Cache"""
+        with self._lock:
+            self._entries.clear()
+
+upstream_cache = UpstreamCache(
+    max_entries=int(os.environ.get('UPSTREAM_CACHE_MAX_ENTRIES', 32))
+)
+
+def fetch_calendar(url):
+    """Lädt einen Kalender von der Quell-URL, revalidiert dabei bereits bekannte Inhalte"""
+    return upstream_cache.fetch(url)
+
+def get_fetch_stats():
+    """Liefert die Statistiken des Upstream-Caches"""
+    return upstream_cache.stats()
@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger('ical-proxy')
+
+# Verbindungsaufbau-Zeiten pro Thread (DNS, TCP und TLS werden von urllib3 gemeinsam ausgeführt)
+_connect_timing = threading.local()
+
+def _record_connect(elapsed):
+    _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0.0) + elapsed
+    _connect_timing.count = getattr(_connect_timing, 'count', 0) + 1
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - started)
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - started)
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter, dessen Verbindungen die Dauer des Verbindungsaufbaus messen"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+class UpstreamClient:
+    """Gemeinsame HTTP-Session für alle Downloads von Quell-Kalendern mit Pooling, Timeouts und Retries"""
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, connect_timeout=5.0,
+                 read_timeout=30.0, retries=2, backoff_factor=0.5):
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False
+        )
+        adapter = _TimedHTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'errors': 0,
+            'new_connections': 0,
+            'connect_seconds': 0.0,
+            'ttfb_seconds': 0.0,
+            'body_seconds': 0.0,
+            'total_seconds': 0.0,
+        }
+
+    def get(self, url, headers=None):
+        """Führt einen GET-Request aus und hängt die Zeitmessung als `timings` an die Antwort"""
+        _connect_timing.seconds = 0.0
+        _connect_timing.count = 0
+
+        started = time.perf_counter()
+        try:
+            # stream=True, damit die Zeit bis zum ersten Byte getrennt vom Body gemessen werden kann
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            headers_done = time.perf_counter()
+            response.content  # Body vollständig lesen
+        except requests.RequestException:
+            with self._lock:
+                self._stats['requests'] += 1
+                self._stats['errors'] += 1
+            raise
+        finished = time.perf_counter()
+
+        connect = _connect_timing.seconds
+        timings = {
+            'connect': connect,
+            'ttfb': max(headers_done - started - connect, 0.0),
+            'body': finished - headers_done,
+            'total': finished - started,
+            'new_connection': _connect_timing.count > 0,
+        }
+        response.timings = timings
+
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['new_connections'] += _connect_timing.count
+            self._stats['connect_seconds'] += timings['connect']
+            self._stats['ttfb_seconds'] += timings['ttfb']
+            self._stats['body_seconds'] += timings['body']
+            self._stats['total_seconds'] += timings['total']
+
+        logger.debug(
+            f"Upstream timing for {url}: connect={timings['connect'] * 1000:.1f}ms "
+            f"ttfb={timings['ttfb'] * 1000:.1f}ms body={timings['body'] * 1000:.1f}ms "
+            f"new_connection={timings['new_connection']}"
+        )
+        return response
+
+    def stats(self):
+        """Liefert die aufsummierten Zeitmessungen des Clients"""
+        with self._lock:
+            return dict(self._stats)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_upstream_client():
+    """Liefert den gemeinsamen Upstream-Client und legt ihn beim ersten Aufruf an"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = UpstreamClient(
+                    pool_connections=int(os.environ.get('UPSTREAM_POOL_CONNECTIONS', 10)),
+                    pool_maxsize=int(os.environ.get('UPSTREAM_POOL_MAXSIZE', 10)),
+                    connect_timeout=float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 5)),
+                    read_timeout=float(os.environ.get('UPSTREAM_READ_TIMEOUT', 30)),
+                    retries=int(os.environ.get('UPSTREAM_RETRIES', 2)),
+                    backoff_factor=float(os.environ.get('UPSTREAM_RETRY_BACKOFF', 0.5))
+                )
+    return _client
@@ -5,16 +5,17 @@ Importiert die nötigen Funktionen für die Kalender-Verarbeitung aus den versch
 from .base import (
     Calendar, Event, datetime, pytz, logger,
     is_date_excluded, sanitize_rrule, create_instance_from_recurring,
-    sanitize_calendar, extract_excluded_dates, get_date_string
+    sanitize_calendar, extract_excluded_dates, get_date_string,
+    Occurrence, create_occurrence, materialize, instance_start
 )
 
 # Importieren der Funktionen für wiederkehrende Ereignisse
-from .expand import expand_recurring_event
+from .expand import expand_recurring_event, iter_recurring_event
 
 # Füge weitere erforderliche Imports hinzu
-from .monthly import manually_expand_monthly_byday, process_monthly_day
-from .yearly import expand_yearly
+from .monthly import parse_byday, byday_dates, monthly_dates
+from .yearly import iter_yearly
 from .frequency import (
-    manually_expand_recurring_event, expand_daily,
-    expand_weekly, expand_monthly
+    manually_expand_recurring_event, iter_manual_occurrences,
+    iter_daily, iter_weekly, iter_monthly
 )
\ No newline at end of file
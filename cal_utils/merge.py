@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from cal_utils.ical_processor import Calendar, sanitize_calendar
+from cal_utils.cache import render_cache
+from cal_utils.pipeline import CALENDAR_FOOTER, render_flight, iter_event_chunks, _fetch_source
+from cal_utils.metrics import stage_timer
+
+logger = logging.getLogger('ical-proxy')
+
+# Maximale Anzahl gleichzeitiger Downloads pro zusammengeführtem Kalender
+MERGE_MAX_WORKERS = int(os.environ.get('MERGE_MAX_WORKERS', 8))
+
+# Eine Quelle des zusammengeführten Kalenders: Namensraum für die UIDs und Quell-URL
+MergeSource = namedtuple('MergeSource', ['namespace', 'url'])
+
+# Zeitmessung pro Quelle in Sekunden (error ist None, wenn die Quelle verarbeitet wurde)
+SourceTiming = namedtuple('SourceTiming', ['namespace', 'fetch', 'render', 'error'])
+
+def source_namespace(url):
+    """Leitet einen kurzen, stabilen Namensraum für die UIDs einer Quelle aus ihrer URL ab"""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]
+
+def make_sources(urls):
+    """Erzeugt die Quellen für eine Liste von URLs (doppelte URLs werden nur einmal verwendet)"""
+    sources = []
+    seen = set()
+    for url in urls:
+        if url and url not in seen:
+            seen.add(url)
+            sources.append(MergeSource(source_namespace(url), url))
+    return sources
+
+def load_source_groups(raw):
+    """Liest benannte Quellgruppen aus JSON: Liste von URLs oder Objekt aus Namensraum und URL pro Gruppe"""
+    if not raw:
+        return {}
+    try:
+        config = json.loads(raw)
+    except ValueError as e:
+        logger.error(f"SOURCE_GROUPS ist kein gültiges JSON: {e}")
+        return {}
+
+    groups = {}
+    for name, members in config.items():
+        if isinstance(members, dict):
+            groups[name] = [MergeSource(str(namespace), url) for namespace, url in members.items() if url]
+        elif isinstance(members, list):
+            groups[name] = make_sources(members)
+        else:
+            logger.warning(f"Quellgruppe '{name}' wird ignoriert, erwartet wird eine Liste oder ein Objekt")
+    return groups
+
+source_groups = load_source_groups(os.environ.get('SOURCE_GROUPS', ''))
+
+def render_merged(sources, start_date, end_date, debug_mode=False):
+    """Lädt alle Quellen gleichzeitig und liefert den zusammengeführten Kalender samt Zeitmessung pro Quelle"""
+    key = ('merged', tuple(sources), start_date, end_date, debug_mode)
+    return render_flight.do(key, lambda: _render_merged(sources, start_date, end_date, debug_mode))
+
+def _render_merged(sources, start_date, end_date, debug_mode):
+    workers = max(1, min(MERGE_MAX_WORKERS, len(sources)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='merge-fetch') as pool:
+        # Downloads laufen parallel, die Gesamtdauer entspricht etwa der langsamsten Quelle
+        fetches = list(pool.map(_fetch_timed, sources))
+
+    failed = [source for source, (fetched, _, _) in zip(sources, fetches) if fetched is None]
+    if len(failed) == len(sources):
+        raise fetches[0][2]
+
+    # Bereits zusammengeführte Ausgabe wiederverwenden, wenn sich keine Quelle geändert hat
+    cache_key = (
+        'merged',
+        tuple((source, fetched.content_hash if fetched else None) for source, (fetched, _, _) in zip(sources, fetches)),
+        start_date, end_date, debug_mode
+    )
+    ical_data = None if failed else render_cache.get(cache_key)
+    if ical_data is not None:
+        logger.info("Serving merged calendar from render cache")
+        timings = [
+            SourceTiming(source.namespace, fetch_time, 0.0, None)
+            for source, (_, fetch_time, _) in zip(sources, fetches)
+        ]
+        return ical_data, timings
+
+    timezones = {}
+    bodies = []
+    timings = []
+    for source, (fetched, fetch_time, error) in zip(sources, fetches):
+        if fetched is None:
+            timings.append(SourceTiming(source.namespace, fetch_time, 0.0, str(error)))
+            continue
+
+        started = time.perf_counter()
+        try:
+            with stage_timer('parse'):
+                cal = Calendar.from_ical(fetched.content)
+
+            # VTIMEZONEs nur einmal pro TZID übernehmen, die erste Quelle gewinnt
+            for tz in cal.walk('VTIMEZONE'):
+                timezones.setdefault(str(tz.get('tzid', '')), tz)
+
+            namespace_uids(cal, source.namespace)
+            bodies.append(b''.join(iter_event_chunks(cal, start_date, end_date, debug_mode)))
+        except Exception as e:
+            logger.exception(f"Error processing calendar {source.url}")
+            failed.append(source)
+            timings.append(SourceTiming(source.namespace, fetch_time, time.perf_counter() - started, str(e)))
+            continue
+        timings.append(SourceTiming(source.namespace, fetch_time, time.perf_counter() - started, None))
+
+    # Gemeinsamer Kopf mit den zusammengeführten Zeitzonen
+    new_cal = sanitize_calendar(Calendar())
+    for tz in timezones.values():
+        new_cal.add_component(tz)
+
+    ical_data = new_cal.to_ical()[:-len(CALENDAR_FOOTER)] + b''.join(bodies) + CALENDAR_FOOTER
+
+    # Unvollständige Kalender nicht zwischenspeichern
+    if not failed:
+        render_cache.put(cache_key, ical_data)
+
+    return ical_data, timings
+
+def _fetch_timed(source):
+    started = time.perf_counter()
+    try:
+        fetched = _fetch_source(source.url)
+    except Exception as e:
+        logger.error(f"Failed to download calendar {source.url}: {e}")
+        return None, time.perf_counter() - started, e
+    return fetched, time.perf_counter() - started, None
+
+def namespace_uids(cal, namespace):
+    """Stellt allen UIDs eines Kalenders den Namensraum der Quelle voran, damit sie quellübergreifend eindeutig sind"""
+    for component in cal.walk('VEVENT'):
+        component['uid'] = f"{namespace}-{component.get('uid', '')}"
+
+def format_source_timings(timings):
+    """Formatiert die Zeitmessung pro Quelle für den X-Source-Timing-Header (Millisekunden)"""
+    entries = []
+    for timing in timings:
+        entry = f"{timing.namespace};fetch={timing.fetch * 1000:.1f};render={timing.render * 1000:.1f}"
+        if timing.error is not None:
+            entry += ";error"
+        entries.append(entry)
+    return ', '.join(entries)
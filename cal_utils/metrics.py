@@ -0,0 +1,149 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Latenz-Histogramm mit festen Buckets pro Label-Wert im Prometheus-Textformat"""
+
+    def __init__(self, name, help_text, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        # Nur ein Bucket-Zähler pro Beobachtung, kumuliert wird erst bei der Ausgabe
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for label_value, (counts, total) in sorted(snapshot.items()):
+            labels = f'{self.label}="{escape_label(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+class Counter:
+    """Zähler pro Kombination von Label-Werten im Prometheus-Textformat"""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            if self.labels:
+                labels = ','.join(f'{label}="{escape_label(v)}"' for label, v in zip(self.labels, label_values))
+                lines.append(f'{self.name}{{{labels}}} {value}')
+            else:
+                lines.append(f'{self.name} {value}')
+        return lines
+
+def escape_label(value):
+    """Maskiert einen Label-Wert für das Prometheus-Textformat"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+stage_seconds = Histogram(
+    'ical_proxy_stage_seconds', 'Dauer der einzelnen Verarbeitungsschritte in Sekunden', 'stage'
+)
+request_seconds = Histogram(
+    'ical_proxy_request_seconds', 'Dauer der Anfragen pro Route in Sekunden', 'route'
+)
+requests_total = Counter(
+    'ical_proxy_requests_total', 'Anzahl der Anfragen pro Route und Statuscode', ('route', 'status')
+)
+upstream_bytes_total = Counter(
+    'ical_proxy_upstream_bytes_total', 'Vom Quell-Kalender geladene Bytes (ohne 304-Antworten)'
+)
+instances_total = Counter(
+    'ical_proxy_instances_emitted_total', 'Ausgegebene Termine (Einzeltermine, Instanzen und Ausnahmen)'
+)
+
+# Aufsummierte Dauer der Verarbeitungsschritte der laufenden Anfrage (None außerhalb einer Anfrage)
+_request_stages = contextvars.ContextVar('request_stages', default=None)
+
+@contextmanager
+def stage_timer(stage):
+    """Misst die Dauer eines Verarbeitungsschritts für ical_proxy_stage_seconds und den Server-Timing-Header"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+def record_stage(stage, seconds):
+    """Erfasst eine bereits gemessene Dauer eines Verarbeitungsschritts wie stage_timer"""
+    stage_seconds.observe(stage, seconds)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+def track_request_stages():
+    """Beginnt die Erfassung der Verarbeitungsschritte für die laufende Anfrage, liefert das Token zum Beenden"""
+    return _request_stages.set({})
+
+def request_stages():
+    """Liefert die bisher erfasste Dauer pro Verarbeitungsschritt der laufenden Anfrage"""
+    return dict(_request_stages.get() or {})
+
+def untrack_request_stages(token):
+    """Beendet die Erfassung der Verarbeitungsschritte für die laufende Anfrage"""
+    _request_stages.reset(token)
+
+def format_server_timing(stages, total=None):
+    """Formatiert die Dauer der Verarbeitungsschritte für den Server-Timing-Header (Millisekunden)"""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stages.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+def render_stats(prefix, stats):
+    """Wandelt ein Statistik-Dictionary in Prometheus-Gauges um, nicht numerische Werte werden übersprungen"""
+    lines = []
+    for key, value in sorted(stats.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        name = f"{prefix}_{key}"
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return lines
+
+def render_metrics(cache_stats):
+    """Erzeugt die komplette Ausgabe für /metrics im Prometheus-Textformat"""
+    lines = []
+    for metric in (stage_seconds, request_seconds, requests_total, upstream_bytes_total, instances_total):
+        lines.extend(metric.render())
+    for section, stats in cache_stats.items():
+        lines.extend(render_stats(f"ical_proxy_{section}", stats))
+    return '\n'.join(lines) + '\n'
@@ -1,109 +1,81 @@
-from .base import (
-    Calendar, Event, logger, datetime, pytz, re,
-    rrulestr, parse,
-    is_date_excluded, sanitize_rrule, create_instance_from_recurring
-)
+import calendar
+from .base import datetime, re
 
-def manually_expand_monthly_byday(event, effective_start_date, effective_end_date, event_start_date, byday, 
-                                 interval, excluded_dates, exceptions, current_year, current_month, start_year, start_month):
-    """Behandelt die Expansion von monatlichen Terminen mit BYDAY-Regel"""
-    import calendar
-    uid = str(event.get('uid', ''))
-    dtstart = event.get('dtstart').dt
-    instances = []
-    
-    # Prüfen, ob der aktuelle Monat nach oder am Starttermin liegt
-    current_first_day = datetime.date(current_year, current_month, 1)
-    if current_first_day >= datetime.date(start_year, start_month, 1):
-        # Intervall prüfen
-        months_since_start = (current_year - start_year) * 12 + current_month - start_month
-        if months_since_start % interval == 0:
-            for day_expr in byday:
-                day_expr = str(day_expr)
-                
-                # Parse BYDAY-Ausdruck (z.B. "2MO", "-1FR")
-                match = re.match(r'([+-]?\d*)([A-Z]{2})', day_expr.upper())
-                if match:
-                    pos, day = match.groups()
-                    
-                    # Wochentag ermitteln
-                    day_to_num = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
-                    weekday = day_to_num.get(day, 0)
-                    
-                    # Position ermitteln (0 = alle, 1 = erster, 2 = zweiter, -1 = letzter, etc.)
-                    try:
-                        if pos:
-                            position = int(pos)
-                        else:
-                            position = 0  # Alle Vorkommen
-                    except ValueError:
-                        position = 0
-                    
-                    # Alle Tage des Monats durchgehen
-                    cal = calendar.monthcalendar(current_year, current_month)
-                    
-                    # Alle Vorkommen des Wochentags sammeln
-                    occurrences = []
-                    for week in cal:
-                        if week[weekday] != 0:
-                            occurrences.append(week[weekday])
-                    
-                    # Bestimmtes Vorkommen auswählen
-                    if position > 0 and position <= len(occurrences):
-                        # Positives Vorkommen (1. Montag, 2. Freitag, etc.)
-                        day_num = occurrences[position - 1]
-                        process_monthly_day(day_num, current_year, current_month, event_start_date, effective_end_date, 
-                                          excluded_dates, exceptions, event, uid, dtstart, instances)
-                    elif position < 0 and abs(position) <= len(occurrences):
-                        # Negatives Vorkommen (-1. Montag = letzter Montag, etc.)
-                        day_num = occurrences[position]
-                        process_monthly_day(day_num, current_year, current_month, event_start_date, effective_end_date, 
-                                          excluded_dates, exceptions, event, uid, dtstart, instances)
-                    elif position == 0:
-                        # Alle Vorkommen
-                        for day_num in occurrences:
-                            process_monthly_day(day_num, current_year, current_month, event_start_date, effective_end_date, 
-                                             excluded_dates, exceptions, event, uid, dtstart, instances)
-    
-    return instances
+DAY_TO_NUM = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
 
-def process_monthly_day(day_num, current_year, current_month, event_start_date, effective_end_date, 
-                      excluded_dates, exceptions, event, uid, dtstart, instances):
-    """Verarbeitet einen bestimmten Tag eines Monats für monatliche Wiederholungen"""
-    try:
-        current_date = datetime.date(current_year, current_month, day_num)
-        
-        # Prüfen, ob das aktuelle Datum nach oder am Starttermin liegt
-        if current_date >= event_start_date and current_date <= effective_end_date:
-            if not is_date_excluded(current_date, excluded_dates):
-                # Ausnahme prüfen
-                exception_found = False
-                for ex in exceptions:
-                    ex_date = ex.get('recurrence-id').dt
-                    if isinstance(ex_date, datetime.datetime):
-                        ex_date = ex_date.date()
-                    if ex_date == current_date:
-                        exception_found = True
-                        # Stelle sicher, dass die UID der Ausnahme korrekt ist
-                        ex_uid = f"{uid}-{ex_date.isoformat()}"
-                        ex['uid'] = ex_uid
-                        instances.append(ex)
-                        break
-                
-                if not exception_found:
-                    # Neue Instanz erstellen
-                    if isinstance(dtstart, datetime.datetime):
-                        time_of_day = dtstart.time()
-                        instance_dt = datetime.datetime.combine(current_date, time_of_day)
-                        # Zeitzone beibehalten
-                        if dtstart.tzinfo:
-                            instance_dt = instance_dt.replace(tzinfo=dtstart.tzinfo)
-                    else:
-                        instance_dt = current_date
-                    
-                    instance = create_instance_from_recurring(event, instance_dt, uid)
-                    instances.append(instance)
-    except ValueError:
-        # Ungültiges Datum - für einige Monate existieren bestimmte Tage nicht (z.B. 31. Februar)
-        logger.debug(f"Überspringe ungültiges Datum: {current_year}-{current_month}-{day_num}")
-        pass
+def parse_byday(bydays):
+    """Zerlegt BYDAY-Ausdrücke (z.B. "MO", "2TH", "-1FR") in Paare aus Position und Wochentag"""
+    if not isinstance(bydays, list):
+        bydays = [bydays]
+
+    parsed = []
+    for day_expr in bydays:
+        match = re.match(r'([+-]?\d*)([A-Z]{2})', str(day_expr).upper())
+        if not match or match.group(2) not in DAY_TO_NUM:
+            continue
+
+        # Position ermitteln (0 = alle, 1 = erster, 2 = zweiter, -1 = letzter, etc.)
+        pos, day = match.groups()
+        try:
+            position = int(pos) if pos else 0
+        except ValueError:
+            position = 0
+        parsed.append((position, DAY_TO_NUM[day]))
+    return parsed
+
+def byday_dates(byday, first_day, last_day):
+    """Liefert alle Tage zwischen first_day und last_day, die zu einem der BYDAY-Ausdrücke passen"""
+    dates = set()
+    for position, weekday in byday:
+        # Alle Vorkommen des Wochentags direkt berechnen (erstes Vorkommen, dann alle 7 Tage)
+        first = first_day + datetime.timedelta(days=(weekday - first_day.weekday()) % 7)
+        count = (last_day - first).days // 7 + 1
+        if count <= 0:
+            continue
+
+        if position == 0:
+            # Alle Vorkommen
+            dates.update(first + datetime.timedelta(weeks=i) for i in range(count))
+        elif 0 < position <= count:
+            # Positives Vorkommen (1. Montag, 2. Freitag, etc.)
+            dates.add(first + datetime.timedelta(weeks=position - 1))
+        elif position < 0 and -position <= count:
+            # Negatives Vorkommen (-1. Montag = letzter Montag, etc.)
+            dates.add(first + datetime.timedelta(weeks=count + position))
+    return dates
+
+def resolve_monthdays(bymonthday, days_in_month):
+    """Wandelt BYMONTHDAY-Werte (auch negative, -1 = letzter Tag) in gültige Tage des Monats um"""
+    days = set()
+    for day in bymonthday:
+        if 1 <= day <= days_in_month:
+            days.add(day)
+        elif -days_in_month <= day <= -1:
+            days.add(days_in_month + day + 1)
+    return days
+
+def monthly_dates(rule, year, month, event_start_date):
+    """Liefert die sortierten Termine eines Monats für eine MONTHLY-Regel"""
+    if rule.bymonth and month not in rule.bymonth:
+        return []
+
+    # Wochentag des Monatsersten und Anzahl der Tage nur einmal pro Monat ermitteln
+    _, days_in_month = calendar.monthrange(year, month)
+    first_day = datetime.date(year, month, 1)
+
+    if rule.bymonthday:
+        # BYMONTHDAY: Bestimmte Tage des Monats, ein zusätzliches BYDAY schränkt weiter ein
+        dates = {first_day.replace(day=day) for day in resolve_monthdays(rule.bymonthday, days_in_month)}
+        if rule.byday:
+            dates &= byday_dates(rule.byday, first_day, first_day.replace(day=days_in_month))
+    elif rule.byday:
+        # BYDAY: Wochentage, Positionen beziehen sich auf den Monat
+        dates = byday_dates(rule.byday, first_day, first_day.replace(day=days_in_month))
+    else:
+        # Ohne BYMONTHDAY und BYDAY gilt der Tag des Monats vom Starttermin
+        if event_start_date.day > days_in_month:
+            # Ungültiges Datum (z.B. 31. Februar)
+            return []
+        dates = {first_day.replace(day=event_start_date.day)}
+
+    return sorted(dates)
@@ -0,0 +1,138 @@
+import bisect
+import contextvars
+import datetime
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from .base import Occurrence
+from .expand import iter_recurring_event
+
+logger = logging.getLogger('ical-proxy')
+
+ONE_DAY = datetime.timedelta(days=1)
+
+# Im aktuellen Kontext ohne Cache expandieren (z.B. beim Profiling), andere Anfragen bleiben unberührt
+_bypass = contextvars.ContextVar('occurrence_cache_bypass', default=False)
+
+class OccurrenceCache:
+    """Cache der expandierten Termine pro Serie, der beim Verschieben des Zeitraums nur die Ränder nachberechnet"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'extends': 0, 'misses': 0, 'evictions': 0, 'expanded_days': 0}
+
+    def expand(self, key, event, start_date, end_date, exceptions, excluded_dates):
+        """Liefert die Termine einer Serie im Zeitraum, bereits berechnete Tage werden aus dem Cache übernommen"""
+        if self.max_entries <= 0 or _bypass.get():
+            return list(iter_recurring_event(event, start_date, end_date, exceptions, excluded_dates))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None or entry[1] < start_date or entry[0] > end_date:
+            # Kein Eintrag oder keine Überschneidung: ganzen Zeitraum expandieren
+            dates, instances = _expand_range(event, start_date, end_date, exceptions, excluded_dates)
+            self._put(key, (start_date, end_date, dates, instances), 'misses', (end_date - start_date).days + 1)
+            return instances
+
+        covered_start, covered_end, dates, instances = entry
+
+        # Überschneidung übernehmen, herausgefallene Tage verwerfen
+        lo = bisect.bisect_left(dates, start_date)
+        hi = bisect.bisect_right(dates, end_date)
+        new_dates = dates[lo:hi]
+        new_instances = instances[lo:hi]
+
+        if covered_start <= start_date and end_date <= covered_end:
+            with self._lock:
+                self._stats['hits'] += 1
+            return new_instances
+
+        # Nur die fehlenden Tage an den Rändern expandieren
+        expanded_days = 0
+        if start_date < covered_start:
+            head_dates, head_instances = _expand_range(event, start_date, covered_start - ONE_DAY, exceptions, excluded_dates)
+            new_dates = head_dates + new_dates
+            new_instances = head_instances + new_instances
+            expanded_days += (covered_start - start_date).days
+        if end_date > covered_end:
+            tail_dates, tail_instances = _expand_range(event, covered_end + ONE_DAY, end_date, exceptions, excluded_dates)
+            new_dates += tail_dates
+            new_instances += tail_instances
+            expanded_days += (end_date - covered_end).days
+
+        logger.debug(f"Expansion erweitert um {expanded_days} Tage (vorher {covered_start} bis {covered_end})")
+        self._put(key, (start_date, end_date, new_dates, new_instances), 'extends', expanded_days)
+        return new_instances
+
+    def _put(self, key, entry, counter, expanded_days):
+        with self._lock:
+            self._stats[counter] += 1
+            self._stats['expanded_days'] += expanded_days
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        """Liefert die Zähler des Caches als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            lookups = stats['hits'] + stats['extends'] + stats['misses']
+            stats['hit_rate'] = round((stats['hits'] + stats['extends']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    @contextmanager
+    def bypass(self):
+        """Expandiert im aktuellen Kontext jede Serie vollständig, ohne den Cache zu lesen oder zu füllen"""
+        token = _bypass.set(True)
+        try:
+            yield
+        finally:
+            _bypass.reset(token)
+
+    def clear(self):
+        """Leert den Cache"""
+        with self._lock:
+            self._entries.clear()
+
+def _expand_range(event, start_date, end_date, exceptions, excluded_dates):
+    # Termine mit ihrem Serien-Datum, nach dem beim Verschieben des Zeitraums geschnitten wird
+    dates = []
+    instances = []
+    for instance in iter_recurring_event(event, start_date, end_date, exceptions, excluded_dates):
+        dates.append(occurrence_date(instance))
+        instances.append(instance)
+    return dates, instances
+
+def occurrence_date(instance):
+    """Liefert das Datum, an dem ein Termin laut Regel stattfindet (bei Ausnahmen das der RECURRENCE-ID)"""
+    if isinstance(instance, Occurrence):
+        value = instance.start
+    else:
+        value = instance.get('recurrence-id').dt
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+def master_cache_key(event, exceptions):
+    """Erzeugt den Cache-Schlüssel aus dem Inhalt des Originaltermins samt seiner Ausnahmen"""
+    digest = hashlib.sha1()
+    digest.update(event.to_ical())
+    for ex in exceptions:
+        digest.update(b'\x00')
+        digest.update(ex.to_ical())
+    return digest.hexdigest()
+
+occurrence_cache = OccurrenceCache(
+    max_entries=int(os.environ.get('OCCURRENCE_CACHE_MAX_ENTRIES', 4096))
+)
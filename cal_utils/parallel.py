@@ -0,0 +1,144 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from cal_utils.ical_processor import Calendar
+from cal_utils.series import split_events, render_series
+
+logger = logging.getLogger('ical-proxy')
+
+# Mehr Pakete als Prozesse, damit ungleich teure Serien sich besser verteilen
+BATCHES_PER_WORKER = 4
+
+class ParallelExpander:
+    """Verteilt die Expansion großer Kalender paketweise auf einen Prozess-Pool"""
+
+    def __init__(self, workers=0, threshold=500):
+        self.workers = workers
+        self.threshold = threshold
+        self._pool = None
+        self._lock = threading.Lock()
+        self._stats = {'parallel_renders': 0, 'serial_renders': 0, 'batches': 0, 'pool_failures': 0}
+
+    def should_parallelize(self, master_count, debug_mode=False):
+        """Prüft, ob sich die parallele Expansion für die Anzahl der Serien lohnt"""
+        # Im Debug-Modus seriell bleiben, damit die Debug-Logs im Hauptprozess landen
+        parallel = self.workers > 1 and master_count >= self.threshold and not debug_mode
+        with self._lock:
+            self._stats['parallel_renders' if parallel else 'serial_renders'] += 1
+        return parallel
+
+    def render(self, cal, recurring_events, exceptions, start_date, end_date, template_output):
+        """Liefert Datum und ICS-Bytes aller Instanzen in der Reihenfolge von recurring_events"""
+        uids = list(recurring_events)
+        batches = partition(uids, self.workers * BATCHES_PER_WORKER)
+
+        # Zeitzonen mitschicken, damit eigene TZIDs in den Prozessen genauso aufgelöst werden
+        timezones = b''.join(tz.to_ical() for tz in cal.walk('VTIMEZONE'))
+        payloads = [
+            encode_batch(timezones, [recurring_events[uid] for uid in batch], exceptions, batch)
+            for batch in batches
+        ]
+
+        try:
+            pool = self._get_pool()
+            futures = [
+                pool.submit(render_batch, payload, start_date, end_date, template_output)
+                for payload in payloads
+            ]
+        except Exception as e:
+            logger.warning(f"Prozess-Pool nicht verfügbar: {e}. Expandiere seriell.")
+            futures = []
+            self._reset_pool(failed=True)
+
+        with self._lock:
+            self._stats['batches'] += len(futures)
+
+        # Ergebnisse in fester Reihenfolge zusammenführen, fehlgeschlagene Pakete seriell nachholen
+        for index, batch in enumerate(batches):
+            if index < len(futures):
+                try:
+                    yield from futures[index].result()
+                    continue
+                except Exception as e:
+                    logger.warning(f"Paralleles Paket fehlgeschlagen: {e}. Expandiere seriell.")
+                    for future in futures[index + 1:]:
+                        future.cancel()
+                    futures = futures[:index]
+                    self._reset_pool(failed=True)
+
+            for uid in batch:
+                yield from render_series(
+                    recurring_events[uid], exceptions.get(uid, []), start_date, end_date, False, template_output
+                )
+
+    def resize(self, workers):
+        """Ändert die Anzahl der Prozesse, ein laufender Pool wird beendet"""
+        self.workers = workers
+        self._reset_pool()
+
+    def shutdown(self):
+        """Beendet den Prozess-Pool"""
+        self._reset_pool()
+
+    def stats(self):
+        """Liefert Konfiguration und Zähler als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['workers'] = self.workers
+        stats['threshold'] = self.threshold
+        return stats
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn statt fork, da der Server mit Threads arbeitet
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _reset_pool(self, failed=False):
+        with self._lock:
+            if failed:
+                self._stats['pool_failures'] += 1
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+def partition(items, parts):
+    """Teilt eine Liste in höchstens parts zusammenhängende, etwa gleich große Pakete"""
+    parts = max(1, min(parts, len(items)))
+    size, rest = divmod(len(items), parts)
+    batches = []
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < rest else 0)
+        batches.append(items[start:end])
+        start = end
+    return batches
+
+def encode_batch(timezones, masters, exceptions, uids):
+    """Serialisiert die Serien eines Pakets samt Ausnahmen und Zeitzonen als kompakten ICS-Block"""
+    parts = [b'BEGIN:VCALENDAR\r\n', timezones]
+    for uid, master in zip(uids, masters):
+        parts.append(master.to_ical())
+        for ex in exceptions.get(uid, []):
+            parts.append(ex.to_ical())
+    parts.append(b'END:VCALENDAR\r\n')
+    return b''.join(parts)
+
+def render_batch(payload, start_date, end_date, template_output):
+    """Expandiert die Serien eines Pakets im Prozess und liefert Datum und ICS-Bytes aller Instanzen"""
+    cal = Calendar.from_ical(payload)
+    _, recurring_events, exceptions = split_events(cal)
+    chunks = []
+    for uid, event in recurring_events.items():
+        chunks.extend(render_series(event, exceptions.get(uid, []), start_date, end_date, False, template_output))
+    return chunks
+
+parallel_expander = ParallelExpander(
+    workers=int(os.environ.get('PARALLEL_EXPANSION_WORKERS', 0)),
+    threshold=int(os.environ.get('PARALLEL_EXPANSION_THRESHOLD', 500))
+)
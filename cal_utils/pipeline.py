@@ -0,0 +1,219 @@
+import datetime
+import logging
+import os
+from cal_utils.ical_processor import Calendar, sanitize_calendar
+from cal_utils.fetch import fetch_calendar
+from cal_utils.cache import render_cache
+from cal_utils.singleflight import SingleFlight
+from cal_utils.template import TEMPLATE_OUTPUT
+from cal_utils.series import split_events, render_series
+from cal_utils.parallel import parallel_expander
+from cal_utils.window import ExpandedCalendar, SupersetWindow
+from cal_utils.metrics import stage_timer, upstream_bytes_total, instances_total
+
+logger = logging.getLogger('ical-proxy')
+
+# Standardzeitraum für die Terminexpansion
+DEFAULT_DAYS_BEFORE = 30
+DEFAULT_DAYS_AFTER = 365
+
+# Abschluss jeder ICS-Ausgabe
+CALENDAR_FOOTER = b'END:VCALENDAR\r\n'
+
+# Kanonischer Gesamtzeitraum: engere Zeiträume werden daraus ausgeschnitten statt neu expandiert
+superset_window = SupersetWindow(
+    days_before=max(int(os.environ.get('WINDOW_SUPERSET_DAYS_BEFORE', 90)), DEFAULT_DAYS_BEFORE),
+    days_after=max(int(os.environ.get('WINDOW_SUPERSET_DAYS_AFTER', 365)), DEFAULT_DAYS_AFTER)
+)
+
+# Gleichzeitige Anfragen für dieselbe Quelle und denselben Zeitraum teilen sich eine Verarbeitung
+render_flight = SingleFlight()
+
+def resolve_window(days_before=DEFAULT_DAYS_BEFORE, days_after=DEFAULT_DAYS_AFTER):
+    """Berechnet Start- und Enddatum des Expansionszeitraums relativ zu heute"""
+    today = datetime.datetime.now().date()
+    start_date = today - datetime.timedelta(days=days_before)
+    end_date = today + datetime.timedelta(days=days_after)
+    return start_date, end_date
+
+def render_source(calendar_url, start_date, end_date, debug_mode=False):
+    """Lädt einen Quell-Kalender und liefert den vereinfachten Kalender, nach Möglichkeit aus dem Render-Cache"""
+    key = (calendar_url, start_date, end_date, debug_mode)
+    return render_flight.do(
+        key, lambda: _render_source(calendar_url, start_date, end_date, debug_mode)
+    )
+
+def _render_source(calendar_url, start_date, end_date, debug_mode):
+    fetched = _fetch_source(calendar_url)
+
+    # Zeiträume innerhalb des Gesamtzeitraums aus dessen sortierten Terminen ausschneiden
+    superset_start, superset_end = resolve_window(superset_window.days_before, superset_window.days_after)
+    if not debug_mode and superset_start <= start_date and end_date <= superset_end:
+        expanded = _expanded_superset(calendar_url, fetched, superset_start, superset_end)
+        exact = start_date == superset_start and end_date == superset_end
+        superset_window.count('exact' if exact else 'slice')
+        return expanded.render(start_date, end_date)
+
+    superset_window.count('miss')
+
+    # Bereits gerenderte Ausgabe wiederverwenden, wenn Quelle, Inhalt und Zeitraum identisch sind
+    cache_key = (calendar_url, fetched.content_hash, start_date, end_date, debug_mode)
+    ical_data = render_cache.get(cache_key)
+
+    if ical_data is None:
+        ical_data = render_calendar(fetched.content, start_date, end_date, debug_mode)
+        render_cache.put(cache_key, ical_data)
+    else:
+        logger.info("Serving calendar from render cache")
+
+    return ical_data
+
+def _expanded_superset(calendar_url, fetched, superset_start, superset_end):
+    cache_key = ('superset', calendar_url, fetched.content_hash, superset_start, superset_end)
+    expanded = render_cache.get(cache_key)
+    if expanded is not None:
+        return expanded
+
+    def build():
+        logger.info(f"Expanding superset window {superset_start} to {superset_end}")
+        built = expand_calendar(fetched.content, superset_start, superset_end)
+        render_cache.put(cache_key, built)
+        superset_window.count('builds')
+        return built
+
+    # Gleichzeitige Anfragen mit unterschiedlichen Zeiträumen teilen sich die Expansion
+    return render_flight.do(cache_key, build)
+
+def expand_calendar(cal_content, start_date, end_date, template_output=None):
+    """Expandiert einen Kalender für einen Zeitraum zu nach Datum sortierten Terminen, aus denen Teilzeiträume ausgeschnitten werden können"""
+    with stage_timer('parse'):
+        cal = Calendar.from_ical(cal_content)
+    with stage_timer('sanitize'):
+        header = sanitize_calendar(cal).to_ical()[:-len(CALENDAR_FOOTER)]
+    dated_chunks = iter_dated_chunks(cal, start_date, end_date, False, template_output)
+    return ExpandedCalendar(header, CALENDAR_FOOTER, start_date, end_date, dated_chunks)
+
+def stream_source(calendar_url, start_date, end_date, debug_mode=False):
+    """Wie render_source, liefert aber einen Generator, der die Ausgabe stückweise erzeugt"""
+    fetched = _fetch_source(calendar_url)
+
+    # Bereits expandierten Gesamtzeitraum verwenden, sonst streamen statt ihn erst aufzubauen
+    superset_start, superset_end = resolve_window(superset_window.days_before, superset_window.days_after)
+    if not debug_mode and superset_start <= start_date and end_date <= superset_end:
+        expanded = render_cache.get(('superset', calendar_url, fetched.content_hash, superset_start, superset_end))
+        if expanded is not None:
+            exact = start_date == superset_start and end_date == superset_end
+            superset_window.count('exact' if exact else 'slice')
+            return iter([expanded.render(start_date, end_date)])
+
+    superset_window.count('miss')
+
+    cache_key = (calendar_url, fetched.content_hash, start_date, end_date, debug_mode)
+    ical_data = render_cache.get(cache_key)
+    if ical_data is not None:
+        logger.info("Serving calendar from render cache")
+        return iter([ical_data])
+
+    chunks = stream_calendar(fetched.content, start_date, end_date, debug_mode)
+    return _log_stream_errors(chunks)
+
+def _log_stream_errors(chunks):
+    # Nach dem ersten Byte kann kein Fehlerstatus mehr gesendet werden, daher nur protokollieren
+    try:
+        yield from chunks
+    except Exception:
+        logger.exception("Error while streaming calendar")
+        raise
+
+def _fetch_source(calendar_url):
+    # Kalender herunterladen
+    logger.info(f"Downloading calendar from {calendar_url}")
+    with stage_timer('fetch'):
+        fetched = fetch_calendar(calendar_url)
+
+    if fetched.from_cache:
+        logger.info(f"Calendar not modified, using cached copy, size: {len(fetched.content)} bytes")
+    else:
+        logger.info(f"Downloaded calendar, size: {len(fetched.content)} bytes")
+        upstream_bytes_total.inc(amount=len(fetched.content))
+
+    timings = fetched.timings
+    logger.info(
+        f"Upstream timing: connect={timings['connect'] * 1000:.1f}ms, "
+        f"ttfb={timings['ttfb'] * 1000:.1f}ms, body={timings['body'] * 1000:.1f}ms"
+    )
+    return fetched
+
+def render_calendar(cal_content, start_date, end_date, debug_mode=False, template_output=None):
+    """Verarbeitet die Rohdaten eines Kalenders und liefert den vereinfachten Kalender als ICS-Bytes"""
+    return b''.join(stream_calendar(cal_content, start_date, end_date, debug_mode, template_output))
+
+def stream_calendar(cal_content, start_date, end_date, debug_mode=False, template_output=None):
+    """Parst den Kalender sofort und liefert einen Generator, der die Ausgabe stückweise erzeugt"""
+    # Original-Kalender parsen (vor dem ersten Byte, damit Parse-Fehler noch als 500 gemeldet werden können)
+    with stage_timer('parse'):
+        cal = Calendar.from_ical(cal_content)
+    if template_output is None:
+        template_output = TEMPLATE_OUTPUT
+    return _iter_calendar_chunks(cal, start_date, end_date, debug_mode, template_output)
+
+def _iter_calendar_chunks(cal, start_date, end_date, debug_mode, template_output):
+    # Neuen Kalender erstellen, Kopf mit VTIMEZONEs sofort ausgeben
+    with stage_timer('sanitize'):
+        header = sanitize_calendar(cal).to_ical()[:-len(CALENDAR_FOOTER)]
+    yield header
+
+    yield from iter_event_chunks(cal, start_date, end_date, debug_mode, template_output)
+
+    yield CALENDAR_FOOTER
+
+def iter_event_chunks(cal, start_date, end_date, debug_mode=False, template_output=None):
+    """Liefert die ICS-Bytes aller Termine im Zeitraum ohne Kalenderkopf und -abschluss"""
+    for _, chunk in iter_dated_chunks(cal, start_date, end_date, debug_mode, template_output):
+        yield chunk
+
+def iter_dated_chunks(cal, start_date, end_date, debug_mode=False, template_output=None):
+    """Liefert für alle Termine im Zeitraum das maßgebliche Datum und die ICS-Bytes"""
+    if template_output is None:
+        template_output = TEMPLATE_OUTPUT
+
+    # Termine nach Typ sortieren
+    with stage_timer('classify'):
+        normal_events, recurring_events, exceptions = split_events(cal)
+
+    # Normale Termine übernehmen, wenn sie im Zeitraum liegen
+    for event in normal_events:
+        dtstart = event.get('dtstart').dt
+
+        # Prüfen, ob im Zeitraum
+        if isinstance(dtstart, datetime.datetime):
+            event_date = dtstart.date()
+        else:
+            event_date = dtstart
+
+        if start_date <= event_date <= end_date:
+            # UID anpassen, um Konflikte zu vermeiden
+            event_uid = str(event.get('uid', ''))
+            # Stabile UID generieren
+            if isinstance(dtstart, datetime.datetime):
+                date_str = dtstart.date().isoformat()
+            else:
+                date_str = dtstart.isoformat()
+
+            stable_uid = f"{event_uid}-{date_str}"
+            event['uid'] = stable_uid
+
+            with stage_timer('serialize'):
+                chunk = event.to_ical()
+            instances_total.inc()
+            yield event_date, chunk
+
+    # Wiederkehrende Termine expandieren, große Kalender auf mehrere Prozesse verteilt
+    if parallel_expander.should_parallelize(len(recurring_events), debug_mode):
+        logger.info(f"Expanding {len(recurring_events)} recurring events on {parallel_expander.workers} processes")
+        yield from parallel_expander.render(cal, recurring_events, exceptions, start_date, end_date, template_output)
+    else:
+        for uid, event in recurring_events.items():
+            # Ausnahmen für diesen wiederkehrenden Termin
+            event_exceptions = exceptions.get(uid, [])
+            yield from render_series(event, event_exceptions, start_date, end_date, debug_mode, template_output)
@@ -0,0 +1,90 @@
+import cProfile
+import logging
+import os
+import pstats
+import threading
+import time
+from cal_utils.occurrencecache import occurrence_cache
+from cal_utils.metrics import track_request_stages, request_stages, untrack_request_stages
+from cal_utils.pipeline import render_calendar, _fetch_source
+
+logger = logging.getLogger('ical-proxy')
+
+# Profiling per ?profile=true nur, wenn ausdrücklich freigeschaltet
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', 'false').lower() == 'true'
+
+# Maximale Anzahl der Funktionen im Profil
+PROFILE_MAX_FUNCTIONS = 100
+
+# Sortierschlüssel für das Profil: Gesamtdauer inklusive Unteraufrufen oder nur in der Funktion selbst
+PROFILE_SORT_KEYS = {'cumulative': 3, 'tottime': 2, 'calls': 1}
+
+# Es kann immer nur ein Profiler gleichzeitig aktiv sein
+_profile_lock = threading.Lock()
+
+def profile_render(calendar_url, start_date, end_date, debug_mode=False, sort='cumulative', limit=30):
+    """Lädt und rendert einen Kalender unter cProfile und liefert die teuersten Funktionen, None wenn bereits ein Profiling läuft"""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        return _profile_render(calendar_url, start_date, end_date, debug_mode, sort, limit)
+    finally:
+        _profile_lock.release()
+
+def _profile_render(calendar_url, start_date, end_date, debug_mode, sort, limit):
+    profiler = cProfile.Profile()
+    token = track_request_stages()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            # Immer neu rendern und expandieren, ein Treffer im Render- oder Occurrence-Cache würde den Hot Path nicht zeigen
+            fetched = _fetch_source(calendar_url)
+            with occurrence_cache.bypass():
+                ical_data = render_calendar(fetched.content, start_date, end_date, debug_mode)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+        stages = request_stages()
+    finally:
+        untrack_request_stages(token)
+
+    logger.info(f"Profiled calendar {calendar_url} in {elapsed * 1000:.1f}ms")
+    return {
+        "source": calendar_url,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "output_bytes": len(ical_data),
+        "total_seconds": round(elapsed, 6),
+        "stages": {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        "sort": sort,
+        "functions": hot_functions(profiler, sort, limit)
+    }
+
+def hot_functions(profiler, sort='cumulative', limit=30):
+    """Liefert die teuersten Funktionen eines Profils, sortiert nach dem gewählten Schlüssel"""
+    index = PROFILE_SORT_KEYS[sort]
+    limit = max(1, min(limit, PROFILE_MAX_FUNCTIONS))
+    entries = sorted(pstats.Stats(profiler).stats.items(), key=lambda item: item[1][index], reverse=True)
+
+    functions = []
+    for (filename, line, name), (primitive_calls, calls, tottime, cumtime, _) in entries[:limit]:
+        functions.append({
+            "function": name,
+            "file": short_path(filename),
+            "line": line,
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+            "percall": round(cumtime / calls, 9) if calls else 0.0
+        })
+    return functions
+
+def short_path(filename):
+    """Kürzt Dateipfade auf das Paketverzeichnis, damit Profile und Aufrufstapel lesbar bleiben"""
+    for marker in ('cal_utils', 'site-packages'):
+        position = filename.find(marker)
+        if position != -1:
+            return filename[position:]
+    return filename
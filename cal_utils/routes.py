@@ -7,6 +7,7 @@ from .ical_processor import (
     Calendar, sanitize_calendar, extract_excluded_dates, 
     expand_recurring_event
 )
+from .http_client import get_upstream_client
 
 logger = logging.getLogger('ical-proxy')
 
@@ -30,7 +31,7 @@ def debug_calendar():
     
     try:
         # Kalender herunterladen
-        response = requests.get(calendar_url)
+        response = get_upstream_client().get(calendar_url)
         response.raise_for_status()
         
         cal_content = response.content
@@ -119,7 +120,7 @@ def serve_simplified_calendar():
     try:
         # Kalender herunterladen
         logger.info(f"Downloading calendar from {calendar_url}")
-        response = requests.get(calendar_url)
+        response = get_upstream_client().get(calendar_url)
         response.raise_for_status()  # Wirft Fehler bei HTTP-Fehlercodes
         
         cal_content = response.content
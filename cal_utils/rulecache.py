@@ -0,0 +1,86 @@
+import datetime
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+class RuleCache:
+    """LRU-Cache für kompilierte Wiederholungsregeln, begrenzt durch die Anzahl der Einträge"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'failures': 0}
+
+    def get_or_compile(self, key, compile_fn):
+        """Liefert die kompilierte Regel zum Schlüssel oder kompiliert sie mit compile_fn()"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+            else:
+                self._stats['misses'] += 1
+
+        if entry is None:
+            try:
+                entry = (compile_fn(), None)
+            except Exception as e:
+                # Auch nicht kompilierbare Regeln merken, damit sie nicht bei jeder Abfrage neu geparst werden
+                entry = (None, e)
+                with self._lock:
+                    self._stats['failures'] += 1
+            self._put(key, entry)
+
+        rule, error = entry
+        if error is not None:
+            raise ValueError(f"RRULE konnte nicht kompiliert werden: {error}")
+        return rule
+
+    def _put(self, key, entry):
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def stats(self):
+        """Liefert die Zähler des Caches als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Leert den Cache"""
+        with self._lock:
+            self._entries.clear()
+
+def rule_cache_key(uid, dtstart, rrule_val, excluded_dates):
+    """Erzeugt den Cache-Schlüssel aus UID, DTSTART, unveränderter RRULE und EXDATE-Menge"""
+    if isinstance(dtstart, datetime.datetime):
+        dtstart_key = f"{dtstart.isoformat()}|{dtstart.tzinfo}"
+    else:
+        dtstart_key = dtstart.isoformat()
+
+    raw_rrule = rrule_val.to_ical() if hasattr(rrule_val, 'to_ical') else repr(rrule_val).encode('utf-8')
+    exdates = ','.join(sorted(d.isoformat() for d in excluded_dates))
+
+    digest = hashlib.sha1()
+    for part in (uid.encode('utf-8'), dtstart_key.encode('utf-8'), raw_rrule, exdates.encode('utf-8')):
+        digest.update(part)
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+rule_cache = RuleCache(
+    max_entries=int(os.environ.get('RULE_CACHE_MAX_ENTRIES', 1024))
+)
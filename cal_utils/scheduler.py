@@ -0,0 +1,216 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from cal_utils.pipeline import (
+    DEFAULT_DAYS_BEFORE, DEFAULT_DAYS_AFTER, resolve_window, render_source
+)
+
+logger = logging.getLogger('ical-proxy')
+
+# Fertig gerenderter Kalender für den Standardzeitraum
+ReadyResult = namedtuple('ReadyResult', ['ical_data', 'window_date', 'refreshed_at'])
+
+def load_allowed_sources(raw):
+    """Liest die kommagetrennte Liste der Quellen, die zusätzlich zu SOURCE_CALENDAR_URL im Hintergrund aktualisiert werden"""
+    return {url.strip() for url in raw.split(',') if url.strip()}
+
+class RefreshScheduler:
+    """Aktualisiert SOURCE_CALENDAR_URL und freigegebene Quell-Kalender im Hintergrund und hält das Ergebnis für den Standardzeitraum bereit"""
+
+    def __init__(self, interval=300, source_ttl=900, allowed_sources=None, max_sources=32, max_bytes=16 * 1024 * 1024):
+        self.interval = interval
+        self.source_ttl = source_ttl
+        self.allowed_sources = set(allowed_sources or ())
+        self.max_sources = max_sources
+        self.max_bytes = max_bytes
+        self._sources = OrderedDict()
+        self._results = OrderedDict()
+        self._results_size = 0
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'served_fresh': 0,
+            'served_stale': 0,
+            'source_evictions': 0,
+            'result_evictions': 0,
+        }
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def start(self):
+        """Startet den Hintergrund-Thread (nur einmal)"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='calendar-refresh', daemon=True)
+        self._thread.start()
+        logger.info(f"Background refresh started, interval: {self.interval}s")
+
+    def stop(self):
+        """Beendet den Hintergrund-Thread"""
+        self._stop.set()
+
+    def accepts(self, calendar_url):
+        """Nur SOURCE_CALENDAR_URL und freigegebene Quellen werden im Hintergrund aktualisiert, alle anderen nur bei Bedarf"""
+        if not self.enabled or not calendar_url:
+            return False
+        return calendar_url == os.environ.get('SOURCE_CALENDAR_URL', '') or calendar_url in self.allowed_sources
+
+    def touch(self, calendar_url):
+        """Merkt sich eine angefragte, freigegebene Quell-URL für die Hintergrundaktualisierung"""
+        if not self.accepts(calendar_url):
+            return
+        with self._lock:
+            self._sources[calendar_url] = time.monotonic()
+            self._sources.move_to_end(calendar_url)
+            while len(self._sources) > self.max_sources:
+                oldest, _ = self._sources.popitem(last=False)
+                self._drop_result(oldest)
+                self._stats['source_evictions'] += 1
+
+    def known_sources(self):
+        """Liefert alle Quellen, die aktualisiert werden sollen, und vergisst lange nicht angefragte"""
+        now = time.monotonic()
+        default_url = os.environ.get('SOURCE_CALENDAR_URL', '')
+        with self._lock:
+            for url, last_requested in list(self._sources.items()):
+                if now - last_requested > self.source_ttl:
+                    del self._sources[url]
+                    if url != default_url:
+                        self._drop_result(url)
+            sources = list(self._sources)
+
+        if default_url and default_url not in sources:
+            sources.insert(0, default_url)
+        return sources
+
+    def get(self, calendar_url):
+        """Liefert das zuletzt fertige Ergebnis und stößt bei veraltetem Ergebnis eine Aktualisierung an"""
+        if not self.accepts(calendar_url):
+            return None
+        with self._lock:
+            result = self._results.get(calendar_url)
+            if result is not None:
+                self._results.move_to_end(calendar_url)
+
+        if result is None:
+            return None
+
+        if self._is_stale(result):
+            # Veraltetes Ergebnis ausliefern, Aktualisierung läuft im Hintergrund
+            self.refresh_async(calendar_url)
+            with self._lock:
+                self._stats['served_stale'] += 1
+        else:
+            with self._lock:
+                self._stats['served_fresh'] += 1
+
+        return result.ical_data
+
+    def store(self, calendar_url, ical_data):
+        """Speichert ein Ergebnis für den Standardzeitraum, begrenzt durch das Byte-Budget (älteste Ergebnisse werden verdrängt)"""
+        if not self.accepts(calendar_url) or len(ical_data) > self.max_bytes:
+            return
+        with self._lock:
+            self._drop_result(calendar_url)
+            self._results[calendar_url] = ReadyResult(
+                ical_data, datetime.datetime.now().date(), time.monotonic()
+            )
+            self._results_size += len(ical_data)
+            while self._results_size > self.max_bytes:
+                oldest = next(iter(self._results))
+                self._drop_result(oldest)
+                self._stats['result_evictions'] += 1
+
+    def _drop_result(self, calendar_url):
+        result = self._results.pop(calendar_url, None)
+        if result is not None:
+            self._results_size -= len(result.ical_data)
+
+    def refresh(self, calendar_url):
+        """Lädt und expandiert eine Quelle für den Standardzeitraum neu"""
+        start_date, end_date = resolve_window(DEFAULT_DAYS_BEFORE, DEFAULT_DAYS_AFTER)
+        try:
+            ical_data = render_source(calendar_url, start_date, end_date)
+        except Exception as e:
+            # Das alte Ergebnis bleibt erhalten
+            logger.warning(f"Background refresh of {calendar_url} failed: {e}")
+            with self._lock:
+                self._stats['refresh_failures'] += 1
+            return False
+
+        self.store(calendar_url, ical_data)
+        with self._lock:
+            self._stats['refreshes'] += 1
+        return True
+
+    def refresh_async(self, calendar_url):
+        """Startet eine Aktualisierung in einem eigenen Thread, sofern nicht bereits eine läuft"""
+        with self._lock:
+            if calendar_url in self._inflight:
+                return
+            self._inflight.add(calendar_url)
+
+        def run():
+            try:
+                self.refresh(calendar_url)
+            finally:
+                with self._lock:
+                    self._inflight.discard(calendar_url)
+
+        threading.Thread(target=run, name='calendar-refresh-once', daemon=True).start()
+
+    def _is_stale(self, result):
+        if result.window_date != datetime.datetime.now().date():
+            # Der Zeitraum hat sich seit der letzten Aktualisierung verschoben
+            return True
+        return time.monotonic() - result.refreshed_at > self.interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            for calendar_url in self.known_sources():
+                if self._stop.is_set():
+                    break
+                with self._lock:
+                    if calendar_url in self._inflight:
+                        continue
+                    self._inflight.add(calendar_url)
+                try:
+                    self.refresh(calendar_url)
+                finally:
+                    with self._lock:
+                        self._inflight.discard(calendar_url)
+
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        """Liefert die Zähler des Schedulers als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['known_sources'] = len(self._sources)
+            stats['ready_results'] = len(self._results)
+            stats['results_bytes'] = self._results_size
+            stats['max_bytes'] = self.max_bytes
+            stats['allowed_sources'] = len(self.allowed_sources)
+            stats['interval'] = self.interval
+        return stats
+
+_refresh_interval = int(os.environ.get('REFRESH_INTERVAL', 300))
+
+refresh_scheduler = RefreshScheduler(
+    interval=_refresh_interval,
+    # Standard: drei Intervalle ohne Anfrage
+    source_ttl=int(os.environ.get('REFRESH_SOURCE_TTL', 3 * _refresh_interval)),
+    allowed_sources=load_allowed_sources(os.environ.get('REFRESH_SOURCES', '')),
+    max_sources=int(os.environ.get('REFRESH_MAX_SOURCES', 32)),
+    max_bytes=int(os.environ.get('REFRESH_MAX_BYTES', 16 * 1024 * 1024))
+)
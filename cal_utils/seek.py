@@ -0,0 +1,112 @@
+import bisect
+import datetime
+
+# Serien mit COUNT werden nur bis zu dieser Länge vollständig vorberechnet
+MAX_MATERIALIZED_OCCURRENCES = 50000
+
+# Ohne diese Eigenschaften leitet dateutil Wochentag, Monatstag und Monat aus DTSTART ab
+_IMPLICIT_BLOCKERS = ('BYWEEKNO', 'BYYEARDAY', 'BYMONTHDAY', 'BYDAY', 'BYEASTER')
+
+class CompiledRule:
+    """Kompilierte dateutil-Regel, die direkt zum ersten Termin im angefragten Zeitraum springt"""
+
+    __slots__ = ('rule', 'dtstart', 'freq', 'interval', 'count', 'implicit', '_occurrences')
+
+    def __init__(self, rule, dtstart, sanitized_rrule):
+        self.rule = rule
+        self.dtstart = dtstart
+        self.freq = str(_first(sanitized_rrule.get('FREQ', ''))).upper()
+        self.interval = max(int(_first(sanitized_rrule.get('INTERVAL', 1))), 1)
+        self.count = sanitized_rrule.get('COUNT') is not None
+        self.implicit = self._implicit_properties(sanitized_rrule)
+        self._occurrences = None
+
+    def _implicit_properties(self, sanitized_rrule):
+        # Implizite BY*-Werte explizit machen, damit sie beim Verschieben von DTSTART erhalten bleiben
+        if any(key in sanitized_rrule for key in _IMPLICIT_BLOCKERS):
+            return {}
+        if self.freq == 'YEARLY':
+            implicit = {'bymonthday': self.dtstart.day}
+            if 'BYMONTH' not in sanitized_rrule:
+                implicit['bymonth'] = self.dtstart.month
+            return implicit
+        if self.freq == 'MONTHLY':
+            return {'bymonthday': self.dtstart.day}
+        if self.freq == 'WEEKLY':
+            return {'byweekday': self.dtstart.weekday()}
+        return {}
+
+    def between(self, start_dt, end_dt):
+        """Liefert alle Termine zwischen start_dt und end_dt (inklusive) wie rrule.between
+
+        Regeln mit TZID sind in naiver Ortszeit kompiliert: Zeitzonenbehaftete Grenzen werden dafür auf ihre Wanduhrzeit
+        reduziert, die Termine kommen naiv zurück. Ganztägige Serien liefern Datumswerte.
+        """
+        if not isinstance(start_dt, datetime.datetime):
+            occurrences = self._between(
+                datetime.datetime.combine(start_dt, datetime.time.min),
+                datetime.datetime.combine(end_dt, datetime.time.max)
+            )
+            return [occurrence.date() for occurrence in occurrences]
+        if self.dtstart.tzinfo is None and start_dt.tzinfo is not None:
+            return self._between(start_dt.replace(tzinfo=None), end_dt.replace(tzinfo=None))
+        return self._between(start_dt, end_dt)
+
+    def _between(self, start_dt, end_dt):
+        if self.count:
+            occurrences = self._materialized()
+            if occurrences is None:
+                return self.rule.between(start_dt, end_dt, inc=True)
+            first = bisect.bisect_left(occurrences, start_dt)
+            last = bisect.bisect_right(occurrences, end_dt)
+            return occurrences[first:last]
+
+        rule = self.rule
+        anchor = self._anchor(start_dt)
+        if anchor is not None:
+            rule = rule.replace(dtstart=anchor, **self.implicit)
+        return rule.between(start_dt, end_dt, inc=True)
+
+    def _materialized(self):
+        # Bei COUNT zählt jeder Termin ab DTSTART, daher einmal vollständig berechnen und per Bisektion suchen
+        if self._occurrences is None:
+            occurrences = []
+            for occurrence in self.rule:
+                occurrences.append(occurrence)
+                if len(occurrences) > MAX_MATERIALIZED_OCCURRENCES:
+                    occurrences = False
+                    break
+            self._occurrences = occurrences
+        return self._occurrences or None
+
+    def _anchor(self, start_dt):
+        # Gleichwertiger Startpunkt eine ganze Periode vor dem Zeitraum, liegt immer auf dem Raster der Serie
+        dtstart = self.dtstart
+
+        if self.freq in ('DAILY', 'WEEKLY'):
+            period_days = self.interval * (7 if self.freq == 'WEEKLY' else 1)
+            periods = (start_dt - dtstart).days // period_days - 1
+            if periods < 1:
+                return None
+            return dtstart + datetime.timedelta(days=periods * period_days)
+
+        if self.freq == 'MONTHLY':
+            months = (start_dt.year - dtstart.year) * 12 + start_dt.month - dtstart.month
+            periods = months // self.interval - 1
+            if periods < 1:
+                return None
+            month_index = dtstart.year * 12 + dtstart.month - 1 + periods * self.interval
+            return dtstart.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+        if self.freq == 'YEARLY':
+            periods = (start_dt.year - dtstart.year) // self.interval - 1
+            if periods < 1:
+                return None
+            return dtstart.replace(year=dtstart.year + periods * self.interval, month=1, day=1)
+
+        return None
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0] if value else ''
+    return value
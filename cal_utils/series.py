@@ -0,0 +1,95 @@
+import logging
+import time
+from cal_utils.ical_processor import extract_excluded_dates, instance_start, Occurrence
+from cal_utils.template import InstanceTemplate
+from cal_utils.occurrencecache import occurrence_cache, master_cache_key, occurrence_date
+from cal_utils.metrics import stage_timer, record_stage, instances_total
+
+logger = logging.getLogger('ical-proxy')
+
+def split_events(cal):
+    """Sortiert die Termine eines Kalenders in Einzeltermine, wiederkehrende Termine und Ausnahmen (nach UID)"""
+    normal_events = []
+    recurring_events = {}
+    exceptions = {}
+
+    for component in cal.walk('VEVENT'):
+        uid = str(component.get('uid', ''))
+
+        # Nach Typ sortieren
+        if component.get('recurrence-id'):
+            # Ausnahme für wiederkehrenden Termin
+            if uid not in exceptions:
+                exceptions[uid] = []
+            exceptions[uid].append(component)
+        elif component.get('rrule'):
+            # Wiederkehrender Termin
+            recurring_events[uid] = component
+        else:
+            # Normaler Einzeltermin
+            normal_events.append(component)
+
+    return normal_events, recurring_events, exceptions
+
+def render_series(event, event_exceptions, start_date, end_date, debug_mode, template_output):
+    """Expandiert einen wiederkehrenden Termin und liefert Datum und ICS-Bytes jeder Instanz"""
+    # Ausgeschlossene Termine extrahieren
+    excluded_dates = extract_excluded_dates(event)
+
+    # Zusätzliches Logging für Debugging
+    if 'summary' in event:
+        summary = str(event.get('summary', ''))
+        dtstart = event.get('dtstart').dt
+        start_str = dtstart.isoformat() if hasattr(dtstart, 'isoformat') else str(dtstart)
+
+        if 'rrule' in event:
+            rrule_info = {}
+            for key, val in event['rrule'].items():
+                if isinstance(val, list):
+                    rrule_info[key] = [str(v) for v in val]
+                else:
+                    rrule_info[key] = str(val)
+
+            logger.debug(f"Expandiere wiederkehrenden Termin: '{summary}' mit Start {start_str}, RRULE: {rrule_info}")
+        else:
+            logger.debug(f"Expandiere wiederkehrenden Termin: '{summary}' mit Start {start_str}")
+
+    # Unveränderte Serien nur an den Rändern des verschobenen Zeitraums neu expandieren
+    with stage_timer('expand'):
+        key = master_cache_key(event, event_exceptions)
+        instances = occurrence_cache.expand(key, event, start_date, end_date, event_exceptions, excluded_dates)
+
+    # Instanzen einzeln ausgeben, gemessen wird nur die Serialisierung, nicht die Zeit des Empfängers dazwischen
+    expanded_dates = []
+    template = None
+    emitted = 0
+    serialize_seconds = 0.0
+    try:
+        for instance in instances:
+            started = time.perf_counter()
+            if debug_mode:
+                start = instance_start(instance)
+                expanded_dates.append(
+                    start.isoformat() if hasattr(start, 'isoformat') else str(start)
+                )
+
+            if template_output and isinstance(instance, Occurrence):
+                # Unveränderliche Eigenschaften einmal pro Serie serialisieren, danach nur DTSTART/DTEND/UID einsetzen
+                if template is None:
+                    template = InstanceTemplate(instance)
+                chunk = template.render(instance)
+            else:
+                chunk = instance.to_ical()
+            instance_date = occurrence_date(instance)
+            serialize_seconds += time.perf_counter() - started
+
+            emitted += 1
+            yield instance_date, chunk
+    finally:
+        record_stage('serialize', serialize_seconds)
+        instances_total.inc(amount=emitted)
+
+    # Logging der expandierten Termine
+    if debug_mode and expanded_dates:
+        summary = str(event.get('summary', 'Unbekannt'))
+        logger.debug(f"Expandierte Termine für '{summary}': {', '.join(expanded_dates)}")
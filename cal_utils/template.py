@@ -0,0 +1,92 @@
+import datetime
+import os
+from icalendar.cal import types_factory
+from icalendar.parser import Contentline
+
+# Eigenschaften, die pro Instanz eingesetzt werden, alle anderen sind für eine Serie gleich
+STAMPED_PROPERTIES = ('DTSTART', 'DTEND', 'UID')
+
+# Zeichen, die vText maskiert; UIDs ohne diese Zeichen werden direkt übernommen
+_TEXT_ESCAPES = ('\\', ';', ',', '\n', '\r')
+
+# icalendar faltet ASCII-Zeilen ab 75 Zeichen
+_MAX_UNFOLDED = 74
+
+# Schneller Ausgabepfad über Byte-Vorlagen (false = jede Instanz über icalendar serialisieren)
+TEMPLATE_OUTPUT = os.environ.get('TEMPLATE_OUTPUT', 'true').lower() == 'true'
+
+def stamp_line(name, value):
+    """Serialisiert eine einzelne Eigenschaft genau wie Event.add() und Event.to_ical()"""
+    obj = types_factory.for_property(name)(value)
+    return Contentline.from_parts(name, obj.params, obj, sorted=True).to_ical() + b'\r\n'
+
+class InstanceTemplate:
+    """Vorab serialisierte, gefaltete Bytes eines Originaltermins, in die nur DTSTART, DTEND und UID eingesetzt werden"""
+
+    __slots__ = ('master', 'parts', '_date_prefixes')
+
+    def __init__(self, occurrence):
+        self.master = occurrence.master
+        self._date_prefixes = {}
+
+        # Vorlage aus einer vollständigen Beispielinstanz ableiten, damit Reihenfolge und Faltung identisch sind
+        prototype = occurrence.to_event()
+        parts = []
+        chunk = []
+        for name, value in prototype.property_items(sorted=True):
+            if name in STAMPED_PROPERTIES:
+                if chunk:
+                    parts.append(b''.join(chunk))
+                    chunk = []
+                parts.append(name)
+            else:
+                chunk.append(prototype.content_line(name, value, sorted=True).to_ical() + b'\r\n')
+        if chunk:
+            parts.append(b''.join(chunk))
+        self.parts = parts
+
+    def render(self, occurrence):
+        """Erzeugt die ICS-Bytes einer Instanz aus der Vorlage"""
+        out = []
+        for part in self.parts:
+            if isinstance(part, bytes):
+                out.append(part)
+            elif part == 'DTSTART':
+                out.append(self._date_line('DTSTART', occurrence.start))
+            elif part == 'DTEND':
+                if occurrence.end is not None:
+                    out.append(self._date_line('DTEND', occurrence.end))
+            else:
+                out.append(self._uid_line(occurrence.uid))
+        return b''.join(out)
+
+    def _date_line(self, name, value):
+        # Parameter (TZID, VALUE=DATE) und UTC-Suffix hängen nur von Typ und Zeitzone ab, nicht vom Datum
+        is_datetime = isinstance(value, datetime.datetime)
+        tzinfo = value.tzinfo if is_datetime else None
+        # Nicht jede tzinfo ist hashbar, daher über die Identität nachschlagen
+        key = (name, is_datetime, id(tzinfo))
+        prefix = self._date_prefixes.get(key)
+        if prefix is None or prefix[0] is not tzinfo:
+            obj = types_factory.for_property(name)(value)
+            params = obj.params.to_ical(sorted=True) if obj.params else b''
+            suffix = obj.to_ical()[15:] if is_datetime else b''
+            head = f"{name};{params.decode('utf-8')}:" if params else f"{name}:"
+            prefix = (tzinfo, head, suffix.decode('utf-8'))
+            self._date_prefixes[key] = prefix
+
+        _, head, suffix = prefix
+        if is_datetime:
+            line = f"{head}{value.year:04d}{value.month:02d}{value.day:02d}T{value.hour:02d}{value.minute:02d}{value.second:02d}{suffix}"
+        else:
+            line = f"{head}{value.year:04d}{value.month:02d}{value.day:02d}"
+
+        if len(line) > _MAX_UNFOLDED or not line.isascii():
+            return stamp_line(name, value)
+        return line.encode('ascii') + b'\r\n'
+
+    def _uid_line(self, uid):
+        line = f"UID:{uid}"
+        if len(line) > _MAX_UNFOLDED or not line.isascii() or any(c in uid for c in _TEXT_ESCAPES):
+            return stamp_line('UID', uid)
+        return line.encode('ascii') + b'\r\n'
@@ -0,0 +1,58 @@
+import bisect
+import threading
+
+class ExpandedCalendar:
+    """Für einen Gesamtzeitraum expandierter Kalender, dessen Termine nach Datum sortiert vorliegen"""
+
+    __slots__ = ('header', 'footer', 'start_date', 'end_date', 'dates', 'chunks', 'size')
+
+    def __init__(self, header, footer, start_date, end_date, dated_chunks):
+        self.header = header
+        self.footer = footer
+        self.start_date = start_date
+        self.end_date = end_date
+
+        # Termine am selben Tag nach ihren Bytes ordnen, damit die Reihenfolge nicht von der Quelle abhängt
+        dated_chunks = sorted(dated_chunks)
+        self.dates = [date for date, _ in dated_chunks]
+        self.chunks = [chunk for _, chunk in dated_chunks]
+        self.size = len(header) + len(footer) + sum(len(chunk) for chunk in self.chunks)
+
+    def __len__(self):
+        # Größe für den Render-Cache
+        return self.size
+
+    def render(self, start_date, end_date):
+        """Liefert den Kalender für einen Teilzeitraum, ausgeschnitten per Binärsuche"""
+        lo = bisect.bisect_left(self.dates, start_date)
+        hi = bisect.bisect_right(self.dates, end_date)
+        return b''.join((self.header, *self.chunks[lo:hi], self.footer))
+
+class SupersetWindow:
+    """Kanonischer Gesamtzeitraum pro Quelle und Tag, samt Zählern, wie Anfragen daraus bedient werden"""
+
+    def __init__(self, days_before, days_after):
+        self.days_before = days_before
+        self.days_after = days_after
+        self._lock = threading.Lock()
+        self._stats = {'exact': 0, 'slice': 0, 'miss': 0, 'builds': 0}
+
+    def extend(self, days_before, days_after):
+        """Vergrößert den Gesamtzeitraum, damit er auch diesen Zeitraum abdeckt"""
+        with self._lock:
+            self.days_before = max(self.days_before, days_before)
+            self.days_after = max(self.days_after, days_after)
+
+    def count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        """Liefert Gesamtzeitraum und Zähler als Dictionary"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['days_before'] = self.days_before
+            stats['days_after'] = self.days_after
+            requests = stats['exact'] + stats['slice'] + stats['miss']
+            stats['hit_rate'] = round((stats['exact'] + stats['slice']) / requests, 4) if requests else 0.0
+        return stats
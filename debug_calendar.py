@@ -2,14 +2,24 @@
 """
 Debug-Tool für Calendar-Proxy.
 Dieses Skript lädt einen Kalender, analysiert ihn und testet verschiedene Problembereiche.
+Mit --load simuliert es mehrere gleichzeitig pollende Clients und misst Durchsatz und Latenzen des Proxys.
 """
 
 import sys
 import os
+import math
+import time
+import random
+import socket
+import hashlib
 import argparse
 import requests
 import json
 import logging
+import threading
+import subprocess
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from icalendar import Calendar, Event
 
 # Logging einrichten
@@ -20,18 +30,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger('ical-debugger')
 
+def fetch(url):
+    """Lädt eine URL über den Upstream-Client des Proxys, ohne cal_utils fällt sie auf requests zurück"""
+    try:
+        from cal_utils.http_client import get_upstream_client
+    except ImportError:
+        return requests.get(url, timeout=30)
+    return get_upstream_client().get(url)
+
 def check_ical(calendar_url):
     """Überprüft eine .ics-Datei auf Standardkonformität"""
     logger.info(f"Überprüfe Kalender von URL: {calendar_url}")
     
     try:
         # Kalender herunterladen
-        response = requests.get(calendar_url)
+        response = fetch(calendar_url)
         response.raise_for_status()
         
         cal_content = response.content
         logger.info(f"Kalendergröße: {len(cal_content)} Bytes")
         
+        # Zeitmessung gibt es nur über den Upstream-Client
+        timings = getattr(response, 'timings', None)
+        if timings:
+            logger.info(
+                f"Download-Zeiten: Verbindung {timings['connect'] * 1000:.1f} ms, "
+                f"erstes Byte {timings['ttfb'] * 1000:.1f} ms, Body {timings['body'] * 1000:.1f} ms"
+            )
+        
         # Versuche, den Kalender zu parsen
         try:
             cal = Calendar.from_ical(cal_content)
@@ -134,13 +160,540 @@ def check_ical(calendar_url):
         logger.error(f"✗ Unerwarteter Fehler: {e}")
         return False
 
+# Standard-Mischung der Zeiträume im Lastmodus: Gewicht, days_before, days_after
+DEFAULT_LOAD_MIX = [
+    {"weight": 6, "days_before": 30, "days_after": 365},   # Standardzeitraum
+    {"weight": 3, "days_before": 7, "days_after": 60},     # engerer Zeitraum, aus dem Gesamtzeitraum ausgeschnitten
+    {"weight": 1, "days_before": 180, "days_after": 730},  # breiter als der Gesamtzeitraum
+]
+
+class FixtureServer:
+    """Lokaler HTTP-Server, der ICS-Dateien anstelle des Quell-Kalenders ausliefert (mit ETag und optionaler Verzögerung)"""
+
+    def __init__(self, calendars, host='127.0.0.1', delay=0.0):
+        fixtures = {
+            f"/{name}": (content, f'"{hashlib.sha1(content).hexdigest()}"')
+            for name, content in calendars.items()
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                fixture = fixtures.get(self.path.split('?')[0])
+                if fixture is None:
+                    self.send_error(404)
+                    return
+                if delay:
+                    time.sleep(delay)
+                content, etag = fixture
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/calendar')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, 0), Handler)
+        self.server.daemon_threads = True
+        self.urls = [f"http://{host}:{self.server.server_port}/{name}" for name in calendars]
+        threading.Thread(target=self.server.serve_forever, name='fixture-server', daemon=True).start()
+        logger.info(f"Fixture-Server gestartet: {', '.join(self.urls)}")
+
+    def close(self):
+        self.server.shutdown()
+
+def load_fixture_calendars(paths, preset=None):
+    """Liest die ICS-Dateien für den Fixture-Server, optional ergänzt um einen synthetischen Kalender"""
+    calendars = {}
+    for path in paths or []:
+        with open(path, 'rb') as f:
+            calendars[os.path.basename(path)] = f.read()
+    if preset:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+        from synthetic import PRESETS, generate_calendar
+        calendars[f"synthetic-{preset}.ics"] = generate_calendar(PRESETS[preset])
+    return calendars
+
+def load_mix(raw, sources):
+    """Erzeugt die gewichteten Anfragen aus der Mischung (JSON oder Pfad), Einträge ohne source gelten für alle Quellen"""
+    mix = DEFAULT_LOAD_MIX
+    if raw:
+        if os.path.exists(raw):
+            with open(raw, 'r', encoding='utf-8') as f:
+                mix = json.load(f)
+        else:
+            mix = json.loads(raw)
+
+    requests_mix = []
+    for entry in mix:
+        for source in ([entry['source']] if entry.get('source') else sources):
+            params = {
+                'source': source,
+                'days_before': int(entry.get('days_before', 30)),
+                'days_after': int(entry.get('days_after', 365)),
+            }
+            requests_mix.append((float(entry.get('weight', 1)), params))
+    return requests_mix
+
+def mix_label(params):
+    """Kurzbezeichnung einer Anfrage für den Bericht"""
+    return f"{params['source'].rsplit('/', 1)[-1]} -{params['days_before']}/+{params['days_after']}"
+
+def percentile(sorted_values, fraction):
+    """Perzentil nach dem Nearest-Rank-Verfahren aus einer sortierten Liste"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def process_rss(pid):
+    """Aktueller und maximaler Speicherbedarf (Bytes) eines Prozesses samt direkter Kindprozesse, None ohne /proc"""
+    pids = [pid]
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children", 'r') as f:
+                pids.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+
+    current = peak = 0
+    for member in pids:
+        try:
+            with open(f"/proc/{member}/status", 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        current += int(line.split()[1]) * 1024
+                    elif line.startswith('VmHWM:'):
+                        peak += int(line.split()[1]) * 1024
+        except OSError:
+            if member == pid:
+                return None
+    return current, peak
+
+class RssSampler:
+    """Tastet den Speicherbedarf des Proxys während des Lasttests regelmäßig ab"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_sampled = 0
+        self.peak_reported = 0
+        self.available = process_rss(pid) is not None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def start(self):
+        if self.available:
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = process_rss(self.pid)
+        if rss is not None:
+            self.peak_sampled = max(self.peak_sampled, rss[0])
+            self.peak_reported = max(self.peak_reported, rss[1])
+
+def spawn_proxy(extra_env=None):
+    """Startet den Proxy als eigenen Prozess auf einem freien Port und wartet auf den Health-Check"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    env = {**os.environ, 'PORT': str(port), 'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'WARNING'), **(extra_env or {})}
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    process = subprocess.Popen([sys.executable, app_path], env=env, stdout=subprocess.DEVNULL)
+    proxy_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Proxy wurde mit Exit-Code {process.returncode} beendet")
+        try:
+            if requests.get(f"{proxy_url}/health", timeout=1).status_code == 200:
+                logger.info(f"Proxy gestartet: {proxy_url} (PID {process.pid})")
+                return process, proxy_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    raise RuntimeError("Proxy hat nicht rechtzeitig auf /health geantwortet")
+
+def run_client(client_id, proxy_url, requests_mix, deadline, think_time, conditional, results, timeout):
+    """Ein simulierter Client: pollt den Proxy bis zum Ende der Laufzeit mit zufällig gewählten Anfragen aus der Mischung"""
+    rng = random.Random(client_id)
+    weights = [weight for weight, _ in requests_mix]
+    etags = {}
+    session = requests.Session()
+
+    while time.monotonic() < deadline:
+        index = rng.choices(range(len(requests_mix)), weights)[0]
+        params = requests_mix[index][1]
+        headers = {'Accept-Encoding': 'gzip'}
+        if conditional and index in etags:
+            headers['If-None-Match'] = etags[index]
+
+        started = time.perf_counter()
+        try:
+            response = session.get(proxy_url, params=params, headers=headers, timeout=timeout)
+            size = len(response.content)
+            status = response.status_code
+            if conditional and response.headers.get('ETag'):
+                etags[index] = response.headers['ETag']
+        except requests.RequestException as e:
+            status = type(e).__name__
+            size = 0
+        results.append((index, status, time.perf_counter() - started, size))
+
+        if think_time:
+            time.sleep(rng.uniform(0, 2 * think_time))
+
+def report_load(results, requests_mix, elapsed, rss):
+    """Fasst die Ergebnisse des Lasttests zusammen und gibt sie aus"""
+    ok_statuses = (200, 304)
+    latencies = sorted(latency for _, _, latency, _ in results)
+    statuses = Counter(str(status) for _, status, _, _ in results)
+    errors = sum(1 for _, status, _, _ in results if status not in ok_statuses)
+
+    summary = {
+        "requests": len(results),
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "statuses": dict(statuses),
+        "bytes_received": sum(size for _, _, _, size in results),
+        "latency_ms": latency_summary(latencies),
+        "by_request": {}
+    }
+    for index, (_, params) in enumerate(requests_mix):
+        entry_results = [result for result in results if result[0] == index]
+        if not entry_results:
+            continue
+        summary["by_request"][mix_label(params)] = {
+            "requests": len(entry_results),
+            "errors": sum(1 for _, status, _, _ in entry_results if status not in ok_statuses),
+            "latency_ms": latency_summary(sorted(latency for _, _, latency, _ in entry_results)),
+        }
+    if rss is not None and rss.available:
+        summary["proxy_peak_rss_bytes"] = rss.peak_sampled
+        summary["proxy_peak_rss_lifetime_bytes"] = rss.peak_reported
+
+    logger.info("== Ergebnis des Lasttests ==")
+    logger.info(
+        f"{summary['requests']} Anfragen in {elapsed:.1f} s, {summary['throughput_rps']} Anfragen/s, "
+        f"Fehlerrate {summary['error_rate']:.2%}, Status {summary['statuses']}"
+    )
+    latency = summary['latency_ms']
+    logger.info(f"Latenz: p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, max {latency['max']} ms")
+    for label, entry in summary["by_request"].items():
+        entry_latency = entry['latency_ms']
+        logger.info(
+            f"  {label}: {entry['requests']} Anfragen, {entry['errors']} Fehler, "
+            f"p50 {entry_latency['p50']} ms, p95 {entry_latency['p95']} ms, p99 {entry_latency['p99']} ms"
+        )
+    if "proxy_peak_rss_bytes" in summary:
+        logger.info(
+            f"Speicher des Proxys: Spitze während des Tests {summary['proxy_peak_rss_bytes'] / 1048576:.1f} MiB, "
+            f"seit Prozessstart {summary['proxy_peak_rss_lifetime_bytes'] / 1048576:.1f} MiB"
+        )
+    elif rss is not None:
+        logger.warning("Speicherbedarf des Proxys nicht verfügbar (nur unter Linux mit Zugriff auf /proc)")
+    return summary
+
+def latency_summary(sorted_latencies):
+    return {
+        name: round(percentile(sorted_latencies, fraction) * 1000, 2)
+        for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))
+    }
+
+def run_load_test(args):
+    """Lastmodus: mehrere Clients pollen den Proxy gleichzeitig mit einer Mischung aus Quellen und Zeiträumen"""
+    fixture = None
+    process = None
+    rss = None
+    try:
+        sources = [args.url] if args.url else []
+        calendars = load_fixture_calendars(args.fixture, args.fixture_preset)
+        if calendars:
+            fixture = FixtureServer(calendars, args.fixture_host, args.fixture_delay / 1000)
+            sources += fixture.urls
+        if not sources and not args.mix:
+            logger.error("✗ Keine Quelle angegeben (--url, --fixture, --fixture-preset oder source in --mix)")
+            return False
+
+        proxy_url = args.proxy_url
+        proxy_pid = args.proxy_pid
+        if args.spawn_proxy:
+            process, proxy_url = spawn_proxy()
+            proxy_pid = process.pid
+        if not proxy_url:
+            logger.error("✗ Keine Proxy-URL angegeben (--proxy-url oder --spawn-proxy)")
+            return False
+        proxy_url = proxy_url.rstrip('/') + '/'
+
+        requests_mix = load_mix(args.mix, sources)
+        if proxy_pid:
+            rss = RssSampler(proxy_pid)
+            rss.start()
+
+        logger.info(
+            f"Starte Lasttest: {args.clients} Clients, {args.duration} s, {len(requests_mix)} Anfragearten gegen {proxy_url}"
+        )
+        results = []
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        clients = [
+            threading.Thread(
+                target=run_client, name=f"load-client-{client_id}",
+                args=(client_id, proxy_url, requests_mix, deadline, args.think_time, args.conditional, results, args.timeout)
+            )
+            for client_id in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - started
+
+        if rss is not None:
+            rss.stop()
+        summary = report_load(results, requests_mix, elapsed, rss)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+            logger.info(f"Ergebnis gespeichert: {args.output}")
+        return summary['error_rate'] == 0
+
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if fixture is not None:
+            fixture.close()
+
+# Reihenfolge der Verarbeitungsschritte im Bericht des Offline-Modus
+OFFLINE_STAGES = ['parse', 'sanitize', 'classify', 'expand', 'serialize']
+
+class StackSampler:
+    """Tastet in kurzen Abständen den Aufrufstapel eines Threads ab und zählt gleiche Stapel (Collapsed-Stack-Format)"""
+
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def __enter__(self):
+        # Kürzeres Umschaltintervall, damit der Sampler-Thread regelmäßig den GIL bekommt
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(self.interval / 2)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        sys.setswitchinterval(self._switch_interval)
+
+    def _run(self):
+        from cal_utils.profiling import short_path
+
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        """Schreibt die Stapel im Collapsed-Stack-Format (für flamegraph.pl, speedscope oder inferno)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def profile_offline(ics_path, days_before=30, days_after=365, top=10, repeat=1, flamegraph=None):
+    """Offline-Modus: führt die Pipeline des Proxys für eine lokale .ics-Datei aus und misst Schritte und Serien"""
+    # Das Paket cal_utils wird nur im Offline-Modus gebraucht, die Prüfung per URL läuft auch ohne
+    from cal_utils.metrics import track_request_stages, request_stages, untrack_request_stages
+    from cal_utils.occurrencecache import occurrence_cache
+    from cal_utils.pipeline import render_calendar, resolve_window
+    from cal_utils.series import split_events, render_series
+    from cal_utils.template import TEMPLATE_OUTPUT
+
+    with open(ics_path, 'rb') as f:
+        cal_content = f.read()
+
+    # Die Logs des Proxys würden die Zeitmessung verfälschen, Warnungen werden nur gezählt
+    proxy_logger = logging.getLogger('ical-proxy')
+    warnings = WarningCounter()
+    proxy_logger.setLevel(logging.WARNING)
+    proxy_logger.addHandler(warnings)
+    proxy_logger.propagate = False
+
+    start_date, end_date = resolve_window(days_before, days_after)
+    logger.info(f"Kalender {ics_path}: {len(cal_content)} Bytes, Zeitraum {start_date} bis {end_date}")
+
+    # Komplette Pipeline wie bei einer Anfrage ohne Cache, Schritte über stage_timer erfasst
+    totals = []
+    stages = {}
+    output_size = 0
+    for _ in range(repeat):
+        occurrence_cache.clear()
+        token = track_request_stages()
+        started = time.perf_counter()
+        try:
+            output_size = len(render_calendar(cal_content, start_date, end_date))
+            totals.append(time.perf_counter() - started)
+            for stage, seconds in request_stages().items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+        finally:
+            untrack_request_stages(token)
+
+    total = sum(totals) / repeat
+    logger.info(f"== Verarbeitungsschritte (Mittel aus {repeat} Durchläufen, Ausgabe {output_size} Bytes) ==")
+    for stage in OFFLINE_STAGES + sorted(set(stages) - set(OFFLINE_STAGES)):
+        seconds = stages.get(stage, 0.0) / repeat
+        logger.info(f"  {stage:<10} {seconds * 1000:>10.1f} ms {seconds / total:>7.1%}")
+    other = total - sum(stages.values()) / repeat
+    logger.info(f"  {'übrige':<10} {other * 1000:>10.1f} ms {other / total:>7.1%}")
+    logger.info(f"  {'gesamt':<10} {total * 1000:>10.1f} ms")
+
+    # Jede Serie einzeln über render_series, wie sie die Pipeline verarbeitet
+    cal = Calendar.from_ical(cal_content)
+    _, recurring_events, exceptions = split_events(cal)
+    occurrence_cache.clear()
+    masters = []
+    for uid, event in recurring_events.items():
+        token = track_request_stages()
+        try:
+            instances = len(list(render_series(
+                event, exceptions.get(uid, []), start_date, end_date, False, TEMPLATE_OUTPUT
+            )))
+            series_stages = request_stages()
+        finally:
+            untrack_request_stages(token)
+        masters.append({
+            "uid": uid,
+            "warnings": warnings.take(),
+            "summary": str(event.get('summary', '')),
+            "rrule": event['rrule'].to_ical().decode('utf-8', 'replace'),
+            "exceptions": len(exceptions.get(uid, [])),
+            "instances": instances,
+            "expand": series_stages.get('expand', 0.0),
+            "serialize": series_stages.get('serialize', 0.0),
+        })
+
+    if warnings.messages:
+        logger.info("== Warnungen der Pipeline ==")
+        for message, count in warnings.messages.most_common(top):
+            logger.info(f"  {count:>5}x {message}")
+
+    logger.info(f"== Teuerste Serien nach Expansionszeit (von {len(masters)}) ==")
+    for master in sorted(masters, key=lambda m: m['expand'], reverse=True)[:top]:
+        log_master(master)
+    logger.info(f"== Serien mit den meisten Instanzen ==")
+    for master in sorted(masters, key=lambda m: m['instances'], reverse=True)[:top]:
+        log_master(master)
+
+    if flamegraph:
+        occurrence_cache.clear()
+        with StackSampler(threading.get_ident()) as sampler:
+            for _ in range(repeat):
+                occurrence_cache.clear()
+                render_calendar(cal_content, start_date, end_date)
+        sampler.write(flamegraph)
+        logger.info(
+            f"Flamegraph-Daten ({sum(sampler.stacks.values())} Stichproben) gespeichert: {flamegraph} "
+            f"(z.B. flamegraph.pl {flamegraph} > flamegraph.svg oder in speedscope öffnen)"
+        )
+    return True
+
+class WarningCounter(logging.Handler):
+    """Zählt die Warnungen der Pipeline gesamt (gleiche Meldungen zusammengefasst) und seit dem letzten Abruf"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = Counter()
+        self.pending = 0
+
+    def emit(self, record):
+        self.messages[record.getMessage()] += 1
+        self.pending += 1
+
+    def take(self):
+        pending, self.pending = self.pending, 0
+        return pending
+
+def log_master(master):
+    logger.info(
+        f"  {master['expand'] * 1000:>8.1f} ms Expansion, {master['serialize'] * 1000:>7.1f} ms Ausgabe, "
+        f"{master['instances']:>5} Instanzen, {master['exceptions']} Ausnahmen, {master['warnings']} Warnungen: "
+        f"{master['summary'][:40]!r} [{master['rrule']}] ({master['uid']})"
+    )
+
 def main():
     parser = argparse.ArgumentParser(description="Debug-Tool für Calendar-Proxy")
     parser.add_argument("--url", help="Die URL des zu testenden Kalenders")
     parser.add_argument("--proxy-url", help="Die URL des Calendar-Proxy (z.B. http://localhost:8098)")
     
+    offline = parser.add_argument_group("Offline-Modus")
+    offline.add_argument("--ics", help="Lokale .ics-Datei ohne Netzwerk und Server durch die Pipeline des Proxys schicken")
+    offline.add_argument("--days-before", type=int, default=30, help="Tage in die Vergangenheit")
+    offline.add_argument("--days-after", type=int, default=365, help="Tage in die Zukunft")
+    offline.add_argument("--top", type=int, default=10, help="Anzahl der ausgegebenen Serien")
+    offline.add_argument("--repeat", type=int, default=1, help="Anzahl der Durchläufe für die Zeitmessung")
+    offline.add_argument("--flamegraph", help="Stichproben des Aufrufstapels im Collapsed-Stack-Format in diese Datei schreiben")
+    
+    load = parser.add_argument_group("Lastmodus")
+    load.add_argument("--load", action="store_true", help="Lasttest mit mehreren gleichzeitig pollenden Clients")
+    load.add_argument("--clients", type=int, default=10, help="Anzahl gleichzeitiger Clients")
+    load.add_argument("--duration", type=float, default=30, help="Dauer des Lasttests in Sekunden")
+    load.add_argument("--think-time", type=float, default=0.0, help="Mittlere Pause eines Clients zwischen zwei Anfragen in Sekunden")
+    load.add_argument("--timeout", type=float, default=60, help="Timeout pro Anfrage in Sekunden")
+    load.add_argument("--conditional", action="store_true", help="Wie Kalender-Clients mit If-None-Match erneut anfragen")
+    load.add_argument("--mix", help="Mischung als JSON oder Pfad: [{\"weight\": 3, \"days_before\": 30, \"days_after\": 365, \"source\": \"...\"}]")
+    load.add_argument("--fixture", action="append", help="ICS-Datei, die ein lokaler Server als Quelle ausliefert (mehrfach angebbar)")
+    load.add_argument("--fixture-preset", choices=['small', 'medium', 'large'], help="Synthetischen Kalender aus benchmarks/synthetic.py ausliefern")
+    load.add_argument("--fixture-host", default='127.0.0.1', help="Adresse des Fixture-Servers (muss für den Proxy erreichbar sein)")
+    load.add_argument("--fixture-delay", type=float, default=0.0, help="Künstliche Verzögerung des Fixture-Servers in Millisekunden")
+    load.add_argument("--spawn-proxy", action="store_true", help="Proxy (app.py) lokal als eigenen Prozess starten")
+    load.add_argument("--proxy-pid", type=int, help="PID des Proxys zur Messung des Speicherbedarfs")
+    load.add_argument("--output", help="Ergebnis zusätzlich als JSON speichern")
+    
     args = parser.parse_args()
     
+    if args.load:
+        sys.exit(0 if run_load_test(args) else 1)
+    
+    if args.ics:
+        profile_offline(args.ics, args.days_before, args.days_after, args.top, max(args.repeat, 1), args.flamegraph)
+        return
+    
     if not args.url and not args.proxy_url:
         parser.print_help()
         sys.exit(1)
@@ -177,7 +730,7 @@ def main():
                     debug_url += f"?source={args.url}"
             
             logger.info(f"Rufe Debug-Endpunkt ab: {debug_url}")
-            debug_response = requests.get(debug_url)
+            debug_response = fetch(debug_url)
             
             if debug_response.status_code == 200:
                 debug_data = debug_response.json()